@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import io
+import json
+import sys
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import config
+from jobs import CANCELLED, DONE, QueueFullError, get_job_manager
+from memo import MemoryLRU
+from metrics import record_error, registry
+
+# summarizer (requests) y data_analyzer (pandas) se importan en el primer uso,
+# dentro de los hilos de trabajo, para que el servidor quede escuchando enseguida.
+
+DEFAULT_MODEL = "llama3.2"
+
+
+class ApiError(Exception):
+    """
+    Error returned to the client as a JSON body with the given HTTP status
+    """
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        try:
+            payload = json.loads(self.body or b"{}")
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"JSON inválido: {e}")
+        if not isinstance(payload, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser un objeto JSON.")
+        return payload
+
+
+def _flag(value, default):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() not in ("0", "false", "no", "")
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Línea de solicitud inválida.")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise ApiError(HTTPStatus.LENGTH_REQUIRED, "Se requiere Content-Length.")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Content-Length inválido.")
+    if length > config.API_MAX_BODY_BYTES:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                       f"El cuerpo supera el máximo de {config.API_MAX_BODY_BYTES // 2**20} MB.")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, headers, body)
+
+
+async def _send(writer, status, body, content_type="application/json; charset=utf-8", headers=None):
+    head = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}", "Connection: close"]
+    head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def _send_json(writer, status, payload, headers=None):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    await _send(writer, status, body, headers=headers)
+
+
+async def _start_stream(writer):
+    head = ["HTTP/1.1 200 OK", "Content-Type: application/x-ndjson", "Transfer-Encoding: chunked",
+            "Connection: close"]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+
+async def _write_line(writer, payload):
+    data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+    writer.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+    await writer.drain()
+
+
+def _job_response(job, extra=None):
+    payload = dict(job.result or {"success": False, "summary": None})
+    if job.status != DONE:
+        payload["success"] = False
+        payload["error"] = job.error or payload.get("error") or "El trabajo fue cancelado."
+    payload.update(extra or {})
+    payload["job"] = job.as_dict()
+    return payload
+
+
+async def _run_job(reader, writer, kind, key, model, target, stream, extra=None):
+    """
+    Submit a job and answer with its result, or stream its text as NDJSON
+
+    Streamed responses send {"text": ...} lines as the model generates and a
+    final line with the complete result. The job is withdrawn if the client
+    disconnects before it finishes: the connection is checked for EOF while
+    polling, since a non-streamed response writes nothing until the end.
+    """
+    manager = get_job_manager()
+    try:
+        job_id = manager.submit(kind, key, model, target)
+    except QueueFullError as e:
+        raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, str(e), headers={"Retry-After": "5"})
+    job = manager.get(job_id)
+
+    try:
+        if stream:
+            await _start_stream(writer)
+        sent = 0
+        while True:
+            finished = job.finished
+            if stream and len(job.parts) > sent:
+                parts = job.parts[sent:]
+                sent += len(parts)
+                await _write_line(writer, {"text": "".join(parts)})
+            if finished:
+                break
+            if reader.at_eof():
+                return  # el cliente cerró la conexión; finally retira el trabajo
+            await asyncio.sleep(config.API_POLL_SECONDS)
+
+        payload = _job_response(job, extra)
+        if stream:
+            await _write_line(writer, dict(payload, done=True))
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        elif job.status == DONE:
+            await _send_json(writer, HTTPStatus.OK, payload)
+        else:
+            status = HTTPStatus.SERVICE_UNAVAILABLE if job.status == CANCELLED else HTTPStatus.BAD_GATEWAY
+            await _send_json(writer, status, payload)
+    finally:
+        # Cliente desconectado o servidor detenido: nadie espera ya el resultado
+        if not job.finished:
+            manager.cancel(job_id)
+
+
+async def handle_summarize(request, reader, writer):
+    """
+    POST /summarize {"url", "model", "use_cache", "stream"}
+    """
+    payload = request.json()
+    url = str(payload.get("url") or "").strip()
+    if not url.startswith(("http://", "https://")):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Indica una URL válida (que empiece con http:// o https://).")
+    model = payload.get("model") or DEFAULT_MODEL
+    use_cache = _flag(payload.get("use_cache"), True)
+
+    def target():
+        from summarizer import summarize_website_stream
+
+        return summarize_website_stream(url, model=model, use_cache=use_cache)
+
+    await _run_job(reader, writer, "web", (url, use_cache), model, target, _flag(payload.get("stream"), False))
+
+
+_data_cache = None
+
+
+def _prepare_file(content, name, model):
+    global _data_cache
+    from data_analyzer import prepare_uploaded_file
+
+    if _data_cache is None:
+        _data_cache = MemoryLRU(config.DATA_CACHE_MAX_BYTES)
+    uploaded = io.BytesIO(content)
+    uploaded.name = name
+    return prepare_uploaded_file(uploaded, cache=_data_cache, model=model)
+
+
+async def handle_analyze(request, reader, writer):
+    """
+    POST /analyze?filename=ventas.csv&model=...&use_cache=1&stream=0 with the file as body
+    """
+    name = request.query.get("filename") or ""
+    if not name.lower().endswith((".csv", ".xlsx", ".xls", ".parquet")):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Indica ?filename= con extensión .csv, .xlsx, .xls o .parquet.")
+    if not request.body:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "El cuerpo de la solicitud debe ser el archivo a analizar.")
+    model = request.query.get("model") or DEFAULT_MODEL
+    use_cache = _flag(request.query.get("use_cache"), True)
+
+    # Leer el archivo y calcular estadísticas no bloquea el bucle de eventos
+    prepared = await asyncio.to_thread(_prepare_file, request.body, name, model)
+    if prepared["error"]:
+        raise ApiError(HTTPStatus.BAD_REQUEST, prepared["error"])
+    df, prompt, dataset = prepared["df"], prepared["prompt"], prepared["dataset"]
+
+    def target():
+        from data_analyzer import analyze_dataframe_with_llm_stream
+
+        return analyze_dataframe_with_llm_stream(df, model, use_cache=use_cache, prompt=prompt, dataset=dataset)
+
+    await _run_job(reader, writer, "data", (prepared["key"], use_cache), model, target,
+                   _flag(request.query.get("stream"), False), extra={"prompt_report": prepared["prompt_report"]})
+
+
+async def handle_health(request, reader, writer):
+    await _send_json(writer, HTTPStatus.OK, {"status": "ok", "jobs": get_job_manager().stats()})
+
+
+async def handle_metrics(request, reader, writer):
+    await _send(writer, HTTPStatus.OK, registry.to_prometheus().encode("utf-8"),
+                content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+ROUTES = {
+    ("GET", "/health"): handle_health,
+    ("GET", "/metrics"): handle_metrics,
+    ("POST", "/summarize"): handle_summarize,
+    ("POST", "/analyze"): handle_analyze,
+}
+
+
+async def _handle_connection(reader, writer):
+    try:
+        request = await _read_request(reader)
+        if request is None:
+            return
+        handler = ROUTES.get((request.method, request.path))
+        if handler is None:
+            allowed = [method for method, path in ROUTES if path == request.path]
+            if allowed:
+                raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Método no permitido.", headers={"Allow": ", ".join(allowed)})
+            raise ApiError(HTTPStatus.NOT_FOUND, "Ruta no encontrada.")
+        await handler(request, reader, writer)
+    except ApiError as e:
+        await _send_json(writer, e.status, {"success": False, "error": e.message}, headers=e.headers)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except Exception as e:
+        record_error("api", e)
+        try:
+            await _send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"success": False, "error": f"Error inesperado: {e}"})
+        except ConnectionError:
+            pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def serve(host=None, port=None):
+    """
+    Run the HTTP API until cancelled
+
+    Endpoints:
+        GET  /health     Liveness and job queue counts
+        GET  /metrics    Metrics in Prometheus format
+        POST /summarize  JSON {"url", "model", "use_cache", "stream"}
+        POST /analyze    File as body; ?filename=&model=&use_cache=&stream=
+
+    Summaries run in the shared JobManager, so identical concurrent requests
+    are served by one model call and a full queue answers 503.
+
+    Args:
+        host (str, optional): Interface to listen on (IA_AGENT_API_HOST)
+        port (int, optional): Port (IA_AGENT_API_PORT); 0 picks a free one
+    """
+    host = config.API_HOST if host is None else host
+    port = config.API_PORT if port is None else port
+    server = await asyncio.start_server(_handle_connection, host, port)
+    bound_host, bound_port = server.sockets[0].getsockname()[:2]
+    print(f"API escuchando en http://{bound_host}:{bound_port}", file=sys.stderr, flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def run(host=None, port=None):
+    """
+    Run serve() until interrupted with Ctrl+C
+    """
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    """
+    Command line entry point: run the HTTP API
+    """
+    parser = argparse.ArgumentParser(description="API HTTP para resumir sitios web y analizar archivos de datos.")
+    parser.add_argument("--host", default=None, help=f"Interfaz (por defecto {config.API_HOST})")
+    parser.add_argument("--port", type=int, default=None, help=f"Puerto (por defecto {config.API_PORT}; 0 = libre)")
+    args = parser.parse_args(argv)
+    run(args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+import argparse
+import gzip
+import json
+import queue
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from fetcher import FetchError, get_fetcher
+from summarizer import summarize_loaded_website
+from website import Website
+
+
+def _local_name(tag):
+    """
+    Strip the XML namespace from a tag name
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def load_sitemap_urls(sitemap_url, fetcher=None, limit=None, _depth=0):
+    """
+    Return the page URLs listed in a sitemap
+
+    Sitemap indexes are followed recursively and gzipped sitemaps are supported.
+
+    Args:
+        sitemap_url (str): URL of the sitemap.xml (or sitemap index)
+        fetcher (Fetcher, optional): HTTP client to use; defaults to the shared one
+        limit (int, optional): Maximum number of URLs to return
+
+    Returns:
+        list: Page URLs in document order
+    """
+    if fetcher is None:
+        fetcher = get_fetcher()
+
+    content = fetcher.fetch(sitemap_url).content
+    if content[:2] == b"\x1f\x8b":
+        content = gzip.decompress(content)
+    root = ET.fromstring(content)
+
+    urls = []
+    is_index = _local_name(root.tag) == "sitemapindex"
+    for loc in root.iter():
+        if _local_name(loc.tag) != "loc" or not loc.text:
+            continue
+        if is_index:
+            if _depth < 2:
+                remaining = None if limit is None else limit - len(urls)
+                urls.extend(load_sitemap_urls(loc.text.strip(), fetcher, remaining, _depth + 1))
+        else:
+            urls.append(loc.text.strip())
+        if limit is not None and len(urls) >= limit:
+            return urls[:limit]
+    return urls
+
+
+def parse_url_list(text):
+    """
+    Parse a block of text with one URL per line (blank lines and # comments are ignored)
+
+    Returns:
+        list: Unique http(s) URLs in their original order
+    """
+    urls = []
+    seen = set()
+    for line in text.splitlines():
+        url = line.strip()
+        if not url or url.startswith("#"):
+            continue
+        if not (url.startswith("http://") or url.startswith("https://")):
+            continue
+        if url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+def _fetch(url):
+    """
+    Download and parse a page, never raising
+    """
+    started_at = time.perf_counter()
+    website = Website(url)
+    return website, time.perf_counter() - started_at
+
+
+def _summarize(url, website, fetch_time, model, use_cache):
+    """
+    Run the LLM on a downloaded page, never raising
+    """
+    started_at = time.perf_counter()
+    result = summarize_loaded_website(website, model=model, use_cache=use_cache)
+    inference_time = time.perf_counter() - started_at if website.is_valid() else 0.0
+    result.update({"url": url, "fetch_time": fetch_time, "inference_time": inference_time})
+    return result
+
+
+def _failed(url, error, fetch_time=0.0):
+    return {
+        "success": False,
+        "summary": None,
+        "error": error,
+        "url": url,
+        "fetch_time": fetch_time,
+        "inference_time": 0.0,
+    }
+
+
+def summarize_urls(urls, model="llama3.2", fetch_workers=None, llm_workers=None, use_cache=True):
+    """
+    Summarize many URLs concurrently, yielding each result as soon as it is ready
+
+    Downloads run in one bounded thread pool and, as each page arrives, it is
+    handed to a second pool whose size is the number of concurrent requests
+    sent to Ollama, so slow fetches never hold an inference slot and vice versa.
+
+    Args:
+        urls (list): URLs to summarize
+        model (str, optional): Name of the Ollama model to use
+        fetch_workers (int, optional): Concurrent downloads
+        llm_workers (int, optional): Concurrent Ollama requests
+        use_cache (bool, optional): Reuse cached completions for identical content
+
+    Yields:
+        tuple: (result, report) where result is the summarize_website dict plus
+               "url", "fetch_time" and "inference_time", and report is the
+               running throughput report (see BatchReport.as_dict)
+    """
+    fetch_workers = fetch_workers or config.BATCH_FETCH_WORKERS
+    llm_workers = llm_workers or config.BATCH_LLM_WORKERS
+    report = BatchReport(len(urls))
+    done = queue.Queue()
+    # Se activa si el consumidor deja de iterar antes de terminar el lote
+    closing = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="batch-fetch") as fetch_pool, \
+         ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="batch-llm") as llm_pool:
+
+        def on_summarized(future, url):
+            try:
+                done.put(future.result())
+            except Exception as e:
+                done.put(_failed(url, str(e)))
+
+        def on_fetched(future, url):
+            if closing.is_set() or future.cancelled():
+                return
+            try:
+                website, fetch_time = future.result()
+            except Exception as e:
+                done.put(_failed(url, str(e)))
+                return
+            if not website.is_valid():
+                done.put(_failed(url, website.error or "Failed to load website", fetch_time))
+                return
+            try:
+                llm_future = llm_pool.submit(_summarize, url, website, fetch_time, model, use_cache)
+            except RuntimeError:
+                # El lote se cerró mientras esta página se descargaba
+                return
+            llm_future.add_done_callback(lambda f: on_summarized(f, url))
+
+        fetch_futures = []
+        for url in urls:
+            fetch_future = fetch_pool.submit(_fetch, url)
+            fetch_future.add_done_callback(lambda f, url=url: on_fetched(f, url))
+            fetch_futures.append(fetch_future)
+
+        try:
+            for _ in range(len(urls)):
+                result = done.get()
+                report.add(result)
+                yield result, report.as_dict()
+        finally:
+            # Sin consumidor no tiene sentido seguir descargando ni enviando páginas a Ollama
+            closing.set()
+            for fetch_future in fetch_futures:
+                fetch_future.cancel()
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class BatchReport:
+    """
+    Running throughput report of a batch
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.completed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.fetch_time = 0.0
+        self.inference_time = 0.0
+        self.started_at = time.perf_counter()
+
+    def add(self, result):
+        self.completed += 1
+        if result["success"]:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.fetch_time += result.get("fetch_time") or 0.0
+        self.inference_time += result.get("inference_time") or 0.0
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed": elapsed,
+            "pages_per_minute": self.completed / elapsed * 60 if elapsed else 0.0,
+            # Tiempos acumulados por etapa (suma sobre todas las páginas)
+            "fetch_time_total": self.fetch_time,
+            "inference_time_total": self.inference_time,
+            "fetch_time_avg": self.fetch_time / self.completed if self.completed else 0.0,
+            "inference_time_avg": self.inference_time / self.succeeded if self.succeeded else 0.0,
+        }
+
+
+def main(argv=None):
+    """
+    Command line entry point: summarize a list of URLs or a sitemap
+    """
+    parser = argparse.ArgumentParser(description="Resume muchas URLs en paralelo usando Ollama.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--urls", help="Archivo de texto con una URL por línea ('-' para stdin)")
+    source.add_argument("--sitemap", help="URL de un sitemap.xml")
+    parser.add_argument("--model", default="llama3.2", help="Modelo de Ollama")
+    parser.add_argument("--fetch-workers", type=int, default=config.BATCH_FETCH_WORKERS)
+    parser.add_argument("--llm-workers", type=int, default=config.BATCH_LLM_WORKERS)
+    parser.add_argument("--limit", type=int, default=config.BATCH_MAX_URLS, help="Máximo de URLs a procesar")
+    parser.add_argument("--no-cache", action="store_true", help="No reutilizar respuestas en caché")
+    parser.add_argument("--output", help="Archivo JSON Lines donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.sitemap:
+            urls = load_sitemap_urls(args.sitemap, limit=args.limit)
+        elif args.urls == "-":
+            urls = parse_url_list(sys.stdin.read())[:args.limit]
+        else:
+            with open(args.urls, encoding="utf-8") as f:
+                urls = parse_url_list(f.read())[:args.limit]
+    except (FetchError, ET.ParseError, OSError) as e:
+        # OSError: archivo de URLs inexistente o sitemap .gz dañado
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if not urls:
+        print("No se encontraron URLs para procesar.", file=sys.stderr)
+        return 1
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    report = None
+    try:
+        for result, report in summarize_urls(urls, model=args.model, fetch_workers=args.fetch_workers,
+                                             llm_workers=args.llm_workers, use_cache=not args.no_cache):
+            status = "OK " if result["success"] else "ERR"
+            print(f"[{report['completed']}/{report['total']}] {status} {result['url']} "
+                  f"(descarga {result['fetch_time']:.1f} s, inferencia {result['inference_time']:.1f} s)",
+                  file=sys.stderr)
+            if output:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+    finally:
+        if output:
+            output.close()
+
+    print(json.dumps(report, indent=2), file=sys.stderr)
+    return 0 if report["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
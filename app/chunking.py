@@ -0,0 +1,149 @@
+import re
+
+import config
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+# Caracteres por token observados en las respuestas de Ollama, por modelo base
+_calibrated_chars_per_token = {}
+_CALIBRATION_MIN_CHARS = 1000
+_CALIBRATION_WEIGHT = 0.3
+
+
+def context_tokens(model):
+    """
+    Return the context window (num_ctx) configured for a model
+
+    Tags like "llama3.1:8b" fall back to the entry of their base name.
+    """
+    if model in config.MODEL_CONTEXT_TOKENS:
+        return config.MODEL_CONTEXT_TOKENS[model]
+    base = model.split(":", 1)[0] if model else model
+    return config.MODEL_CONTEXT_TOKENS.get(base, config.DEFAULT_CONTEXT_TOKENS)
+
+
+def prompt_budget(model):
+    """
+    Return how many tokens a prompt may use, leaving room for the response
+    """
+    return max(context_tokens(model) - config.RESPONSE_RESERVE_TOKENS, 256)
+
+
+def _base_name(model):
+    return model.split(":", 1)[0] if model else model
+
+
+def chars_per_token(model=None):
+    """
+    Characters per token of a model: calibrated from real prompts if available,
+    config.CHARS_PER_TOKEN otherwise
+    """
+    return _calibrated_chars_per_token.get(_base_name(model), config.CHARS_PER_TOKEN)
+
+
+def calibrate(model, chars, prompt_tokens):
+    """
+    Update a model's characters-per-token ratio from the prompt_eval_count
+    reported by Ollama for a prompt of ``chars`` characters
+
+    Short prompts (dominated by the chat template) and implausible ratios (Ollama
+    does not count tokens reused from its prompt cache) are ignored.
+    """
+    if not model or not prompt_tokens or chars < _CALIBRATION_MIN_CHARS:
+        return
+    ratio = chars / prompt_tokens
+    if not 1.5 <= ratio <= 8.0:
+        return
+    base = _base_name(model)
+    previous = _calibrated_chars_per_token.get(base)
+    _calibrated_chars_per_token[base] = ratio if previous is None else previous + _CALIBRATION_WEIGHT * (ratio - previous)
+
+
+def count_tokens(text, model=None):
+    """
+    Estimate the number of tokens of a text
+
+    Args:
+        text (str): Text to measure
+        model (str, optional): Model the text is meant for (uses its calibrated ratio)
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return int(len(text) / chars_per_token(model)) + 1
+
+
+def _split_long_piece(piece, max_tokens, model):
+    """
+    Split a line that alone exceeds the budget: first by sentences, then by words
+    """
+    sentences = _SENTENCE_END.split(piece)
+    if len(sentences) == 1:
+        sentences = piece.split(" ")
+    joiner = " "
+
+    parts, current, current_tokens = [], [], 0
+    for sentence in sentences:
+        tokens = count_tokens(sentence, model)
+        if tokens > max_tokens:
+            # Palabra o frase imposible de dividir: se corta por caracteres
+            step = max(int(max_tokens * chars_per_token(model)), 1)
+            if current:
+                parts.append(joiner.join(current))
+                current, current_tokens = [], 0
+            parts.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            parts.append(joiner.join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        parts.append(joiner.join(current))
+    return parts
+
+
+def chunk_text(text, max_tokens, model=None, overlap_lines=1):
+    """
+    Split text into chunks of at most max_tokens (estimated)
+
+    Lines are packed greedily so paragraphs stay together; lines longer than
+    the budget are split by sentences. The last ``overlap_lines`` lines of a
+    chunk are repeated at the start of the next one to keep some context.
+
+    Args:
+        text (str): Text to split (one paragraph/fragment per line, as in Website.text)
+        max_tokens (int): Token budget per chunk
+        model (str, optional): Model used to estimate tokens
+        overlap_lines (int, optional): Lines repeated between consecutive chunks
+
+    Returns:
+        list: Chunks of text
+    """
+    pieces = []
+    for line in text.split("\n"):
+        if not line.strip():
+            continue
+        if count_tokens(line, model) > max_tokens:
+            pieces.extend(_split_long_piece(line, max_tokens, model))
+        else:
+            pieces.append(line)
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece + "\n", model)  # incluye el separador
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            # Solapamiento: arrastrar las últimas líneas si caben en el presupuesto
+            carry = current[-overlap_lines:] if overlap_lines else []
+            carry_tokens = sum(count_tokens(p + "\n", model) for p in carry)
+            if carry_tokens + tokens > max_tokens:
+                carry, carry_tokens = [], 0
+            current, current_tokens = list(carry), carry_tokens
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
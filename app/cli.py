@@ -0,0 +1,151 @@
+import argparse
+import json
+import sys
+
+import config
+
+# Cada comando importa solo lo que necesita: "summarize" no carga pandas y
+# "--help" no carga ni requests ni ollama.
+
+
+def _print_stats(result):
+    stats = result.get("stats") or {}
+    parts = []
+    if stats.get("cached"):
+        parts.append("respuesta desde caché")
+    if stats.get("time_to_first_token") is not None:
+        parts.append(f"primer token {stats['time_to_first_token']:.1f} s")
+    if stats.get("tokens_per_second"):
+        parts.append(f"{stats['tokens_per_second']:.1f} tokens/s")
+    if stats.get("total_time") is not None:
+        parts.append(f"total {stats['total_time']:.1f} s")
+    if result.get("dedup"):
+        parts.append(f"reutilizado de {result['dedup']['source_url']} ({result['dedup']['match']})")
+    incremental = result.get("incremental") or {}
+    if incremental.get("match") == "appended":
+        parts.append(f"{incremental['new_rows']} filas nuevas sobre {incremental['previous_rows']}")
+    elif incremental.get("match") == "unchanged":
+        parts.append("archivo sin cambios")
+    if parts:
+        print(" · ".join(parts), file=sys.stderr)
+
+
+def _emit(result, as_json):
+    """
+    Print a result dict with a "stream" generator; returns the exit code
+    """
+    stream = result.pop("stream", None)
+    if result["success"] and stream is not None:
+        try:
+            for part in stream:
+                if not as_json:
+                    sys.stdout.write(part)
+                    sys.stdout.flush()
+        finally:
+            stream.close()
+        if not as_json:
+            sys.stdout.write("\n")
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+    elif result["success"]:
+        _print_stats(result)
+    if not result["success"]:
+        print(f"Error: {result['error']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_summarize(args):
+    from summarizer import summarize_website_stream
+
+    result = summarize_website_stream(args.url, model=args.model, use_cache=not args.no_cache)
+    return _emit(result, args.json)
+
+
+def cmd_compare(args):
+    from multitable import analyze_tables_with_llm_stream, prepare_uploaded_files
+
+    def progress(done, total, label):
+        print(f"[{done}/{total}] {label}", file=sys.stderr)
+
+    prepared = prepare_uploaded_files(args.files, model=args.model, progress=progress)
+    for table in prepared["tables"]:
+        if table["error"]:
+            print(f"Aviso: no se pudo leer {table['label']}: {table['error']}", file=sys.stderr)
+    if prepared["error"]:
+        print(f"Error: {prepared['error']}", file=sys.stderr)
+        return 1
+    if args.prompt_only:
+        print(prepared["prompt"])
+        return 0
+    result = analyze_tables_with_llm_stream(prepared["prompt"], args.model, use_cache=not args.no_cache)
+    if args.json:
+        result["prompt_report"] = prepared["prompt_report"]
+    return _emit(result, args.json)
+
+
+def cmd_analyze(args):
+    from multitable import needs_comparison
+
+    # Varios archivos o un Excel con varias hojas: análisis comparativo
+    if needs_comparison(args.files):
+        return cmd_compare(args)
+
+    from data_analyzer import analyze_dataframe_with_llm_stream, prepare_uploaded_file
+
+    prepared = prepare_uploaded_file(args.files[0], model=args.model)
+    if prepared["error"]:
+        print(f"Error: {prepared['error']}", file=sys.stderr)
+        return 1
+    if args.prompt_only:
+        print(prepared["prompt"])
+        return 0
+    result = analyze_dataframe_with_llm_stream(prepared["df"], args.model, use_cache=not args.no_cache,
+                                               prompt=prepared["prompt"], dataset=prepared["dataset"])
+    if args.json:
+        result["prompt_report"] = prepared["prompt_report"]
+    return _emit(result, args.json)
+
+
+def cmd_serve(args):
+    import api
+
+    api.run(args.host, args.port)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Resume sitios web y analiza archivos de datos con Ollama, sin Streamlit.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    summarize = commands.add_parser("summarize", help="Resumir una URL")
+    summarize.add_argument("url")
+    summarize.set_defaults(handler=cmd_summarize)
+
+    analyze = commands.add_parser("analyze", help="Analizar uno o varios archivos CSV, Excel o Parquet (varios se comparan)")
+    analyze.add_argument("files", nargs="+", metavar="file")
+    analyze.add_argument("--prompt-only", action="store_true", help="Mostrar el prompt sin consultar al modelo")
+    analyze.set_defaults(handler=cmd_analyze)
+
+    for command in (summarize, analyze):
+        command.add_argument("--model", default="llama3.2", help="Modelo de Ollama")
+        command.add_argument("--no-cache", action="store_true", help="No reutilizar respuestas en caché")
+        command.add_argument("--json", action="store_true", help="Imprimir el resultado completo como JSON al terminar")
+
+    serve = commands.add_parser("serve", help="Iniciar la API HTTP")
+    serve.add_argument("--host", default=None, help=f"Interfaz (por defecto {config.API_HOST})")
+    serve.add_argument("--port", type=int, default=None, help=f"Puerto (por defecto {config.API_PORT}; 0 = libre)")
+    serve.set_defaults(handler=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    """
+    Command line entry point: summarize, analyze or serve
+    """
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import json
+import os
+
+# Configuración global de la aplicación. Todos los valores se pueden
+# sobrescribir con variables de entorno sin tocar el código.
+
+# Directorio base para los cachés persistentes (respuestas del modelo, páginas, etc.)
+CACHE_DIR = os.environ.get(
+    "IA_AGENT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ia-agent")
+)
+
+# --- Caché de respuestas del LLM ---
+# IA_AGENT_LLM_CACHE=0 desactiva el caché por completo
+LLM_CACHE_ENABLED = os.environ.get("IA_AGENT_LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("IA_AGENT_LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("IA_AGENT_LLM_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+
+# --- Descarga de páginas web ---
+FETCH_CONNECT_TIMEOUT = float(os.environ.get("IA_AGENT_FETCH_CONNECT_TIMEOUT", 5))
+FETCH_READ_TIMEOUT = float(os.environ.get("IA_AGENT_FETCH_READ_TIMEOUT", 20))
+# Tiempo máximo total de descarga (el read timeout solo aplica entre lecturas)
+FETCH_TOTAL_TIMEOUT = float(os.environ.get("IA_AGENT_FETCH_TOTAL_TIMEOUT", 60))
+FETCH_MAX_BYTES = int(os.environ.get("IA_AGENT_FETCH_MAX_BYTES", 5 * 1024 * 1024))
+FETCH_POOL_SIZE = int(os.environ.get("IA_AGENT_FETCH_POOL_SIZE", 10))
+FETCH_RETRIES = int(os.environ.get("IA_AGENT_FETCH_RETRIES", 2))
+
+# --- Caché de páginas (revalidación con ETag / Last-Modified) ---
+PAGE_CACHE_ENABLED = os.environ.get("IA_AGENT_PAGE_CACHE", "1") != "0"
+PAGE_CACHE_PATH = os.path.join(CACHE_DIR, "page_cache.sqlite3")
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("IA_AGENT_PAGE_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+# --- Resumen por lotes ---
+# Descargas concurrentes (limitadas por la red) e inferencias concurrentes
+# (limitadas por el servidor Ollama; ver OLLAMA_NUM_PARALLEL)
+BATCH_FETCH_WORKERS = int(os.environ.get("IA_AGENT_BATCH_FETCH_WORKERS", 8))
+BATCH_LLM_WORKERS = int(os.environ.get("IA_AGENT_BATCH_LLM_WORKERS", 2))
+BATCH_MAX_URLS = int(os.environ.get("IA_AGENT_BATCH_MAX_URLS", 200))
+
+# --- Extracción de texto HTML ---
+# "auto" usa el backend más rápido instalado (selectolax > lxml > stream);
+# también se puede forzar "selectolax", "lxml", "stream" o "bs4"
+HTML_BACKEND = os.environ.get("IA_AGENT_HTML_BACKEND", "auto")
+
+# --- Presupuesto de tokens por modelo ---
+# Ventana de contexto (num_ctx) que se solicita a Ollama para cada modelo.
+# Se puede sobrescribir con IA_AGENT_MODEL_CONTEXT='{"llama3.1": 16384}'
+MODEL_CONTEXT_TOKENS = {
+    "llama3.2": 8192,
+    "llama3.1": 8192,
+    "mistral": 8192,
+    "phi3": 4096,
+}
+MODEL_CONTEXT_TOKENS.update(json.loads(os.environ.get("IA_AGENT_MODEL_CONTEXT", "{}")))
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("IA_AGENT_DEFAULT_CONTEXT", 4096))
+# Tokens reservados para la respuesta del modelo dentro de la ventana de contexto
+RESPONSE_RESERVE_TOKENS = int(os.environ.get("IA_AGENT_RESPONSE_RESERVE_TOKENS", 1024))
+# Caracteres promedio por token usados para estimar (texto en español con tokenizers tipo BPE)
+CHARS_PER_TOKEN = float(os.environ.get("IA_AGENT_CHARS_PER_TOKEN", 3.5))
+
+# --- Resumen map-reduce de páginas largas ---
+MAP_REDUCE_WORKERS = int(os.environ.get("IA_AGENT_MAP_REDUCE_WORKERS", 2))
+
+# --- Memoización de archivos subidos (compartida entre sesiones de Streamlit) ---
+DATA_CACHE_MAX_BYTES = int(os.environ.get("IA_AGENT_DATA_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# --- Cola de trabajos en segundo plano (llamadas al modelo desde la interfaz) ---
+JOB_WORKERS = int(os.environ.get("IA_AGENT_JOB_WORKERS", 4))
+JOB_QUEUE_SIZE = int(os.environ.get("IA_AGENT_JOB_QUEUE_SIZE", 32))
+# Trabajos simultáneos por modelo (conviene igualarlo a OLLAMA_NUM_PARALLEL del servidor)
+JOB_MODEL_CONCURRENCY = int(os.environ.get("IA_AGENT_JOB_MODEL_CONCURRENCY", 2))
+JOB_RETENTION_SECONDS = int(os.environ.get("IA_AGENT_JOB_RETENTION", 15 * 60))
+JOB_POLL_SECONDS = float(os.environ.get("IA_AGENT_JOB_POLL_SECONDS", 1.0))
+
+# --- Métricas de latencia por etapa ---
+METRICS_ENABLED = os.environ.get("IA_AGENT_METRICS", "1") != "0"
+# Puerto para exponer /metrics en formato Prometheus (0 = desactivado)
+METRICS_PORT = int(os.environ.get("IA_AGENT_METRICS_PORT", 0))
+METRICS_HOST = os.environ.get("IA_AGENT_METRICS_HOST", "127.0.0.1")
+
+# --- Servidores Ollama ---
+# Lista separada por comas; por defecto OLLAMA_HOST o el servidor local
+OLLAMA_HOSTS = [
+    host.strip()
+    for host in os.environ.get("IA_AGENT_OLLAMA_HOSTS", os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")).split(",")
+    if host.strip()
+]
+# Solicitudes simultáneas por servidor
+OLLAMA_HOST_CONCURRENCY = int(os.environ.get("IA_AGENT_OLLAMA_HOST_CONCURRENCY", 4))
+# Tiempo que Ollama mantiene el modelo cargado tras cada solicitud (p.ej. "30m", "-1" = siempre)
+OLLAMA_KEEP_ALIVE = os.environ.get("IA_AGENT_OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_RETRIES = int(os.environ.get("IA_AGENT_OLLAMA_RETRIES", 2))
+OLLAMA_RETRY_BACKOFF = float(os.environ.get("IA_AGENT_OLLAMA_RETRY_BACKOFF", 0.5))
+OLLAMA_HEALTH_INTERVAL = float(os.environ.get("IA_AGENT_OLLAMA_HEALTH_INTERVAL", 30))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("IA_AGENT_OLLAMA_CONNECT_TIMEOUT", 5))
+OLLAMA_TIMEOUT = float(os.environ.get("IA_AGENT_OLLAMA_TIMEOUT", 600))
+# Modelos que se cargan al iniciar la app (separados por comas; vacío = ninguno)
+OLLAMA_WARMUP_MODELS = [m.strip() for m in os.environ.get("IA_AGENT_OLLAMA_WARMUP", "llama3.2").split(",") if m.strip()]
+
+# --- Reutilización de resúmenes de páginas casi idénticas ---
+DEDUP_ENABLED = os.environ.get("IA_AGENT_DEDUP", "1") != "0"
+DEDUP_PATH = os.path.join(CACHE_DIR, "summary_index.sqlite3")
+# Distancia de Hamming máxima (bits de 64) entre huellas SimHash; hasta 7 se encuentra con búsqueda indexada
+DEDUP_MAX_DISTANCE = int(os.environ.get("IA_AGENT_DEDUP_MAX_DISTANCE", 6))
+# Proporción del texto que puede cambiar y aun así servir el resumen guardado tal cual
+DEDUP_SERVE_CHANGE_RATIO = float(os.environ.get("IA_AGENT_DEDUP_SERVE_RATIO", 0.02))
+# Hasta esta proporción de cambios el resumen se actualiza a partir del diff; por encima se resume de nuevo
+DEDUP_UPDATE_MAX_CHANGE_RATIO = float(os.environ.get("IA_AGENT_DEDUP_UPDATE_RATIO", 0.3))
+# Palabras mínimas de un texto para indexarlo y reutilizar su resumen en otras URLs
+DEDUP_MIN_WORDS = int(os.environ.get("IA_AGENT_DEDUP_MIN_WORDS", 50))
+DEDUP_MAX_ENTRIES = int(os.environ.get("IA_AGENT_DEDUP_MAX_ENTRIES", 5000))
+
+# --- CLI y API HTTP sin Streamlit ---
+API_HOST = os.environ.get("IA_AGENT_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("IA_AGENT_API_PORT", 8502))
+# Tamaño máximo del archivo enviado a /analyze (el mismo límite que la subida de Streamlit)
+API_MAX_BODY_BYTES = int(os.environ.get("IA_AGENT_API_MAX_BODY_BYTES", 200 * 1024 * 1024))
+# Cada cuánto la API revisa el avance de un trabajo para responder o enviar texto nuevo
+API_POLL_SECONDS = float(os.environ.get("IA_AGENT_API_POLL_SECONDS", 0.05))
+
+# --- Archivos grandes: análisis fuera de memoria ---
+# Archivos CSV o Parquet más grandes que esto no se cargan en un DataFrame. Debe ser menor
+# que el límite de subida de Streamlit (server.maxUploadSize, 200 MB) y API_MAX_BODY_BYTES;
+# si no, solo los archivos locales de la CLI llegarían a este camino
+OUTOFCORE_THRESHOLD_BYTES = int(os.environ.get("IA_AGENT_OUTOFCORE_THRESHOLD_BYTES", 100 * 1024 * 1024))
+# "auto" (DuckDB si está instalado; si no, lectura por bloques con pandas), "duckdb" o "chunks"
+OUTOFCORE_ENGINE = os.environ.get("IA_AGENT_OUTOFCORE_ENGINE", "auto")
+OUTOFCORE_CHUNK_ROWS = int(os.environ.get("IA_AGENT_OUTOFCORE_CHUNK_ROWS", 200_000))
+DUCKDB_MEMORY_LIMIT = os.environ.get("IA_AGENT_DUCKDB_MEMORY_LIMIT", "1GB")
+# Directorio donde se copian los archivos subidos para leerlos desde disco (vacío = temporal del sistema)
+SPOOL_DIR = os.environ.get("IA_AGENT_SPOOL_DIR") or None
+# Filas de la muestra de reservorio con la que se detectan las columnas y se eligen las filas del prompt
+RESERVOIR_ROWS = int(os.environ.get("IA_AGENT_RESERVOIR_ROWS", 10_000))
+
+# --- Análisis de varias hojas / archivos ---
+# Procesos que leen hojas y calculan sus estadísticas en paralelo (1 = en el mismo proceso)
+ANALYSIS_PROCESSES = int(os.environ.get("IA_AGENT_ANALYSIS_PROCESSES", min(4, os.cpu_count() or 1)))
+
+# --- Reanálisis incremental de archivos con filas agregadas ---
+INCREMENTAL_ENABLED = os.environ.get("IA_AGENT_INCREMENTAL", "1") != "0"
+INCREMENTAL_PATH = os.path.join(CACHE_DIR, "datasets.sqlite3")
+# Versiones de archivos (estadísticas y resúmenes) que se conservan
+INCREMENTAL_MAX_ENTRIES = int(os.environ.get("IA_AGENT_INCREMENTAL_MAX_ENTRIES", 500))
@@ -1,90 +1,239 @@
+import time
+
 import pandas as pd
-import ollama
-import io # Para leer el buffer del archivo subido
+from ingest import file_name, read_table
+from stats import DatasetStats, compute_dataset_stats, is_additive_measure
+from memo import MemoryLRU, content_hash
+from llm import build_stats, chat, stream_chat, stream_text, format_error
+from chunking import context_tokens, count_tokens, prompt_budget
+from prompt_compact import Section, fit_sections
+from metrics import record_error, stage_timer
+from sampling import representative_sample
+from outofcore import analyze_large_file, should_use_out_of_core
+from incremental import APPENDED, compute_stats_incrementally, describe, find_summary, store_summary
+
+# Columnas como máximo en la muestra de filas del prompt
+MAX_SAMPLE_COLUMNS = 20
+
+DELTA_INSTRUCTION_TEXT = "Actúa como un analista de negocios experto. El archivo ya se había analizado y ahora incluye filas nuevas. Actualiza el resumen ejecutivo anterior basándote ESTRICTAMENTE en la información proporcionada arriba: conserva los puntos que siguen siendo válidos, corrige las cifras con los totales e insights actualizados y agrega al inicio un apartado breve con lo que cambió con las filas nuevas (tendencias, productos/departamentos que suben o bajan). No inventes información que no esté presente. Responde en español con el resumen completo actualizado, en formato de puntos clave (bullet points)."
+
+INSTRUCTION_TEXT = "Actúa como un analista de negocios experto. Basándote ESTRICTAMENTE en la información y los datos proporcionados arriba, genera un resumen ejecutivo conciso en español para la gerencia. Destaca las tendencias clave, los puntos fuertes (ej. mejores productos/departamentos), los puntos débiles (ej. peores productos/departamentos) y cualquier otro insight relevante que puedas inferir DIRECTAMENTE de los datos mostrados. No inventes información que no esté presente. Usa un lenguaje claro y profesional, preferiblemente en formato de puntos clave (bullet points)."
+
+def _dtype_label(dtype):
+    """
+    Nombre corto del tipo de una columna para el esquema del prompt.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "cat"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "fecha"
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    return "texto"
 
-def create_data_analysis_prompt(df: pd.DataFrame):
+def build_data_analysis_prompt(df: pd.DataFrame, stats: DatasetStats = None, model: str = None,
+                               sample: pd.DataFrame = None, sampling: str = None):
     """
-    Genera el prompt para el LLM basado en el DataFrame.
-    Intenta realizar algunos cálculos básicos y presenta una muestra de datos.
+    Genera el prompt para el LLM basado en el DataFrame, ajustado al presupuesto
+    de tokens del modelo.
+
+    El prompt se arma por secciones con prioridad (esquema, insights calculados,
+    estadísticas, tendencia mensual y muestra de filas). Las tablas se codifican en
+    formato compacto (ver prompt_compact) y, si no todo cabe, se recortan o se
+    omiten primero las secciones menos importantes; la instrucción final siempre se
+    conserva.
 
     Args:
         df (pd.DataFrame): El DataFrame a analizar.
+        stats (DatasetStats, optional): Estadísticas ya calculadas (p.ej. por bloques);
+            si se omite se calculan a partir de df.
+        model (str, optional): Modelo destino; define el presupuesto y el conteo de tokens.
+        sample (pd.DataFrame, optional): Filas de muestra ya elegidas (p.ej. de un
+            reservorio); si se omite se toma una muestra estratificada de df.
+        sampling (str, optional): Descripción del muestreo de ``sample`` para el título.
 
     Returns:
-        str: El prompt para el LLM.
+        tuple: (prompt, report) donde report indica tokens usados, ahorro frente al
+               formato markdown y secciones recortadas u omitidas.
     """
-    prompt_text = "### Análisis Solicitado: Datos Comerciales\n\n"
-    prompt_text += f"Se ha cargado un archivo con {len(df)} filas/registros y {df.shape[1]} columnas.\n"
-    prompt_text += f"Nombres de las columnas: {', '.join(df.columns)}\n\n"
+    if stats is None:
+        stats = compute_dataset_stats(df)
+    rows = stats.rows if stats is not None else len(df)
+    columns = stats.columns if stats is not None and stats.columns else list(df.columns)
+    dtypes = df.dtypes.to_dict() if df is not None else {}
 
-    prompt_text += "### Resumen Estadístico y Cálculos Preliminares:\n"
-    # Intenta generar un resumen estadístico básico para columnas numéricas
+    sections = []
+
+    # --- Esquema: siempre se incluye ---
+    schema = f"Se ha cargado un archivo con {rows} filas/registros y {len(columns)} columnas.\n"
+    schema += "Columnas (tipo): " + ", ".join(
+        f"{column} ({_dtype_label(dtypes[column])})" if column in dtypes else str(column) for column in columns
+    )
+    baseline = f"Se ha cargado un archivo con {rows} filas/registros y {len(columns)} columnas.\n"
+    baseline += f"Nombres de las columnas: {', '.join(map(str, columns))}"
+    if stats is not None:
+        roles = stats.roles
+        roles_line = (
+            f"\nColumnas detectadas: medidas [{', '.join(map(str, roles['measures']))}], "
+            f"categorías [{', '.join(map(str, roles['categories']))}], "
+            f"fechas [{', '.join(map(str, roles['dates']))}]."
+        )
+        schema += roles_line
+        baseline += roles_line
+    sections.append(Section("schema", 0, "### Análisis Solicitado: Datos Comerciales", schema,
+                            baseline=baseline, required=True))
+
+    # --- Insights calculados: totales, mejores/peores grupos y tendencias por fecha ---
     try:
-        numeric_cols = df.select_dtypes(include='number').columns
-        if not numeric_cols.empty:
-            prompt_text += "Estadísticas descriptivas (columnas numéricas):\n"
-            prompt_text += df[numeric_cols].describe().to_markdown() + "\n\n"
+        calculated_insights = stats.insights() if stats is not None else []
+        if calculated_insights:
+            sections.append(Section("insights", 1, "### Insights Calculados Directamente:", calculated_insights))
         else:
-            prompt_text += "No se encontraron columnas numéricas para estadísticas descriptivas.\n\n"
+            sections.append(Section("insights", 1, "### Insights Calculados Directamente:",
+                                    "No se pudieron calcular insights específicos (no se detectaron columnas numéricas ni categorías)."))
     except Exception as e:
-        prompt_text += f"(No se pudo generar .describe(): {e})\n\n"
+        sections.append(Section("insights", 1, "### Insights Calculados Directamente:", f"(Error durante cálculos específicos: {e})"))
 
-    # --- Intenta realizar cálculos específicos (¡AJUSTA ESTOS NOMBRES!) ---
-    # Adapta los nombres 'Ventas', 'Producto', 'Departamento', 'Fecha' a los nombres REALES de tus columnas
-    calculated_insights = []
+    # --- Estadísticas descriptivas ---
+    title = "### Estadísticas descriptivas (columnas numéricas):"
     try:
-        if 'Ventas' in df.columns:
-            total_sales = df['Ventas'].sum()
-            calculated_insights.append(f"- Ventas Totales Registradas: ${total_sales:,.2f}")
-            if 'Producto' in df.columns:
-                product_sales = df.groupby('Producto')['Ventas'].sum()
-                if not product_sales.empty:
-                    top_product = product_sales.idxmax()
-                    top_product_sales = product_sales.max()
-                    calculated_insights.append(f"- Producto con Mayores Ventas: {top_product} (${top_product_sales:,.2f})")
-                    worst_product = product_sales.idxmin()
-                    worst_product_sales = product_sales.min()
-                    calculated_insights.append(f"- Producto con Menores Ventas: {worst_product} (${worst_product_sales:,.2f})")
-
-            if 'Departamento' in df.columns:
-                 dept_sales = df.groupby('Departamento')['Ventas'].sum()
-                 if not dept_sales.empty:
-                    top_dept = dept_sales.idxmax()
-                    calculated_insights.append(f"- Departamento con Mayores Ventas: {top_dept}")
-                    worst_dept = dept_sales.idxmin()
-                    calculated_insights.append(f"- Departamento con Menores Ventas: {worst_dept}")
-
-        # Puedes añadir más análisis aquí (ej. tendencias si hay fechas)
-
-        if calculated_insights:
-            prompt_text += "Insights Calculados Directamente:\n" + "\n".join(calculated_insights) + "\n\n"
+        summary = stats.numeric_summary() if stats is not None else pd.DataFrame()
+        if not summary.empty:
+            # Una fila por columna, para poder recortar las menos relevantes en archivos anchos
+            sections.append(Section("stats", 2, title, summary.T, baseline=summary.to_markdown()))
         else:
-            prompt_text += "No se pudieron calcular insights específicos (verifica nombres de columnas como 'Ventas', 'Producto', 'Departamento').\n\n"
+            sections.append(Section("stats", 2, title, "No se encontraron columnas numéricas para estadísticas descriptivas."))
+    except Exception as e:
+        sections.append(Section("stats", 2, title, f"(No se pudieron generar las estadísticas descriptivas: {e})"))
 
-    except KeyError as e:
-        prompt_text += f"(Falta la columna '{e}' para cálculos específicos)\n\n"
+    # --- Evolución mensual de la medida principal ---
+    try:
+        main_measures = [m for m in stats.roles["measures"] if is_additive_measure(m)][:1] if stats is not None else []
+        for date_column in (stats.roles["dates"] if stats is not None else []):
+            trend = stats.monthly_trend(date_column)
+            if trend is not None and len(trend) > 1 and main_measures:
+                # Los meses más recientes primero, para que sean los últimos en recortarse
+                recent = trend[main_measures].tail(12).iloc[::-1]
+                sections.append(Section(
+                    f"trend_{date_column}", 3,
+                    f"### Evolución mensual de {main_measures[0]} según {date_column} (últimos 12 meses, más reciente primero):",
+                    recent, baseline=trend[main_measures].tail(12).to_markdown()
+                ))
     except Exception as e:
-        prompt_text += f"(Error durante cálculos específicos: {e})\n\n"
-    # --- Fin Cálculos Específicos ---
+        sections.append(Section("trend", 3, "", f"(Error durante cálculos específicos: {e})"))
 
-    prompt_text += "### Muestra de Datos (Primeras 5 Filas):\n"
+    # --- Muestra de filas: estratificada por la categoría principal en lugar de las primeras filas ---
+    if sample is None:
+        sample, sampling = representative_sample(df, stats.roles if stats is not None else None)
+    if len(sample.columns) > MAX_SAMPLE_COLUMNS:
+        # En archivos anchos se muestran primero las columnas con un rol detectado
+        ranked = (stats.roles["dates"] + stats.roles["categories"] + stats.roles["measures"]) if stats is not None else []
+        ranked += [c for c in sample.columns if c not in ranked]
+        sample = sample[ranked[:MAX_SAMPLE_COLUMNS]]
     try:
-        # Usar to_markdown para mejor formato si es posible
-        prompt_text += df.head().to_markdown(index=False) + "\n\n"
-    except Exception: # Fallback a to_string
-         prompt_text += df.head().to_string() + "\n\n"
+        sample_baseline = sample.to_markdown(index=False)
+    except Exception:
+        sample_baseline = sample.to_string()
+    sample_title = f"### Muestra de Datos ({len(sample)} filas, {sampling or 'muestra'}"
+    sample_title += f", {len(sample.columns)} de {len(df.columns)} columnas):" if len(sample.columns) < len(df.columns) else "):"
+    sections.append(Section("sample", 4, sample_title, sample,
+                            baseline=sample_baseline, index=False))
 
+    sections.append(Section("instruction", 0, "### INSTRUCCIÓN PARA EL MODELO:", INSTRUCTION_TEXT, required=True))
 
-    # Limit prompt size (optional but recommended for large datasets/many columns)
-    max_prompt_chars = 15000 # Ajusta según necesidad y modelo
-    if len(prompt_text) > max_prompt_chars:
-         prompt_text = prompt_text[:max_prompt_chars] + "\n... (prompt truncado)\n\n"
+    budget = prompt_budget(model) - count_tokens(get_data_analysis_system_prompt(), model)
+    prompt_text, report = fit_sections(sections, budget, model)
+    return prompt_text.rstrip(), report
 
+def create_data_analysis_prompt(df: pd.DataFrame, stats: DatasetStats = None, model: str = None):
+    """
+    Genera el prompt para el LLM basado en el DataFrame (ver build_data_analysis_prompt).
 
-    prompt_text += "### INSTRUCCIÓN PARA EL MODELO:\n"
-    prompt_text += "Actúa como un analista de negocios experto. Basándote ESTRICTAMENTE en la información y los datos proporcionados arriba, genera un resumen ejecutivo conciso en español para la gerencia. Destaca las tendencias clave, los puntos fuertes (ej. mejores productos/departamentos), los puntos débiles (ej. peores productos/departamentos) y cualquier otro insight relevante que puedas inferir DIRECTAMENTE de los datos mostrados. No inventes información que no esté presente. Usa un lenguaje claro y profesional, preferiblemente en formato de puntos clave (bullet points)."
+    Returns:
+        str: El prompt para el LLM.
+    """
+    return build_data_analysis_prompt(df, stats, model)[0]
 
-    return prompt_text
+def build_delta_analysis_prompt(df: pd.DataFrame, stats: DatasetStats, dataset: dict, previous_summary: str,
+                                model: str = None):
+    """
+    Genera el prompt para actualizar un resumen anterior cuando al archivo solo
+    se le agregaron filas (ver incremental.py).
+
+    En lugar de pedir el resumen completo desde cero se envían el resumen
+    anterior, la variación de cada medida, los insights de las filas nuevas, los
+    insights actualizados y una muestra de las filas nuevas, ajustados al
+    presupuesto de tokens del modelo.
+
+    Args:
+        df (pd.DataFrame): El DataFrame completo (las filas nuevas están al final).
+        stats (DatasetStats): Estadísticas de todas las filas.
+        dataset (dict): Descripción de la versión de compute_stats_incrementally().
+        previous_summary (str): Resumen ejecutivo de la versión anterior.
+        model (str, optional): Modelo destino; define el presupuesto y el conteo de tokens.
+
+    Returns:
+        tuple: (prompt, report) como build_data_analysis_prompt.
+    """
+    previous_rows = dataset["previous_rows"]
+    new_rows = df.iloc[previous_rows:]
+    before, delta = dataset["previous_stats"], dataset["delta"]
+    sections = []
+
+    update = (f"El archivo ya analizado recibió {len(new_rows)} filas nuevas: antes tenía {previous_rows} filas "
+              f"y ahora tiene {stats.rows}. Las columnas no cambiaron: {', '.join(map(str, df.columns))}.")
+    sections.append(Section("update", 0, "### Análisis Solicitado: Actualización de Datos Comerciales", update,
+                            required=True))
+    sections.append(Section("previous", 0, f"### Resumen ejecutivo anterior (con {previous_rows} filas):",
+                            previous_summary.strip(), required=True))
+
+    # --- Variación de cada medida: antes, filas nuevas y total actualizado ---
+    changes = {}
+    for measure in stats.roles["measures"]:
+        if is_additive_measure(measure):
+            old, added, now = before.numeric[measure].total, delta.numeric[measure].total, stats.numeric[measure].total
+            changes[f"{measure} total"] = {"antes": old, "filas nuevas": added, "ahora": now,
+                                           "variación": f"{(now - old) / abs(old):+.1%}" if old else ""}
+        elif stats.numeric[measure].count:
+            changes[f"{measure} promedio"] = {
+                "antes": before.numeric[measure].mean if before.numeric[measure].count else float("nan"),
+                "filas nuevas": delta.numeric[measure].mean if delta.numeric[measure].count else float("nan"),
+                "ahora": stats.numeric[measure].mean, "variación": ""}
+    if changes:
+        table = pd.DataFrame.from_dict(changes, orient="index")
+        table.index.name = "medida"
+        sections.append(Section("changes", 1, "### Variación de las medidas:", table, baseline=table.to_markdown()))
+
+    try:
+        new_insights = delta.insights()
+        if new_insights:
+            sections.append(Section("new_insights", 1, f"### Insights de las {len(new_rows)} filas nuevas:", new_insights))
+        updated_insights = stats.insights()
+        if updated_insights:
+            sections.append(Section("insights", 2, "### Insights actualizados (todas las filas):", updated_insights))
+    except Exception as e:
+        sections.append(Section("insights", 2, "", f"(Error durante cálculos específicos: {e})"))
+
+    sample, sampling = representative_sample(new_rows, stats.roles)
+    if len(sample.columns) > MAX_SAMPLE_COLUMNS:
+        ranked = stats.roles["dates"] + stats.roles["categories"] + stats.roles["measures"]
+        sample = sample[(ranked + [c for c in sample.columns if c not in ranked])[:MAX_SAMPLE_COLUMNS]]
+    try:
+        sample_baseline = sample.to_markdown(index=False)
+    except Exception:
+        sample_baseline = sample.to_string()
+    sections.append(Section("sample", 4, f"### Muestra de las filas nuevas ({len(sample)} filas, {sampling}):", sample,
+                            baseline=sample_baseline, index=False))
+
+    sections.append(Section("instruction", 0, "### INSTRUCCIÓN PARA EL MODELO:", DELTA_INSTRUCTION_TEXT, required=True))
+
+    budget = prompt_budget(model) - count_tokens(get_data_analysis_system_prompt(), model)
+    prompt_text, report = fit_sections(sections, budget, model)
+    return prompt_text.rstrip(), report
 
 def get_data_analysis_system_prompt():
     """
@@ -93,13 +242,53 @@ def get_data_analysis_system_prompt():
     return "Eres un asistente de IA especializado en análisis de datos comerciales. Tu tarea es interpretar los datos y cálculos proporcionados y generar un resumen ejecutivo claro y conciso en español, enfocado en insights accionables para la gerencia. Responde únicamente basándote en la información dada."
 
 
-def analyze_dataframe_with_llm(df: pd.DataFrame, model_name: str):
+def create_data_analysis_messages(df: pd.DataFrame, prompt: str = None, model: str = None):
+    """
+    Construye la lista de mensajes para Ollama a partir del DataFrame
+    (o de un prompt ya generado, p.ej. recuperado del caché).
+    """
+    return [
+        {"role": "system", "content": get_data_analysis_system_prompt()},
+        {"role": "user", "content": prompt if prompt is not None else create_data_analysis_prompt(df, model=model)}
+    ]
+
+def clean_analysis_summary(summary: str):
+    """
+    Post-procesamiento simple: elimina el preámbulo si el modelo lo agrega.
+    """
+    summary_lines = summary.split('\n')
+    if "Aquí tienes un resumen ejecutivo" in summary_lines[0]:
+         summary = "\n".join(summary_lines[1:]).strip()
+    return summary
+
+
+def _served_stats(started_at):
+    stats = build_stats(started_at, None, time.perf_counter())
+    stats["time_to_first_token"] = stats["total_time"]
+    stats["cached"] = True
+    return stats
+
+def _store_when_done(stream, result, dataset, model_name):
+    """
+    Entrega el stream y guarda el resumen de esta versión del archivo al terminar.
+    """
+    yield from stream
+    if result.get("success") and result.get("summary"):
+        store_summary(dataset, model_name, result["summary"])
+
+def analyze_dataframe_with_llm(df: pd.DataFrame, model_name: str, use_cache: bool = True, prompt: str = None,
+                               dataset: dict = None):
     """
     Analiza un DataFrame usando Ollama.
 
     Args:
         df (pd.DataFrame): El DataFrame a analizar.
         model_name (str): El nombre del modelo Ollama a usar.
+        use_cache (bool): Reutilizar una respuesta en caché si el prompt es idéntico.
+        prompt (str, optional): Prompt ya generado con create_data_analysis_prompt().
+        dataset (dict, optional): Versión del archivo (prepare_uploaded_file()["dataset"]);
+            si ya se resumió se entrega ese resumen y, si no, el resumen nuevo se guarda
+            para actualizarlo cuando se agreguen filas.
 
     Returns:
         dict: Diccionario con el resultado del análisis.
@@ -107,36 +296,34 @@ def analyze_dataframe_with_llm(df: pd.DataFrame, model_name: str):
     if df is None or df.empty:
          return {"success": False, "summary": None, "error": "El DataFrame está vacío o no es válido."}
 
+    import ollama  # Diferido: crear el prompt no necesita el cliente
+
     try:
-        # 1. Crear el prompt basado en el DataFrame
-        user_prompt = create_data_analysis_prompt(df)
-
-        # 2. Definir los mensajes para Ollama
-        messages = [
-            {"role": "system", "content": get_data_analysis_system_prompt()},
-            {"role": "user", "content": user_prompt}
-        ]
-
-        # 3. Llamar a Ollama
-        response = ollama.chat(model=model_name, messages=messages)
-
-        # 4. Procesar la respuesta
-        if response and "message" in response and "content" in response["message"]:
-            summary = response["message"]["content"]
-            # Simple post-processing: remove potential preamble if model adds it
-            summary_lines = summary.split('\n')
-            if "Aquí tienes un resumen ejecutivo" in summary_lines[0]:
-                 summary = "\n".join(summary_lines[1:]).strip()
-
-            return {"success": True, "summary": summary, "error": None}
+        started_at = time.perf_counter()
+        stored = find_summary(dataset, model_name) if dataset is not None and use_cache else None
+        if stored:
+            return {"success": True, "summary": stored, "error": None, "stats": _served_stats(started_at),
+                    "incremental": describe(dataset)}
+
+        # 1. Crear el prompt y los mensajes basados en el DataFrame
+        messages = create_data_analysis_messages(df, prompt, model_name)
+
+        # 2. Llamar a Ollama
+        summary, stats = chat(model_name, messages, use_cache=use_cache, options={"num_ctx": context_tokens(model_name)})
+
+        # 3. Procesar la respuesta
+        if summary:
+            summary = clean_analysis_summary(summary)
+            if dataset is not None and use_cache:
+                store_summary(dataset, model_name, summary)
+            return {"success": True, "summary": summary, "error": None, "stats": stats,
+                    "incremental": describe(dataset)}
         else:
             return {"success": False, "summary": None, "error": "La respuesta del modelo de IA no tuvo el formato esperado."}
 
     except ollama.ResponseError as e:
          # Specific Ollama error handling
-         error_msg = f"Error de Ollama ({e.status_code}): {e.error}"
-         # Log the detailed error if needed: print(f"Ollama ResponseError: {e}")
-         return {"success": False, "summary": None, "error": error_msg}
+         return {"success": False, "summary": None, "error": format_error(e)}
     except Exception as e:
         # General error handling
         # Log the full error for debugging
@@ -144,36 +331,195 @@ def analyze_dataframe_with_llm(df: pd.DataFrame, model_name: str):
         # print(f"Unexpected error in analyze_dataframe_with_llm: {traceback.format_exc()}")
         return {"success": False, "summary": None, "error": f"Ocurrió un error inesperado durante el análisis de datos: {str(e)}"}
 
+def analyze_dataframe_with_llm_stream(df: pd.DataFrame, model_name: str, use_cache: bool = True, prompt: str = None,
+                                      dataset: dict = None):
+    """
+    Analiza un DataFrame usando Ollama, entregando el resumen a medida que se genera.
+
+    Args:
+        df (pd.DataFrame): El DataFrame a analizar.
+        model_name (str): El nombre del modelo Ollama a usar.
+        use_cache (bool): Reutilizar una respuesta en caché si el prompt es idéntico.
+        prompt (str, optional): Prompt ya generado con create_data_analysis_prompt().
+        dataset (dict, optional): Versión del archivo; ver analyze_dataframe_with_llm.
+
+    Returns:
+        dict: Igual que analyze_dataframe_with_llm más "stream", un generador de
+              fragmentos de texto. "summary", "stats" y "error" se completan
+              cuando el stream termina de consumirse.
+    """
+    if df is None or df.empty:
+         return {"success": False, "summary": None, "stream": None, "error": "El DataFrame está vacío o no es válido."}
+
+    try:
+        started_at = time.perf_counter()
+        stored = find_summary(dataset, model_name) if dataset is not None and use_cache else None
+        if stored:
+            # Esta versión del archivo ya se resumió: se entrega el resumen guardado
+            return {"success": True, "summary": stored, "error": None, "stats": _served_stats(started_at),
+                    "incremental": describe(dataset), "stream": stream_text(stored)}
+
+        messages = create_data_analysis_messages(df, prompt, model_name)
+        result = {"success": True, "summary": None, "error": None, "stats": None, "incremental": describe(dataset)}
+        stream = stream_chat(model_name, messages, result, postprocess=clean_analysis_summary, use_cache=use_cache,
+                             options={"num_ctx": context_tokens(model_name)})
+        result["stream"] = _store_when_done(stream, result, dataset, model_name) if dataset is not None and use_cache else stream
+        return result
+    except Exception as e:
+        return {"success": False, "summary": None, "stream": None, "error": f"Ocurrió un error inesperado durante el análisis de datos: {str(e)}"}
+
 def read_uploaded_file(uploaded_file):
     """
-    Lee un archivo subido (CSV o Excel) en un DataFrame de Pandas.
+    Lee un archivo subido (CSV, Excel o Parquet) en un DataFrame de Pandas.
+
+    El separador del CSV se detecta sobre un prefijo pequeño para usar los motores
+    rápidos (pyarrow o C) y los tipos se compactan (categorías, enteros reducidos).
+    El archivo se lee directamente desde el buffer subido, sin copiarlo.
     """
     if uploaded_file is None:
         return None, "No se cargó ningún archivo."
 
     try:
-        # Leer el contenido del archivo en memoria
-        file_content = uploaded_file.getvalue()
+        name = file_name(uploaded_file).lower()
 
-        if uploaded_file.name.endswith('.csv'):
-            # Intentar leer CSV, probando diferentes separadores comunes
+        if name.endswith('.csv'):
             try:
-                df = pd.read_csv(io.BytesIO(file_content), sep=None, engine='python', on_bad_lines='warn')
-                return df, None
+                return read_table(uploaded_file), None
             except Exception as csv_e:
+                 record_error("read", csv_e)
                  return None, f"Error al leer CSV: {csv_e}. Asegúrate que sea un CSV válido."
 
-        elif uploaded_file.name.endswith(('.xlsx', '.xls')):
+        elif name.endswith(('.xlsx', '.xls')):
              # Leer archivo Excel (requiere openpyxl)
             try:
-                df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl')
-                return df, None
+                return read_table(uploaded_file), None
             except Exception as excel_e:
+                 record_error("read", excel_e)
                  return None, f"Error al leer Excel: {excel_e}. Asegúrate que sea un archivo Excel válido y tengas 'openpyxl' instalado."
+
+        elif name.endswith('.parquet'):
+            # Leer archivo Parquet (requiere pyarrow)
+            try:
+                return read_table(uploaded_file), None
+            except Exception as parquet_e:
+                 record_error("read", parquet_e)
+                 return None, f"Error al leer Parquet: {parquet_e}. Asegúrate que sea un archivo Parquet válido y tengas 'pyarrow' instalado."
         else:
-            return None, "Formato de archivo no soportado. Por favor, sube un archivo CSV o Excel."
+            return None, "Formato de archivo no soportado. Por favor, sube un archivo CSV, Excel o Parquet."
 
     except Exception as e:
         # import traceback
         # print(f"Error leyendo uploaded file: {traceback.format_exc()}")
-        return None, f"Error inesperado al procesar el archivo: {e}"
\ No newline at end of file
+        return None, f"Error inesperado al procesar el archivo: {e}"
+
+
+def _build_prompt(prepared, model):
+    """
+    Genera el prompt de un archivo preparado para un modelo.
+
+    Returns:
+        tuple: (prompt, report, delta) donde delta indica si el prompt actualiza el resumen anterior
+    """
+    if prepared.get("outofcore"):
+        # df ya es la muestra elegida del reservorio
+        prompt, report = build_data_analysis_prompt(prepared["df"], prepared["stats"], model, sample=prepared["df"],
+                                                    sampling=prepared["outofcore"]["sampling"])
+        return prompt, report, False
+    dataset = prepared.get("dataset")
+    previous_summary = None
+    if dataset is not None and dataset["match"] == APPENDED:
+        previous_summary = find_summary(dataset, model, previous=True)
+    if previous_summary:
+        prompt, report = build_delta_analysis_prompt(prepared["df"], prepared["stats"], dataset, previous_summary, model)
+        return prompt, report, True
+    prompt, report = build_data_analysis_prompt(prepared["df"], prepared["stats"], model)
+    return prompt, report, False
+
+
+def prepare_uploaded_file(uploaded_file, cache: MemoryLRU = None, model: str = None):
+    """
+    Lee un archivo subido y calcula sus estadísticas y el prompt de análisis,
+    reutilizando el resultado si ya se procesó un archivo con el mismo contenido.
+
+    Args:
+        uploaded_file: Archivo subido (CSV, Excel o Parquet).
+        cache (MemoryLRU, optional): Caché en memoria compartido; la clave es el
+            hash del contenido, por lo que los reruns de Streamlit no vuelven a leer
+            ni a recalcular nada.
+        model (str, optional): Modelo destino; el prompt se ajusta a su presupuesto
+            de tokens y se guarda por modelo.
+
+    Los CSV y Parquet más grandes que IA_AGENT_OUTOFCORE_THRESHOLD_BYTES no se
+    cargan: las estadísticas se calculan fuera de memoria (ver outofcore.py) y
+    "df" es solo la muestra de filas; "outofcore" describe el motor y el muestreo.
+
+    Si el archivo es una versión ya analizada con filas agregadas al final (ver
+    incremental.py), las estadísticas se calculan solo sobre las filas nuevas y,
+    si existe el resumen anterior del mismo modelo, el prompt pide actualizarlo.
+    "dataset" describe la versión y se pasa a analyze_dataframe_with_llm_stream().
+
+    Returns:
+        dict: {"df", "stats", "prompt", "prompt_report", "key", "cached", "outofcore", "dataset",
+               "delta_prompt", "error"} donde delta_prompt indica si el prompt actualiza el resumen anterior
+    """
+    empty = {"df": None, "stats": None, "prompt": None, "prompt_report": None, "key": None, "cached": False,
+             "outofcore": None, "dataset": None, "delta_prompt": False}
+    if uploaded_file is None:
+        return dict(empty, error="No se cargó ningún archivo.")
+
+    try:
+        extension = file_name(uploaded_file).lower().rsplit('.', 1)[-1]
+        key = f"{content_hash(uploaded_file)}.{extension}"
+    except Exception as e:
+        return dict(empty, error=f"Error inesperado al procesar el archivo: {e}")
+
+    prepared = cache.get(key) if cache is not None else None
+    cached = prepared is not None
+    if prepared is None and should_use_out_of_core(uploaded_file):
+        try:
+            with stage_timer("stats"):
+                large = analyze_large_file(uploaded_file)
+        except Exception as e:
+            record_error("stats", e)
+            return dict(empty, key=key, error=f"Error al analizar el archivo: {e}")
+        if large["stats"] is None:
+            return dict(empty, key=key, error="El archivo no contiene filas.")
+        info = {name: large[name] for name in ("engine", "sampling", "rows", "bytes")}
+        prepared = {"df": large["sample"], "stats": large["stats"], "outofcore": info}
+        if cache is not None:
+            cache.set(key, prepared)
+    elif prepared is None:
+        with stage_timer("read"):
+            df, error_read = read_uploaded_file(uploaded_file)
+        if error_read:
+            return dict(empty, key=key, error=error_read)
+        if df is None or df.empty:
+            return dict(empty, df=df, key=key, error="El DataFrame está vacío o no es válido.")
+        try:
+            with stage_timer("stats"):
+                stats, dataset = compute_stats_incrementally(df)
+        except Exception as e:
+            record_error("stats", e)
+            return dict(empty, df=df, key=key, error=f"Error al calcular las estadísticas del archivo: {e}")
+        prepared = {"df": df, "stats": stats, "dataset": dataset}
+        if cache is not None:
+            cache.set(key, prepared)
+
+    # El prompt depende del presupuesto de tokens de cada modelo. Se guarda en su propia
+    # entrada del caché: la entrada del archivo no cambia después de guardarse y cada
+    # una se contabiliza con su tamaño real
+    prompt_key = f"{key}:prompt:{model}"
+    built = cache.get(prompt_key) if cache is not None else None
+    if built is None:
+        try:
+            with stage_timer("prompt", kind="data"):
+                built = _build_prompt(prepared, model)
+        except Exception as e:
+            record_error("prompt", e)
+            return dict(empty, df=prepared["df"], key=key, error=f"Error al generar el prompt del análisis: {e}")
+        if cache is not None:
+            cache.set(prompt_key, built)
+    prompt, report, delta_prompt = built
+    return {"df": prepared["df"], "stats": prepared["stats"], "prompt": prompt, "prompt_report": report,
+            "key": key, "cached": cached, "outofcore": prepared.get("outofcore"), "dataset": prepared.get("dataset"),
+            "delta_prompt": delta_prompt, "error": None}
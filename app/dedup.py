@@ -0,0 +1,319 @@
+import contextlib
+import difflib
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import config
+
+# Parámetros de seguimiento que no cambian el contenido de la página
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_gl", "igshid", "ref_src"}
+TRACKING_PREFIXES = ("utm_",)
+
+FINGERPRINT_BITS = 64
+# La huella se divide en bandas: dos huellas a distancia <= BANDS - 1 comparten al menos una
+BANDS = 8
+_BAND_BITS = FINGERPRINT_BITS // BANDS
+_WORD = re.compile(r"\w+", re.UNICODE)
+SHINGLE_WORDS = 3
+
+EXACT = "exact"
+NEAR = "near"
+UPDATED = "updated"
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so trivially different forms map to the same page
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters (utm_*, fbclid, gclid...), sorts the remaining query parameters
+    and removes a trailing slash from the path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80 or scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def simhash(text, bits=FINGERPRINT_BITS):
+    """
+    SimHash fingerprint of a text over shingles of SHINGLE_WORDS words
+
+    Texts that differ in a few words get fingerprints at a small Hamming distance.
+
+    Returns:
+        int: Unsigned fingerprint of ``bits`` bits
+    """
+    import numpy as np
+
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0
+    shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))]
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=bits // 8).digest() for s in shingles)
+    # Una fila de bits por shingle; cada bit de la huella es el voto mayoritario de su columna
+    matrix = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), bits // 8), axis=1)
+    votes = matrix.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _to_signed(value):
+    # SQLite guarda enteros de 64 bits con signo
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def _bands(fingerprint):
+    mask = (1 << _BAND_BITS) - 1
+    return [(fingerprint >> (i * _BAND_BITS)) & mask for i in range(BANDS)]
+
+
+def text_changes(old_text, new_text):
+    """
+    Lines removed from and added to a page between two versions
+
+    Returns:
+        tuple: (removed_lines, added_lines, change_ratio) where change_ratio is the
+               share of characters of both versions that changed
+    """
+    old_lines = old_text.splitlines()
+    new_lines = new_text.splitlines()
+    removed, added = [], []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.extend(old_lines[i1:i2])
+        if tag in ("replace", "insert"):
+            added.extend(new_lines[j1:j2])
+    changed = sum(len(line) for line in removed) + sum(len(line) for line in added)
+    total = len(old_text) + len(new_text)
+    return removed, added, (changed / total if total else 0.0)
+
+
+class SummaryIndex:
+    """
+    SQLite index of summarized pages by canonical URL and SimHash fingerprint
+
+    A page is first looked up by its canonical URL (unique index); other URLs
+    are only searched for identical or near-identical texts with the same title.
+
+    Fingerprints are split into BANDS bands stored in indexed columns, so
+    near-duplicates (Hamming distance below BANDS) are found with an indexed
+    lookup instead of a scan. The page text is kept compressed so a changed
+    page can be summarized incrementally from the diff.
+    """
+
+    def __init__(self, path, max_distance=None, max_entries=None, min_words=None, enabled=True):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+            max_distance (int, optional): Maximum Hamming distance (bits of 64) for a near-duplicate
+            max_entries (int, optional): Oldest entries beyond this count are removed
+            min_words (int, optional): Minimum words of a text to index it and reuse its summary across URLs
+            enabled (bool, optional): When False lookups always miss and nothing is stored
+        """
+        self.path = path
+        self.max_distance = config.DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+        self.max_entries = config.DEDUP_MAX_ENTRIES if max_entries is None else max_entries
+        self.min_words = config.DEDUP_MIN_WORDS if min_words is None else min_words
+        self.enabled = enabled
+        self.counts = {EXACT: 0, NEAR: 0, UPDATED: 0, "misses": 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            band_columns = ", ".join(f"band{i} INTEGER NOT NULL" for i in range(BANDS))
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    id INTEGER PRIMARY KEY,
+                    canonical_url TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    fingerprint INTEGER NOT NULL,
+                    {band_columns},
+                    text_hash TEXT NOT NULL,
+                    text BLOB NOT NULL,
+                    title TEXT,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (canonical_url, model)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_hash ON summaries(model, text_hash)")
+            for band in range(BANDS):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_summaries_band{band} ON summaries(model, band{band})")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Una conexión por operación: sqlite3 no comparte conexiones entre hilos
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, kind):
+        with self._lock:
+            self.counts[kind] += 1
+
+    def find(self, url, model, text, title=None):
+        """
+        Look up a previous summary of the same or a near-identical page
+
+        The stored version of the same canonical URL is returned first, whatever
+        the distance: the caller decides from text_changes() whether to serve,
+        update or discard it. Summaries of other URLs are only reused for texts
+        of at least ``min_words`` words with the same title, identical or within
+        ``max_distance`` bits, so short boilerplate ("enable JavaScript",
+        cookie walls...) shared by unrelated sites never matches.
+
+        Returns:
+            dict: {"match": "exact" | "near", "distance", "canonical_url", "title",
+                   "summary", "text", "same_url"} or None if no similar page was summarized
+        """
+        if not self.enabled or not text:
+            return None
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        columns = "canonical_url, title, summary, text, fingerprint, text_hash"
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {columns} FROM summaries WHERE canonical_url = ? AND model = ?",
+                (canonicalize_url(url), model),
+            ).fetchone()
+            if row is not None:
+                if row[5] == text_hash:
+                    return self._match(EXACT, 0, row, same_url=True)
+                return self._match(NEAR, hamming(simhash(text), _to_unsigned(row[4])), row, same_url=True)
+
+            if len(_WORD.findall(text)) < self.min_words:
+                return None
+            row = conn.execute(
+                f"SELECT {columns} FROM summaries WHERE model = ? AND text_hash = ? AND title IS ? LIMIT 1",
+                (model, text_hash, title),
+            ).fetchone()
+            if row is not None:
+                return self._match(EXACT, 0, row)
+            fingerprint = simhash(text)
+            band_filter = " OR ".join(f"band{i} = ?" for i in range(BANDS))
+            candidates = conn.execute(
+                f"SELECT {columns} FROM summaries WHERE model = ? AND title IS ? AND ({band_filter})",
+                (model, title, *_bands(fingerprint)),
+            ).fetchall()
+
+        best = None
+        for candidate in candidates:
+            distance = hamming(fingerprint, _to_unsigned(candidate[4]))
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, candidate)
+        if best is None:
+            return None
+        return self._match(NEAR, best[0], best[1])
+
+    @staticmethod
+    def _match(kind, distance, row, same_url=False):
+        return {
+            "match": kind,
+            "same_url": same_url,
+            "distance": distance,
+            "canonical_url": row[0],
+            "title": row[1],
+            "summary": row[2],
+            "text": zlib.decompress(row[3]).decode("utf-8"),
+        }
+
+    def record(self, kind):
+        """
+        Count the outcome of a lookup: "exact", "near", "updated" or "misses"
+        """
+        self._count(kind)
+
+    def store(self, url, model, text, summary, title=None):
+        """
+        Save (or replace) the summary of a page
+
+        Texts shorter than ``min_words`` words are not indexed: they are cheap to
+        summarize again and are often placeholders shared by unrelated pages.
+        """
+        if not self.enabled or not text or not summary or len(_WORD.findall(text)) < self.min_words:
+            return
+        fingerprint = simhash(text)
+        with self._connect() as conn:
+            bands = ", ".join(f"band{i}" for i in range(BANDS))
+            conn.execute(
+                f"INSERT OR REPLACE INTO summaries (canonical_url, model, fingerprint, {bands}, "
+                f"text_hash, text, title, summary, created_at) VALUES ({', '.join('?' * (BANDS + 8))})",
+                (canonicalize_url(url), model, _to_signed(fingerprint), *_bands(fingerprint),
+                 hashlib.sha256(text.encode("utf-8")).hexdigest(), zlib.compress(text.encode("utf-8")),
+                 title, summary, time.time()),
+            )
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM summaries WHERE id IN (SELECT id FROM summaries ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM summaries")
+        with self._lock:
+            self.counts = dict.fromkeys(self.counts, 0)
+
+    def stats(self):
+        """
+        Return lookup outcomes, hit rate and number of indexed pages
+        """
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        with self._lock:
+            counts = dict(self.counts)
+        hits = counts[EXACT] + counts[NEAR] + counts[UPDATED]
+        lookups = hits + counts["misses"]
+        return dict(counts, enabled=self.enabled, entries=entries, hit_rate=hits / lookups if lookups else 0.0)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Return the process-wide SummaryIndex configured from config.py
+
+    Returns:
+        SummaryIndex: The shared index, or None if the store could not be opened
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = SummaryIndex(config.DEDUP_PATH, enabled=config.DEDUP_ENABLED)
+            except (OSError, sqlite3.Error):
+                return None
+        return _index
@@ -0,0 +1,365 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    # requests/urllib3 descomprimen gzip y deflate (y br/zstd si las librerías están instaladas)
+    "Accept-Encoding": requests.utils.DEFAULT_ACCEPT_ENCODING,
+}
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class FetchError(Exception):
+    """
+    Raised when a page cannot be downloaded (HTTP error, timeout, size limit...)
+    """
+
+
+class FetchResult:
+    """
+    Downloaded page
+
+    Attributes:
+        url (str): Final URL after redirects
+        status_code (int): HTTP status of the original response (200 even when revalidated with a 304)
+        content (bytes): Response body
+        headers (dict): Response headers
+        encoding (str): Declared encoding, if any
+        from_cache (bool): True if the body was served from the page cache
+        revalidated (bool): True if the server answered 304 Not Modified
+        elapsed (float): Seconds spent in the fetch
+    """
+
+    def __init__(self, url, status_code, content, headers, encoding=None,
+                 from_cache=False, revalidated=False, elapsed=0.0):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+        self.elapsed = elapsed
+
+
+class PageCache:
+    """
+    On-disk cache of HTTP responses used for conditional requests
+
+    Only responses carrying an ETag or Last-Modified validator are stored:
+    they are revalidated with If-None-Match / If-Modified-Since and the body
+    is reused when the server answers 304 Not Modified. The least recently
+    used pages are evicted when the store grows above ``max_bytes``.
+    """
+
+    def __init__(self, path, max_bytes=None):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+            max_bytes (int, optional): Maximum total size of the stored bodies
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    final_url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    headers TEXT NOT NULL,
+                    encoding TEXT,
+                    content BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Una conexión por operación: sqlite3 no comparte conexiones entre hilos
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, url):
+        """
+        Return the cached entry for a URL as a dict, or None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT final_url, etag, last_modified, headers, encoding, content FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "final_url": row[0],
+            "etag": row[1],
+            "last_modified": row[2],
+            "headers": json.loads(row[3]),
+            "encoding": row[4],
+            "content": row[5],
+        }
+
+    def touch(self, url, headers=None):
+        """
+        Mark an entry as recently used (after a successful revalidation)
+
+        Args:
+            url (str): Requested URL
+            headers (dict, optional): Headers of the 304 response; new validators replace the stored ones
+        """
+        headers = headers or {}
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (now, now, headers.get("ETag"), headers.get("Last-Modified"), url),
+            )
+
+    def delete(self, url):
+        """
+        Remove the stored page of a URL, if any
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+
+    def set(self, url, result):
+        """
+        Store a FetchResult if it carries a validator
+
+        Otherwise the previous entry of the URL is removed: its validators and
+        body no longer describe the page.
+        """
+        etag = result.headers.get("ETag")
+        last_modified = result.headers.get("Last-Modified")
+        if (not etag and not last_modified) or "no-store" in result.headers.get("Cache-Control", ""):
+            self.delete(url)
+            return
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, final_url, etag, last_modified, headers, encoding, content, size, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, result.url, etag, last_modified, json.dumps(dict(result.headers)), result.encoding,
+                 sqlite3.Binary(result.content), len(result.content), now, now),
+            )
+        self.evict()
+
+    def evict(self):
+        """
+        Drop the least recently used pages until the store fits in max_bytes
+        """
+        if self.max_bytes is None:
+            return 0
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            excess = total - self.max_bytes
+            victims = []
+            for url, size in conn.execute("SELECT url, size FROM pages ORDER BY last_access"):
+                victims.append((url,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM pages WHERE url = ?", victims)
+        return len(victims)
+
+    def clear(self):
+        """
+        Remove every stored page
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages")
+
+
+class Fetcher:
+    """
+    HTTP client shared by every Website
+
+    Keeps a pooled ``requests.Session`` (connection reuse across requests),
+    enforces connect/read/total timeouts and a maximum body size while
+    streaming the download, and revalidates cached pages with conditional
+    requests.
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, total_timeout=None,
+                 max_bytes=None, pool_size=None, retries=None, cache=None):
+        """
+        Args:
+            connect_timeout (float, optional): Seconds to establish the connection
+            read_timeout (float, optional): Seconds to wait between bytes
+            total_timeout (float, optional): Maximum seconds for the whole download
+            max_bytes (int, optional): Maximum body size; larger pages raise FetchError
+            pool_size (int, optional): Connections kept per host
+            retries (int, optional): Retries on connection errors and 502/503/504
+            cache (PageCache, optional): Page cache for conditional requests
+        """
+        self.connect_timeout = connect_timeout if connect_timeout is not None else config.FETCH_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout if read_timeout is not None else config.FETCH_READ_TIMEOUT
+        self.total_timeout = total_timeout if total_timeout is not None else config.FETCH_TOTAL_TIMEOUT
+        self.max_bytes = max_bytes if max_bytes is not None else config.FETCH_MAX_BYTES
+        self.cache = cache
+
+        pool_size = pool_size if pool_size is not None else config.FETCH_POOL_SIZE
+        retries = retries if retries is not None else config.FETCH_RETRIES
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+
+    def fetch(self, url, headers=None):
+        """
+        Download a page
+
+        Args:
+            url (str): URL to download
+            headers (dict, optional): Extra HTTP headers (override the defaults)
+
+        Returns:
+            FetchResult: The downloaded (or revalidated) page
+
+        Raises:
+            FetchError: On HTTP errors, timeouts or when the body exceeds max_bytes
+        """
+        started_at = time.perf_counter()
+        request_headers = dict(headers or {})
+
+        cached = self.cache.get(url) if self.cache else None
+        if cached:
+            if cached["etag"]:
+                request_headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                request_headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            response = self.session.get(
+                url,
+                headers=request_headers,
+                timeout=(self.connect_timeout, self.read_timeout),
+                stream=True,
+            )
+        except requests.RequestException as e:
+            raise FetchError(str(e)) from e
+
+        with response:
+            if response.status_code == 304 and cached:
+                self.cache.touch(url, response.headers)
+                return FetchResult(
+                    cached["final_url"], 200, cached["content"], cached["headers"], cached["encoding"],
+                    from_cache=True, revalidated=True, elapsed=time.perf_counter() - started_at,
+                )
+
+            try:
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                raise FetchError(str(e)) from e
+
+            declared_length = response.headers.get("Content-Length")
+            if declared_length and declared_length.isdigit() and int(declared_length) > self.max_bytes:
+                raise FetchError(f"La página excede el tamaño máximo permitido ({self.max_bytes} bytes)")
+
+            content = self._read_body(response, started_at)
+
+        result = FetchResult(
+            response.url, response.status_code, content, dict(response.headers), response.encoding,
+            elapsed=time.perf_counter() - started_at,
+        )
+        if self.cache:
+            self.cache.set(url, result)
+        return result
+
+    def _read_body(self, response, started_at):
+        """
+        Stream the body enforcing max_bytes and total_timeout
+        """
+        chunks = []
+        size = 0
+        try:
+            for chunk in _iter_body(response):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise FetchError(f"La página excede el tamaño máximo permitido ({self.max_bytes} bytes)")
+                if time.perf_counter() - started_at > self.total_timeout:
+                    raise FetchError(f"La descarga superó el tiempo máximo de {self.total_timeout:g} s")
+                chunks.append(chunk)
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            raise FetchError(str(e)) from e
+        return b"".join(chunks)
+
+
+def _iter_body(response):
+    """
+    Yield the (decompressed) body as it arrives
+
+    iter_content() waits until a whole block is filled, so a server trickling
+    the body would only be checked against total_timeout at the end; read1()
+    returns whatever is available (urllib3 >= 2.1).
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        yield from response.iter_content(chunk_size=_CHUNK_SIZE)
+        return
+    while True:
+        chunk = read1(_CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """
+    Return the process-wide Fetcher configured from config.py
+    """
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            cache = None
+            if config.PAGE_CACHE_ENABLED:
+                try:
+                    cache = PageCache(config.PAGE_CACHE_PATH, max_bytes=config.PAGE_CACHE_MAX_BYTES)
+                except (OSError, sqlite3.Error):
+                    cache = None
+            _fetcher = Fetcher(cache=cache)
+        return _fetcher
@@ -0,0 +1,274 @@
+import re
+from html.parser import HTMLParser
+
+import config
+
+# Elementos que generalmente no contienen contenido relevante para un resumen
+IRRELEVANT_TAGS = ("script", "style", "img", "input", "nav", "footer")
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_\-]+)""", re.IGNORECASE)
+
+
+def charset_from_content_type(content_type):
+    """
+    Return the charset declared in a Content-Type header, or None
+    """
+    if not content_type:
+        return None
+    match = re.search(r"charset\s*=\s*[\"']?([^\s;\"']+)", content_type, re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def _document_encoding(content, encoding=None):
+    """
+    Encoding of an HTML body: the declared one, the <meta charset> or UTF-8
+    """
+    if encoding is None:
+        match = _META_CHARSET.search(content[:4096])
+        if match:
+            encoding = match.group(1).decode("ascii")
+    return encoding or "utf-8"
+
+
+def decode_html(content, encoding=None):
+    """
+    Decode an HTML body using the declared encoding, the <meta charset> or UTF-8
+
+    Args:
+        content (bytes): Raw HTML
+        encoding (str, optional): Encoding declared by the server
+
+    Returns:
+        str: Decoded HTML (undecodable bytes are replaced)
+    """
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode(_document_encoding(content, encoding), errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+
+def _join_lines(fragments):
+    """
+    Join text fragments one per line, dropping whitespace-only ones (None if nothing is left)
+    """
+    lines = []
+    for fragment in fragments:
+        for line in fragment.splitlines():
+            line = line.strip()
+            if line:
+                lines.append(line)
+    return "\n".join(lines) or None
+
+
+# --- Backends ---
+# Cada backend recibe (content, encoding) y retorna {"title": str|None, "text": str|None}.
+# "text" es el texto de <body> o, si el documento no lo tiene (p.ej. un fragmento), el de todo
+# el documento salvo <head>; es None solo cuando no queda texto. Todos los backends deben
+# entregar el mismo resultado (ver tests/test_html_extract.py).
+
+def extract_bs4(content, encoding=None):
+    """
+    BeautifulSoup + html.parser backend (pure Python; the original implementation)
+    """
+    from bs4 import BeautifulSoup
+
+    # Misma detección de la codificación que los demás backends (no la heurística de bs4)
+    soup = BeautifulSoup(content, "html.parser",
+                         from_encoding=_document_encoding(content, encoding) if isinstance(content, bytes) else None)
+    title = soup.title.get_text().strip() if soup.title else None
+    root = soup.body or soup
+    for irrelevant in root(list(IRRELEVANT_TAGS) + ([] if soup.body else ["head", "title"])):
+        irrelevant.decompose()
+    return {"title": title, "text": _join_lines([root.get_text(separator="\n")])}
+
+
+def extract_lxml(content, encoding=None):
+    """
+    lxml backend (libxml2 HTML parser, C speed)
+    """
+    import lxml.html
+    from lxml import etree
+
+    if not content.strip():
+        return {"title": None, "text": None}
+    if isinstance(content, bytes):
+        # Sin codificación declarada libxml2 asume latin-1; se usa la misma detección que los demás
+        parser = lxml.html.HTMLParser(encoding=_document_encoding(content, encoding))
+        document = lxml.html.document_fromstring(content, parser=parser)
+    else:
+        document = lxml.html.document_fromstring(content)
+    title_element = document.find(".//title")
+    title = title_element.text_content().strip() if title_element is not None else None
+    body = document.find("body")
+    if body is None:
+        body = document
+        etree.strip_elements(body, "head", "title", with_tail=False)
+    etree.strip_elements(body, etree.Comment, etree.ProcessingInstruction, *IRRELEVANT_TAGS, with_tail=False)
+    return {"title": title, "text": _join_lines(body.itertext())}
+
+
+def extract_selectolax(content, encoding=None):
+    """
+    selectolax backend (lexbor HTML5 parser, the fastest option)
+    """
+    try:
+        from selectolax.lexbor import LexborHTMLParser as FastHTMLParser
+    except ImportError:
+        from selectolax.parser import HTMLParser as FastHTMLParser
+
+    tree = FastHTMLParser(decode_html(content, encoding))
+    title_node = tree.css_first("title")
+    title = title_node.text(strip=True) if title_node is not None else None
+    tree.strip_tags(list(IRRELEVANT_TAGS))
+    # El parser HTML5 siempre crea <body>, también para fragmentos
+    root = tree.body if tree.body is not None else tree.root
+    text = root.text(separator="\n", strip=True) if root is not None else ""
+    return {"title": title, "text": _join_lines([text])}
+
+
+class _TextCollector(HTMLParser):
+    """
+    Single-pass HTML tokenizer that keeps only the title and the body text
+
+    No tree is built: text inside irrelevant elements is skipped by tracking
+    how deep we are inside them. Like an HTML5 parser, text outside <head>
+    counts as body text even when the document has no <body> tag.
+    """
+
+    _SKIP_CONTENT = frozenset(IRRELEVANT_TAGS)
+    # Elementos que pueden ir en <head>; cualquier otro inicia el cuerpo implícito
+    _HEAD_TAGS = frozenset(("head", "title", "meta", "link", "style", "script", "base", "noscript", "template"))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title_parts = []
+        self.text_parts = []
+        self.has_title = False
+        self._in_title = False
+        self._in_head = False
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "head":
+            self._in_head = True
+        elif tag not in self._HEAD_TAGS:
+            self._in_head = False
+        if tag == "title":
+            self._in_title = True
+            self.has_title = True
+        elif tag in self._SKIP_CONTENT and tag not in ("img", "input"):
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self._in_head = False
+        elif tag == "title":
+            self._in_title = False
+        elif tag in self._SKIP_CONTENT and tag not in ("img", "input") and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+        elif not self._in_head and not self._skip_depth:
+            self.text_parts.append(data)
+
+
+def extract_stream(content, encoding=None):
+    """
+    Streaming stdlib backend: no dependencies and no tree, low memory
+    """
+    collector = _TextCollector()
+    collector.feed(decode_html(content, encoding))
+    collector.close()
+    title = "".join(collector.title_parts).strip() if collector.has_title else None
+    return {"title": title, "text": _join_lines(collector.text_parts)}
+
+
+BACKENDS = {
+    "selectolax": extract_selectolax,
+    "lxml": extract_lxml,
+    "stream": extract_stream,
+    "bs4": extract_bs4,
+}
+
+# Orden de preferencia para "auto": el más rápido disponible primero
+_AUTO_ORDER = ("selectolax", "lxml", "stream")
+
+_REQUIRED_MODULE = {"selectolax": "selectolax", "lxml": "lxml", "bs4": "bs4"}
+
+
+def register_backend(name, func):
+    """
+    Register a custom extraction backend
+
+    Args:
+        name (str): Backend name, usable in extract(..., backend=name)
+        func (callable): func(content, encoding) -> {"title": str|None, "text": str|None}
+    """
+    BACKENDS[name] = func
+
+
+def is_available(name):
+    """
+    Check whether a backend can be used (its optional dependency is installed)
+    """
+    if name not in BACKENDS:
+        return False
+    module = _REQUIRED_MODULE.get(name)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def available_backends():
+    """
+    Return the names of the backends usable in this environment
+    """
+    return [name for name in BACKENDS if is_available(name)]
+
+
+def resolve_backend(name=None):
+    """
+    Resolve a backend name ("auto" or None picks the fastest available one)
+    """
+    name = name or config.HTML_BACKEND
+    if name == "auto":
+        for candidate in _AUTO_ORDER:
+            if is_available(candidate):
+                return candidate
+        return "bs4"
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de extracción desconocido: {name}")
+    return name
+
+
+def extract(content, encoding=None, backend=None):
+    """
+    Extract the title and the readable body text of an HTML document
+
+    Args:
+        content (bytes or str): Raw HTML
+        encoding (str, optional): Encoding declared by the server
+        backend (str, optional): Backend name; defaults to config.HTML_BACKEND
+
+    Returns:
+        dict: {"title": str|None, "text": str|None, "backend": str}
+    """
+    name = resolve_backend(backend)
+    try:
+        result = BACKENDS[name](content, encoding)
+    except Exception:
+        if name == "bs4":
+            raise
+        # Fallback al camino original si el backend rápido falla con este documento
+        name = "bs4"
+        result = extract_bs4(content, encoding)
+    result["backend"] = name
+    return result
@@ -0,0 +1,340 @@
+import contextlib
+import copy
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+import config
+from metrics import record_error
+from stats import compute_dataset_stats
+
+UNCHANGED = "unchanged"
+APPENDED = "appended"
+
+# Versiones anteriores del mismo esquema que se comparan con un archivo subido
+MAX_CANDIDATES = 20
+
+
+def schema_hash(df: pd.DataFrame):
+    """
+    Hash of the column names (in order) of a DataFrame
+    """
+    return hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8")).hexdigest()
+
+
+def row_hashes(df: pd.DataFrame):
+    """
+    One 64-bit hash per row (pd.util.hash_pandas_object, without the index)
+
+    Numeric columns are hashed as float64: optimize_dtypes() may pick int8 for
+    yesterday's export and int16 for today's, and the rows must hash the same.
+    Text is hashed the same whether it was read as a category or as strings.
+
+    Returns:
+        np.ndarray: uint64 array with len(df) hashes
+    """
+    numeric = {c: "float64" for c in df.columns if pd.api.types.is_numeric_dtype(df[c].dtype)}
+    # Factorizar el texto (categorize=True) solo cambia el resultado si hay nulos, y es
+    # lento con columnas de valores únicos como los ID
+    text = [c for c in df.columns if c not in numeric and not isinstance(df[c].dtype, pd.CategoricalDtype)]
+    categorize = any(df[c].hasnans for c in text)
+    return pd.util.hash_pandas_object(df.astype(numeric), index=False, categorize=categorize).to_numpy()
+
+
+def prefix_hash(hashes, rows):
+    """
+    Hash of the first ``rows`` row hashes: identifies a version of a dataset
+    """
+    return hashlib.sha256(hashes[:rows].tobytes()).hexdigest()
+
+
+class DatasetStore:
+    """
+    SQLite store of the aggregates and summaries of analyzed datasets
+
+    Each version of a dataset is keyed by the hash of its columns and the hash
+    of all its rows. A new upload whose first N rows hash like a stored version
+    of N rows is that version with rows appended: only the new rows need
+    statistics (DatasetStats are merged) and the stored summary can be updated
+    instead of written from scratch.
+    """
+
+    def __init__(self, path, max_entries=None, enabled=True):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+            max_entries (int, optional): Oldest dataset versions beyond this count are removed
+            enabled (bool, optional): When False lookups always miss and nothing is stored
+        """
+        self.path = path
+        self.max_entries = config.INCREMENTAL_MAX_ENTRIES if max_entries is None else max_entries
+        self.enabled = enabled
+        self.counts = {UNCHANGED: 0, APPENDED: 0, "misses": 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS datasets (
+                    schema_hash TEXT NOT NULL,
+                    prefix_hash TEXT NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    stats BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (schema_hash, prefix_hash)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_datasets_rows ON datasets(schema_hash, row_count)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS summaries (
+                    schema_hash TEXT NOT NULL,
+                    prefix_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (schema_hash, prefix_hash, model)
+                )
+                """
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Una conexión por operación: sqlite3 no comparte conexiones entre hilos
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, kind):
+        """
+        Count the outcome of a lookup: "unchanged", "appended" or "misses"
+        """
+        with self._lock:
+            self.counts[kind] += 1
+
+    def find(self, schema, hashes):
+        """
+        Look up the longest stored version that is a prefix of the given rows
+
+        Args:
+            schema (str): schema_hash() of the upload
+            hashes (np.ndarray): row_hashes() of the upload
+
+        Returns:
+            dict: {"prefix_hash", "rows", "stats"} or None if no stored version matches
+        """
+        if not self.enabled or not len(hashes):
+            return None
+        with self._connect() as conn:
+            candidates = conn.execute(
+                "SELECT prefix_hash, row_count FROM datasets WHERE schema_hash = ? AND row_count <= ? "
+                "ORDER BY row_count DESC, created_at DESC LIMIT ?",
+                (schema, len(hashes), MAX_CANDIDATES),
+            ).fetchall()
+        for stored_prefix, rows in candidates:
+            if prefix_hash(hashes, rows) != stored_prefix:
+                continue
+            with self._connect() as conn:
+                row = conn.execute("SELECT stats FROM datasets WHERE schema_hash = ? AND prefix_hash = ?",
+                                   (schema, stored_prefix)).fetchone()
+            if row is not None:
+                return {"prefix_hash": stored_prefix, "rows": rows, "stats": pickle.loads(row[0])}
+        return None
+
+    def save_stats(self, schema, prefix, rows, stats):
+        """
+        Save (or refresh) the aggregates of a dataset version
+        """
+        if not self.enabled or not rows:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO datasets (schema_hash, prefix_hash, row_count, stats, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (schema, prefix, rows, pickle.dumps(stats, protocol=pickle.HIGHEST_PROTOCOL), time.time()),
+            )
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM datasets WHERE rowid IN "
+                    "(SELECT rowid FROM datasets ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                conn.execute(
+                    "DELETE FROM summaries WHERE NOT EXISTS (SELECT 1 FROM datasets d WHERE "
+                    "d.schema_hash = summaries.schema_hash AND d.prefix_hash = summaries.prefix_hash)"
+                )
+
+    def summary(self, schema, prefix, model):
+        """
+        Return the stored summary of a dataset version by a model, or None
+        """
+        if not self.enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary FROM summaries WHERE schema_hash = ? AND prefix_hash = ? AND model = ?",
+                (schema, prefix, model),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def save_summary(self, schema, prefix, model, summary):
+        """
+        Save (or replace) the summary of a dataset version by a model
+        """
+        if not self.enabled or not summary:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (schema_hash, prefix_hash, model, summary, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (schema, prefix, model, summary, time.time()),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM summaries")
+            conn.execute("DELETE FROM datasets")
+        with self._lock:
+            self.counts = dict.fromkeys(self.counts, 0)
+
+    def stats(self):
+        """
+        Return lookup outcomes, reuse rate and number of stored dataset versions
+        """
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM datasets").fetchone()[0]
+        with self._lock:
+            counts = dict(self.counts)
+        hits = counts[UNCHANGED] + counts[APPENDED]
+        lookups = hits + counts["misses"]
+        return dict(counts, enabled=self.enabled, entries=entries, hit_rate=hits / lookups if lookups else 0.0)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Return the process-wide DatasetStore configured from config.py
+
+    Returns:
+        DatasetStore: The shared store, or None if it could not be opened
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = DatasetStore(config.INCREMENTAL_PATH, enabled=config.INCREMENTAL_ENABLED)
+            except (OSError, sqlite3.Error):
+                return None
+        return _store
+
+
+def compute_stats_incrementally(df: pd.DataFrame, store=None):
+    """
+    Compute the DatasetStats of df reusing the aggregates of a previous version
+
+    If the upload is a stored version with rows appended, statistics are
+    computed only over the new rows (with the stored column roles) and merged
+    into the stored ones; an identical upload reuses them as they are. The
+    result is saved as the newest version either way.
+
+    Args:
+        df (pd.DataFrame): The uploaded data
+        store (DatasetStore, optional): Defaults to get_store()
+
+    Returns:
+        tuple: (stats, dataset) where dataset describes the version: "schema_hash",
+               "prefix_hash", "rows", "match" ("unchanged", "appended" or None),
+               "previous_prefix", "previous_rows", "previous_stats" and "delta"
+               (the statistics of the new rows). dataset is None without a store.
+    """
+    store = get_store() if store is None else store
+    if store is None or not store.enabled:
+        return compute_dataset_stats(df), None
+
+    schema = schema_hash(df)
+    hashes = row_hashes(df)
+    dataset = {"schema_hash": schema, "prefix_hash": prefix_hash(hashes, len(df)), "rows": len(df), "match": None,
+               "previous_prefix": None, "previous_rows": 0, "previous_stats": None, "delta": None}
+    try:
+        previous = store.find(schema, hashes)
+    except Exception as e:
+        record_error("incremental", e)
+        previous = None
+
+    if previous is None:
+        store.record("misses")
+        stats = compute_dataset_stats(df)
+    elif previous["rows"] == len(df):
+        store.record(UNCHANGED)
+        stats = previous["stats"]
+        dataset.update(match=UNCHANGED, previous_prefix=previous["prefix_hash"], previous_rows=previous["rows"],
+                       previous_stats=previous["stats"])
+    else:
+        store.record(APPENDED)
+        delta = compute_dataset_stats(df.iloc[previous["rows"]:], roles=previous["stats"].roles)
+        stats = copy.deepcopy(previous["stats"]).merge(delta)
+        dataset.update(match=APPENDED, previous_prefix=previous["prefix_hash"], previous_rows=previous["rows"],
+                       previous_stats=previous["stats"], delta=delta)
+
+    try:
+        store.save_stats(schema, dataset["prefix_hash"], len(df), stats)
+    except Exception as e:
+        record_error("incremental", e)
+    return stats, dataset
+
+
+def find_summary(dataset, model, previous=False):
+    """
+    Stored summary of the dataset version (or of the previous one) by a model
+
+    Returns:
+        str: The summary, or None if there is none (or the store is unavailable)
+    """
+    store = get_store()
+    prefix = dataset["previous_prefix"] if previous else dataset["prefix_hash"]
+    if store is None or prefix is None:
+        return None
+    try:
+        return store.summary(dataset["schema_hash"], prefix, model)
+    except Exception as e:
+        record_error("incremental", e)
+        return None
+
+
+def store_summary(dataset, model, summary):
+    """
+    Save a finished summary of the dataset version so later uploads can update it
+    """
+    store = get_store()
+    if store is None:
+        return
+    try:
+        store.save_summary(dataset["schema_hash"], dataset["prefix_hash"], model, summary)
+    except Exception as e:
+        record_error("incremental", e)
+
+
+def describe(dataset):
+    """
+    Public part of a dataset description: {"match", "previous_rows", "new_rows"} or None
+    """
+    if dataset is None:
+        return None
+    return {"match": dataset["match"], "previous_rows": dataset["previous_rows"],
+            "new_rows": dataset["rows"] - dataset["previous_rows"] if dataset["match"] else dataset["rows"]}
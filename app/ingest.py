@@ -0,0 +1,238 @@
+import csv
+import os
+
+import pandas as pd
+
+from stats import compute_dataset_stats
+
+# Bytes leídos para detectar separador y codificación
+SNIFF_BYTES = 64 * 1024
+CSV_DELIMITERS = ",;\t|"
+
+# Columnas de texto con menos de esta proporción de valores distintos se convierten a 'category'
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def file_name(source):
+    """
+    Name of an uploaded file or path (used to pick the reader by extension)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, "name", "") or ""
+
+
+def _rewind(source):
+    """
+    Return a readable object positioned at the start, without copying the content
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    source.seek(0)
+    return source
+
+
+def _read_prefix(source, size=SNIFF_BYTES):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(size)
+    source.seek(0)
+    prefix = source.read(size)
+    source.seek(0)
+    return prefix
+
+
+def sniff_csv(source):
+    """
+    Detect encoding and delimiter of a CSV from a small prefix
+
+    Args:
+        source: Path or binary file-like object (e.g. Streamlit's UploadedFile)
+
+    Returns:
+        tuple: (delimiter, encoding)
+    """
+    prefix = _read_prefix(source)
+
+    if prefix.startswith(b"\xef\xbb\xbf"):
+        encoding = "utf-8-sig"
+    else:
+        encoding = "utf-8"
+        try:
+            prefix.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # Un carácter multibyte cortado al final del prefijo no invalida el UTF-8
+            if e.start < len(prefix) - 4:
+                encoding = "latin-1"
+    text = prefix.decode(encoding, errors="ignore")
+
+    # Descartar la última línea, probablemente incompleta
+    sample = text if len(prefix) < SNIFF_BYTES else text[:text.rfind("\n")]
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        first_line = sample.split("\n", 1)[0]
+        delimiter = max(CSV_DELIMITERS, key=first_line.count)
+    return delimiter, encoding
+
+
+def optimize_dtypes(df: pd.DataFrame):
+    """
+    Convert columns to compact dtypes
+
+    Integers are downcast to the smallest type that fits and text columns
+    with few distinct values become categoricals. Floats are kept as float64
+    so monetary sums do not lose precision.
+
+    Returns:
+        pd.DataFrame: The converted DataFrame
+    """
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            non_null = series.count()
+            if non_null and series.nunique() / non_null < CATEGORY_MAX_RATIO:
+                df[column] = series.astype("category")
+    return df
+
+
+def read_csv_fast(source, delimiter=None, encoding=None, **kwargs):
+    """
+    Read a whole CSV using the fastest engine available
+
+    The delimiter is sniffed on a small prefix so the C / pyarrow engines can
+    be used instead of the slow ``sep=None, engine='python'`` path.
+
+    Args:
+        source: Path or binary file-like object
+        delimiter (str, optional): Field separator; sniffed if omitted
+        encoding (str, optional): Text encoding; sniffed if omitted
+
+    Returns:
+        pd.DataFrame: The parsed data
+    """
+    if delimiter is None or encoding is None:
+        sniffed_delimiter, sniffed_encoding = sniff_csv(source)
+        delimiter = delimiter or sniffed_delimiter
+        encoding = encoding or sniffed_encoding
+
+    if _has_pyarrow() and not kwargs:
+        try:
+            return pd.read_csv(_rewind(source), sep=delimiter, encoding=encoding, engine="pyarrow")
+        except Exception:
+            pass  # filas mal formadas, etc.: se reintenta con el motor C, más tolerante
+    return pd.read_csv(_rewind(source), sep=delimiter, encoding=encoding, engine="c",
+                       on_bad_lines="warn", low_memory=False, **kwargs)
+
+
+def iter_csv_chunks(source, chunksize=200_000, delimiter=None, encoding=None):
+    """
+    Read a CSV in chunks of ``chunksize`` rows with the C engine
+
+    Yields:
+        pd.DataFrame: Consecutive chunks
+    """
+    if delimiter is None or encoding is None:
+        sniffed_delimiter, sniffed_encoding = sniff_csv(source)
+        delimiter = delimiter or sniffed_delimiter
+        encoding = encoding or sniffed_encoding
+    reader = pd.read_csv(_rewind(source), sep=delimiter, encoding=encoding, engine="c",
+                         on_bad_lines="warn", chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def iter_parquet_chunks(source, chunksize=200_000):
+    """
+    Read a Parquet file in record batches (requires pyarrow)
+
+    Yields:
+        pd.DataFrame: Consecutive chunks
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(_rewind(source))
+    for batch in parquet_file.iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def sheet_names(source):
+    """
+    Names of the sheets of an Excel workbook, or [None] for other formats
+    """
+    if not file_name(source).lower().endswith((".xlsx", ".xls")):
+        return [None]
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(_rewind(source), read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def read_table(source, compact=True, sheet=None):
+    """
+    Read a CSV, Excel or Parquet file into a DataFrame
+
+    Args:
+        source: Path or binary file-like object with a ``name``
+        compact (bool, optional): Apply optimize_dtypes() after reading
+        sheet (str, optional): Excel sheet to read (the first one by default)
+
+    Returns:
+        pd.DataFrame: The parsed data
+
+    Raises:
+        ValueError: If the extension is not supported
+    """
+    name = file_name(source).lower()
+    if name.endswith(".csv"):
+        df = read_csv_fast(source)
+    elif name.endswith((".xlsx", ".xls")):
+        # Leer archivo Excel (requiere openpyxl)
+        df = pd.read_excel(_rewind(source), engine="openpyxl", sheet_name=0 if sheet is None else sheet)
+    elif name.endswith(".parquet"):
+        df = pd.read_parquet(_rewind(source))
+    else:
+        raise ValueError("Formato de archivo no soportado. Por favor, sube un archivo CSV, Excel o Parquet.")
+    return optimize_dtypes(df) if compact else df
+
+
+def iter_table_chunks(source, chunksize=200_000):
+    """
+    Iterate over a CSV or Parquet file in chunks (Excel is read at once)
+
+    Yields:
+        pd.DataFrame: Consecutive chunks
+    """
+    name = file_name(source).lower()
+    if name.endswith(".csv"):
+        yield from iter_csv_chunks(source, chunksize=chunksize)
+    elif name.endswith(".parquet"):
+        yield from iter_parquet_chunks(source, chunksize=chunksize)
+    else:
+        yield read_table(source, compact=False)
+
+
+def compute_chunked_statistics(source, chunksize=200_000):
+    """
+    Compute the dataset statistics of a file without loading it all in memory
+
+    Returns:
+        DatasetStats: Statistics accumulated chunk by chunk (see stats.py)
+    """
+    return compute_dataset_stats(iter_table_chunks(source, chunksize=chunksize))
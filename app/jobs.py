@@ -0,0 +1,285 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+
+import config
+from metrics import observe_stage, registry
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity
+    """
+
+
+class Job:
+    """
+    A summarization / analysis request running in the background
+
+    ``target`` is called from a worker thread and must return a result dict
+    with a "stream" generator (summarize_website_stream,
+    analyze_dataframe_with_llm_stream). The stream is consumed by the worker,
+    so the partial text can be polled while the model is still generating.
+    """
+
+    def __init__(self, kind, key, model, target):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.model = model
+        self.target = target
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.parts = []
+        self.subscribers = 1
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def text(self):
+        """
+        Text generated so far
+        """
+        return "".join(self.parts)
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def as_dict(self):
+        now = time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "model": self.model,
+            "status": self.status,
+            "error": self.error,
+            "queued_time": (self.started_at or now) - self.created_at,
+            "run_time": ((self.finished_at or now) - self.started_at) if self.started_at else 0.0,
+        }
+
+
+class JobManager:
+    """
+    Bounded job queue served by a pool of worker threads
+
+    - At most ``max_queue`` jobs wait at a time; further submissions raise QueueFullError.
+    - At most ``model_concurrency`` jobs run at once against the same model, so
+      concurrent sessions are admitted gradually instead of piling onto Ollama.
+      Jobs wait in one queue per model and workers only take the oldest job of
+      a model with a free slot, so one model's backlog never holds every worker.
+    - Submitting a request identical to one still queued or running (same key)
+      returns the existing job instead of running it twice, unless it was cancelled.
+    - Finished jobs are kept for ``retention`` seconds so the UI can poll them.
+    """
+
+    def __init__(self, workers=None, max_queue=None, model_concurrency=None, retention=None):
+        self.workers = workers or config.JOB_WORKERS
+        self.max_queue = max_queue or config.JOB_QUEUE_SIZE
+        self.model_concurrency = model_concurrency or config.JOB_MODEL_CONCURRENCY
+        self.retention = config.JOB_RETENTION_SECONDS if retention is None else retention
+        self._jobs = {}
+        self._inflight = {}
+        # modelo -> trabajos en cola (en orden de llegada) y trabajos en ejecución
+        self._pending = {}
+        self._running = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._threads = []
+        self._sequence = itertools.count()
+
+    def _start_workers(self):
+        # Los hilos se crean con el primer trabajo, no al importar el módulo
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{next(self._sequence)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs[job_id]
+
+    def submit(self, kind, key, model, target):
+        """
+        Queue a job, or join an identical one already queued or running
+
+        Args:
+            kind (str): Type of job ("web", "data"...)
+            key (tuple): Identifies identical requests (e.g. URL, model and options)
+            model (str): Ollama model, used for the per-model concurrency limit
+            target (callable): Returns a result dict with a "stream" generator
+
+        Returns:
+            str: The job ID
+
+        Raises:
+            QueueFullError: If max_queue jobs are already waiting
+        """
+        dedup_key = (kind, model) + tuple(key)
+        with self._lock:
+            self._prune()
+            existing = self._inflight.get(dedup_key)
+            if existing is not None and not existing.finished and not existing.cancel_event.is_set():
+                registry.inc("ia_agent_jobs_deduplicated_total", kind=kind)
+                existing.subscribers += 1
+                return existing.id
+            if sum(1 for job in self._jobs.values() if job.status == QUEUED) >= self.max_queue:
+                registry.inc("ia_agent_jobs_rejected_total", kind=kind)
+                raise QueueFullError(f"Hay {self.max_queue} trabajos en espera. Inténtalo de nuevo en unos momentos.")
+            job = Job(kind, dedup_key, model, target)
+            self._jobs[job.id] = job
+            self._inflight[dedup_key] = job
+            self._pending.setdefault(model, deque()).append(job)
+            self._start_workers()
+            self._ready.notify()
+        return job.id
+
+    def get(self, job_id):
+        """
+        Return the Job with this ID, or None if it is unknown or expired
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id):
+        """
+        Number of jobs queued for the same model before this one (0 if it is not queued)
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return 0
+            return sum(1 for other in self._pending.get(job.model, ())
+                       if other.status == QUEUED and other.created_at < job.created_at)
+
+    def cancel(self, job_id):
+        """
+        Withdraw from a job; it is actually cancelled once no session is waiting for it
+
+        Returns:
+            bool: True if the job was cancelled
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.subscribers -= 1
+            if job.subscribers > 0:
+                return False
+            job.cancel_event.set()
+            # Una solicitud idéntica posterior debe iniciar otro trabajo, no unirse a este
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+            return True
+
+    def stats(self):
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            counts["workers"] = len(self._threads)
+            return counts
+
+    def _finish(self, job, status, error=None):
+        # Debe llamarse con self._lock tomado
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        registry.inc("ia_agent_jobs_total", kind=job.kind, status=status)
+        if job.started_at:
+            observe_stage("job", job.finished_at - job.started_at, kind=job.kind)
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+
+    def _next_job(self):
+        # Debe llamarse con self._lock tomado: el trabajo más antiguo de un modelo con cupo libre
+        best = None
+        for model, pending in list(self._pending.items()):
+            while pending and pending[0].finished:
+                pending.popleft()  # cancelado mientras esperaba
+            if not pending:
+                del self._pending[model]
+            elif self._running.get(model, 0) < self.model_concurrency:
+                if best is None or pending[0].created_at < best.created_at:
+                    best = pending[0]
+        if best is not None:
+            self._pending[best.model].popleft()
+            self._running[best.model] = self._running.get(best.model, 0) + 1
+        return best
+
+    def _worker(self):
+        while True:
+            with self._ready:
+                job = self._next_job()
+                while job is None:
+                    self._ready.wait()
+                    job = self._next_job()
+            try:
+                self._run(job)
+            except Exception as e:
+                with self._lock:
+                    self._finish(job, FAILED, str(e))
+            finally:
+                job.target = None
+                with self._ready:
+                    self._running[job.model] -= 1
+                    self._ready.notify_all()
+
+    def _run(self, job):
+        with self._lock:
+            if job.cancel_event.is_set():
+                return  # cancel() ya lo marcó como cancelado mientras estaba en cola
+            job.started_at = time.time()
+            job.status = RUNNING
+        observe_stage("queue", job.started_at - job.created_at, kind=job.kind)
+        result = job.target()
+        stream = result.pop("stream", None)
+        if result.get("success") and stream is not None:
+            try:
+                for part in stream:
+                    if job.cancel_event.is_set():
+                        with self._lock:
+                            self._finish(job, CANCELLED)
+                        return
+                    job.parts.append(part)
+            finally:
+                # Cierra la conexión con Ollama si el stream se abandona
+                stream.close()
+        job.result = result
+        with self._lock:
+            if result.get("success"):
+                self._finish(job, DONE)
+            else:
+                self._finish(job, FAILED, result.get("error"))
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    Return the process-wide JobManager shared by every session
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
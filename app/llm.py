@@ -0,0 +1,192 @@
+import time
+
+from llm_cache import get_cache
+from ollama_pool import get_pool
+from metrics import record_completion, record_error
+from chunking import calibrate
+
+
+def build_stats(started_at, first_token_at, finished_at, final_chunk=None):
+    """
+    Build timing statistics for a completion
+
+    Args:
+        started_at (float): perf_counter() value when the request was sent
+        first_token_at (float, optional): perf_counter() value of the first content chunk
+        finished_at (float): perf_counter() value when the response was complete
+        final_chunk (dict, optional): Last response from Ollama (carries eval_count, etc.)
+
+    Returns:
+        dict: time_to_first_token, total_time, prompt_tokens, completion_tokens,
+              tokens_per_second and Ollama's own load/prefill/generation times
+    """
+    stats = {
+        "time_to_first_token": (first_token_at - started_at) if first_token_at else None,
+        "total_time": finished_at - started_at,
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "tokens_per_second": None,
+        "load_time": None,
+        "prefill_time": None,
+        "generation_time": None,
+        "cached": False,
+    }
+    if final_chunk is not None:
+        eval_count = final_chunk.get("eval_count")
+        eval_duration = final_chunk.get("eval_duration")  # nanosegundos
+        stats["prompt_tokens"] = final_chunk.get("prompt_eval_count")
+        stats["completion_tokens"] = eval_count
+        if eval_count and eval_duration:
+            stats["tokens_per_second"] = eval_count / (eval_duration / 1e9)
+        for field, key in (("load_duration", "load_time"), ("prompt_eval_duration", "prefill_time"),
+                           ("eval_duration", "generation_time")):
+            if final_chunk.get(field):
+                stats[key] = final_chunk.get(field) / 1e9
+    return stats
+
+
+def format_error(e):
+    """
+    Return a user friendly message for an exception raised while talking to Ollama
+    """
+    import ollama
+
+    if isinstance(e, ollama.ResponseError):
+        return f"Error de Ollama ({e.status_code}): {e.error}"
+    return str(e)
+
+
+def _messages_chars(messages):
+    return sum(len(m.get("content") or "") for m in messages)
+
+
+def _cached_stats(entry, started_at):
+    """
+    Stats for a completion served from the cache: token counts come from the
+    original run, timings from the lookup itself
+    """
+    finished_at = time.perf_counter()
+    stats = dict(entry["stats"] or {})
+    stats.update({
+        "time_to_first_token": finished_at - started_at,
+        "total_time": finished_at - started_at,
+        "cached": True,
+    })
+    return stats
+
+
+def chat(model, messages, use_cache=True, options=None):
+    """
+    Run a blocking chat completion
+
+    Args:
+        model (str): Name of the Ollama model to use
+        messages (list): Message dictionaries for the Ollama API
+        use_cache (bool, optional): Look up / store the completion in the LLM cache
+        options (dict, optional): Ollama model options (num_ctx, temperature...)
+
+    Returns:
+        tuple: (content, stats) where content is the full completion text
+    """
+    started_at = time.perf_counter()
+    cache = get_cache() if use_cache else None
+    key = cache.make_key(model, messages, options) if cache else None
+    if cache:
+        entry = cache.get(key)
+        if entry is not None:
+            stats = _cached_stats(entry, started_at)
+            record_completion(model, stats)
+            return entry["content"], stats
+
+    try:
+        response = get_pool().chat(model, messages, options=options)
+    except Exception as e:
+        record_error("llm", e)
+        raise
+    finished_at = time.perf_counter()
+    content = response["message"]["content"]
+    # En modo bloqueante el primer token llega junto con la respuesta completa
+    stats = build_stats(started_at, finished_at, finished_at, response)
+    record_completion(model, stats)
+    calibrate(model, _messages_chars(messages), stats["prompt_tokens"])
+    # Una respuesta vacía o incompleta no se guarda: se serviría durante todo el TTL
+    if cache and content and response.get("done"):
+        cache.set(key, model, content, stats)
+    return content, stats
+
+
+def stream_text(text):
+    """
+    Yield an already available text as a single chunk
+
+    Served summaries use it instead of iter([text]) so consumers can close()
+    them like the streams returned by stream_chat().
+    """
+    yield text
+
+
+def stream_chat(model, messages, result, postprocess=None, use_cache=True, options=None):
+    """
+    Stream a chat completion, yielding content chunks as they arrive
+
+    The ``result`` dictionary is updated in place once the stream is exhausted:
+    ``summary`` receives the full text and ``stats`` the timing statistics.
+    Errors are stored in ``result["error"]`` (with ``success`` set to False)
+    instead of being raised, so ``st.write_stream`` can finish cleanly.
+
+    Args:
+        model (str): Name of the Ollama model to use
+        messages (list): Message dictionaries for the Ollama API
+        result (dict): Result dictionary to fill in
+        postprocess (callable, optional): Applied to the full text before storing it
+        use_cache (bool, optional): Look up / store the completion in the LLM cache
+        options (dict, optional): Ollama model options (num_ctx, temperature...)
+
+    Yields:
+        str: Content chunks
+    """
+    started_at = time.perf_counter()
+    cache = get_cache() if use_cache else None
+    key = cache.make_key(model, messages, options) if cache else None
+    entry = cache.get(key) if cache else None
+    if entry is not None:
+        # Respuesta ya calculada: se entrega completa (y ya procesada) en un solo fragmento
+        result["summary"] = postprocess(entry["content"]) if postprocess else entry["content"]
+        result["success"] = True
+        result["error"] = None
+        result["stats"] = _cached_stats(entry, started_at)
+        record_completion(model, result["stats"])
+        yield result["summary"]
+        return
+
+    parts = []
+    final_chunk = None
+    first_token_at = None
+    try:
+        for chunk in get_pool().chat(model, messages, options=options, stream=True):
+            content = chunk["message"]["content"]
+            if content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(content)
+                yield content
+            if chunk.get("done"):
+                final_chunk = chunk
+
+        summary = "".join(parts)
+        # Solo se guarda un stream completo (con el fragmento final "done") y no vacío
+        if cache and summary and final_chunk is not None:
+            cache.set(key, model, summary, build_stats(started_at, first_token_at, time.perf_counter(), final_chunk))
+        result["summary"] = postprocess(summary) if postprocess else summary
+        result["success"] = True
+        result["error"] = None
+    except Exception as e:
+        record_error("llm", e)
+        result["success"] = False
+        result["summary"] = None
+        result["error"] = format_error(e)
+    finally:
+        result["stats"] = build_stats(started_at, first_token_at, time.perf_counter(), final_chunk)
+        if final_chunk is not None:
+            record_completion(model, result["stats"])
+            calibrate(model, _messages_chars(messages), result["stats"]["prompt_tokens"])
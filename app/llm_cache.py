@@ -0,0 +1,213 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+
+class LLMCache:
+    """
+    Content-addressed on-disk cache for LLM completions backed by SQLite
+
+    Entries are keyed on a hash of the model name and the full message list
+    (system + user prompt), so identical requests are served without running
+    inference again. Expired entries (TTL) are dropped and, when the store
+    grows above ``max_bytes``, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path, ttl_seconds=None, max_bytes=None, enabled=True):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+            ttl_seconds (int, optional): Maximum age of an entry; None disables expiration
+            max_bytes (int, optional): Maximum total size of the stored completions
+            enabled (bool, optional): Bypass switch; when False get() always misses and set() is a no-op
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    stats TEXT,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions(last_access)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Una conexión por operación: sqlite3 no comparte conexiones entre hilos
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model, messages, options=None):
+        """
+        Return the cache key for a request
+
+        Args:
+            model (str): Name of the Ollama model
+            messages (list): Message dictionaries sent to the model
+            options (dict, optional): Ollama model options sent with the request
+
+        Returns:
+            str: Hex SHA-256 digest of the canonical JSON form of the request
+        """
+        request = {"model": model, "messages": [{"role": m["role"], "content": m["content"]} for m in messages]}
+        if options:
+            request["options"] = options
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a completion
+
+        Returns:
+            dict: {"content": str, "stats": dict} or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content, stats, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[2] > self.ttl_seconds:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {"content": row[0], "stats": json.loads(row[1]) if row[1] else None}
+
+    def set(self, key, model, content, stats=None):
+        """
+        Store a completion and evict old entries if needed
+        """
+        if not self.enabled:
+            return
+
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, stats, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, json.dumps(stats) if stats else None, size, now, now),
+            )
+        self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries, then the least recently used ones until the store fits in max_bytes
+
+        Returns:
+            int: Number of entries removed
+        """
+        removed = 0
+        with self._connect() as conn:
+            if self.ttl_seconds is not None:
+                removed += conn.execute(
+                    "DELETE FROM completions WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+
+            if self.max_bytes is not None:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes
+                    victims = []
+                    for key, size in conn.execute("SELECT key, size FROM completions ORDER BY last_access"):
+                        victims.append((key,))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    conn.executemany("DELETE FROM completions WHERE key = ?", victims)
+                    removed += len(victims)
+        return removed
+
+    def clear(self):
+        """
+        Remove every entry and reset the counters
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM completions")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Return hit/miss counters and store size
+        """
+        with self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide LLM cache configured from config.py
+
+    Returns:
+        LLMCache: The shared cache, or None if the store could not be opened
+                  (the app keeps working, just without caching)
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache(
+                    config.LLM_CACHE_PATH,
+                    ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+                    max_bytes=config.LLM_CACHE_MAX_BYTES,
+                    enabled=config.LLM_CACHE_ENABLED,
+                )
+            except (OSError, sqlite3.Error):
+                return None
+        return _cache
@@ -1,10 +1,21 @@
 import streamlit as st
 import pandas as pd # Añadir Pandas
 import os # Para manejo de paths
+import threading
 
 # Importar funciones de los otros módulos
-from summarizer import summarize_website # Asume que está en la carpeta app
-from data_analyzer import read_uploaded_file, analyze_dataframe_with_llm # El nuevo módulo
+from summarizer import summarize_website_stream # Asume que está en la carpeta app
+from data_analyzer import prepare_uploaded_file, analyze_dataframe_with_llm_stream # El nuevo módulo
+from multitable import needs_comparison, prepare_uploaded_files, analyze_tables_with_llm_stream
+from llm_cache import get_cache
+from memo import MemoryLRU
+from batch import summarize_urls, parse_url_list, load_sitemap_urls
+from jobs import get_job_manager, QueueFullError, QUEUED, DONE, CANCELLED
+from ollama_pool import get_pool
+from dedup import get_index as get_summary_index
+from incremental import get_store as get_dataset_store
+import config
+import metrics
 
 # --- Configuración de Página ---
 st.set_page_config(
@@ -35,8 +46,230 @@ st.markdown("Utiliza modelos de IA Open Source (vía Ollama) para resumir sitios
 available_models = ["llama3.2", "llama3.1", "mistral", "phi3"] # Ajusta a tus modelos Ollama disponibles
 
 
+def format_llm_stats(stats):
+    """
+    Formatea las estadísticas de tiempo de una respuesta del modelo para mostrarlas.
+    """
+    if not stats:
+        return ""
+    parts = []
+    if stats.get("cached"):
+        parts.append("Respuesta desde caché")
+    if stats.get("time_to_first_token") is not None:
+        parts.append(f"Primer token: {stats['time_to_first_token']:.1f} s")
+    if stats.get("tokens_per_second"):
+        parts.append(f"{stats['tokens_per_second']:.1f} tokens/s")
+    parts.append(f"Total: {stats['total_time']:.1f} s")
+    return " · ".join(parts)
+
+
+job_manager = get_job_manager()
+
+
+def format_prompt_report(report):
+    """
+    Describe el tamaño del prompt y las secciones recortadas u omitidas.
+    """
+    caption = (
+        f"Prompt: ~{report['prompt_tokens']:,} tokens de {report['budget']:,} disponibles "
+        f"({report['saved_ratio']:.0%} menos que en formato markdown)."
+    )
+    if report["shortened"] or report["dropped"]:
+        caption += f" Recortadas: {', '.join(report['shortened']) or '-'} · Omitidas: {', '.join(report['dropped']) or '-'}."
+    return caption
+
+
+def submit_job(state_key, kind, key, model, target):
+    """
+    Encola una llamada al modelo en segundo plano y guarda su ID en la sesión.
+    Si otra sesión ya pidió exactamente lo mismo, se comparte ese trabajo.
+    """
+    previous = st.session_state.pop(state_key, None)
+    try:
+        # Primero se encola: una solicitud idéntica se une al trabajo en curso en lugar de
+        # cancelarlo (quedaría sin suscriptores) y empezar de cero
+        st.session_state[state_key] = job_manager.submit(kind, key, model, target)
+    except QueueFullError as e:
+        st.error(str(e))
+    if previous:
+        # Si es el mismo trabajo solo se retira la suscripción extra de esta sesión
+        job_manager.cancel(previous)
+
+
+@st.fragment(run_every=config.JOB_POLL_SECONDS)
+def poll_job(state_key):
+    """
+    Consulta periódicamente un trabajo en curso sin bloquear la sesión y
+    muestra el texto generado hasta el momento.
+    """
+    job = job_manager.get(st.session_state.get(state_key))
+    if job is None or job.finished:
+        st.rerun()  # El resultado final se dibuja fuera del fragmento
+        return
+
+    if job.status == QUEUED:
+        st.info(f"En cola para {job.model}: {job_manager.position(job.id)} trabajos por delante.")
+    else:
+        st.info(f"Generando con {job.model}... ({job.as_dict()['run_time']:.0f} s)")
+        if job.text:
+            with st.container(border=True):
+                st.markdown(job.text)
+    if st.button("Cancelar", key=f"cancel_{state_key}"):
+        job_manager.cancel(job.id)
+        st.session_state.pop(state_key, None)
+        st.rerun()
+
+
+def show_job(state_key, render_result, error_prefix):
+    """
+    Muestra el trabajo guardado en st.session_state[state_key]: su progreso
+    mientras está en curso y render_result(result) cuando termina bien.
+    """
+    job_id = st.session_state.get(state_key)
+    if not job_id:
+        return
+    job = job_manager.get(job_id)
+    if job is None:
+        st.session_state.pop(state_key, None)
+        st.info("El resultado anterior ya no está disponible.")
+    elif not job.finished:
+        poll_job(state_key)
+    elif job.status == DONE:
+        render_result(job.result)
+    elif job.status == CANCELLED:
+        st.warning("El trabajo fue cancelado.")
+    else:
+        st.error(f"{error_prefix}: {job.error}")
+
+
+@st.cache_resource
+def start_metrics_exporter():
+    """
+    Inicia (una sola vez por proceso) el endpoint /metrics si IA_AGENT_METRICS_PORT está definido.
+    """
+    return metrics.start_exporter()
+
+
+start_metrics_exporter()
+
+
+def show_metrics_panel():
+    """
+    Panel de depuración: latencia por etapa (p50/p95) y errores por tipo.
+    """
+    snapshot = metrics.registry.snapshot()
+    stages = [
+        {
+            "Etapa": h["labels"].get("stage"),
+            "Detalle": ", ".join(f"{k}={v}" for k, v in h["labels"].items() if k != "stage"),
+            "N": h["count"],
+            "p50 (s)": h["p50"],
+            "p95 (s)": h["p95"],
+            "Total (s)": h["sum"],
+        }
+        for h in snapshot["histograms"] if h["name"] == "ia_agent_stage_seconds"
+    ]
+    if stages:
+        st.dataframe(pd.DataFrame(stages), hide_index=True)
+    else:
+        st.caption("Todavía no hay mediciones.")
+    errors = [c for c in snapshot["counters"] if c["name"] == "ia_agent_errors_total"]
+    for counter in errors:
+        st.caption(f"Errores en {counter['labels']['stage']} ({counter['labels']['type']}): {counter['value']:.0f}")
+    if config.METRICS_PORT:
+        st.caption(f"Formato Prometheus en http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics")
+    if st.button("Reiniciar métricas", key="reset_metrics_button"):
+        metrics.registry.reset()
+        st.rerun()
+
+
+@st.cache_resource
+def warm_up_ollama():
+    """
+    Una sola vez por proceso: comprueba los servidores Ollama configurados y
+    carga los modelos de IA_AGENT_OLLAMA_WARMUP en segundo plano, para que la
+    primera consulta no espere la carga del modelo.
+    """
+    pool = get_pool()
+
+    def run():
+        pool.health_check()
+        pool.warmup()
+        pool.start_health_checks()
+
+    threading.Thread(target=run, name="ollama-warmup", daemon=True).start()
+    return pool
+
+
+warm_up_ollama()
+
+
+@st.cache_resource
+def get_data_cache():
+    """
+    Caché en memoria de archivos ya leídos (DataFrame, estadísticas y prompt),
+    compartido entre sesiones y reruns, con expulsión LRU por tamaño.
+    """
+    return MemoryLRU(config.DATA_CACHE_MAX_BYTES)
+
+
+# --- Barra Lateral: Caché de Respuestas ---
+with st.sidebar:
+    st.header("Caché de respuestas")
+    use_cache = st.checkbox(
+        "Reutilizar respuestas en caché",
+        value=True,
+        help="Si el contenido y el modelo son idénticos a una consulta anterior, se devuelve la respuesta guardada sin volver a ejecutar el modelo.",
+        key="use_cache_checkbox"
+        )
+    llm_cache = get_cache()
+    if llm_cache is not None:
+        cache_stats = llm_cache.stats()
+        st.caption(
+            f"Aciertos: {cache_stats['hits']} · Fallos: {cache_stats['misses']} · "
+            f"Entradas: {cache_stats['entries']} ({cache_stats['bytes'] / 1024:.0f} KB)"
+        )
+        if st.button("Vaciar caché", key="clear_cache_button"):
+            llm_cache.clear()
+            st.rerun()
+    else:
+        st.caption("El caché no está disponible en este entorno.")
+
+    data_cache_stats = get_data_cache().stats()
+    st.caption(
+        f"Archivos en memoria: {data_cache_stats['entries']} "
+        f"({data_cache_stats['bytes'] / 2**20:.0f} de {data_cache_stats['max_bytes'] / 2**20:.0f} MB)"
+    )
+
+    summary_index = get_summary_index()
+    if summary_index is not None and summary_index.enabled:
+        index_stats = summary_index.stats()
+        st.caption(
+            f"Páginas indexadas: {index_stats['entries']} · Resúmenes reutilizados: "
+            f"{index_stats['exact'] + index_stats['near'] + index_stats['updated']} ({index_stats['hit_rate']:.0%})"
+        )
+
+    dataset_store = get_dataset_store()
+    if dataset_store is not None and dataset_store.enabled:
+        store_stats = dataset_store.stats()
+        st.caption(
+            f"Versiones de archivos guardadas: {store_stats['entries']} · Reanálisis incrementales: "
+            f"{store_stats['appended']} · Sin cambios: {store_stats['unchanged']}"
+        )
+
+    job_stats = job_manager.stats()
+    st.caption(f"Trabajos: {job_stats['queued']} en cola · {job_stats['running']} en curso")
+    for host in get_pool().stats():
+        state = "activo" if host["healthy"] else "sin respuesta"
+        st.caption(f"Ollama {host['url']}: {state} · {host['outstanding']}/{host['max_concurrency']} en uso")
+
+    if metrics.registry.enabled:
+        with st.expander("Métricas (depuración)"):
+            show_metrics_panel()
+
+
 # --- Pestañas para Funcionalidades ---
-tab1, tab2 = st.tabs(["📝 Resumir Sitio Web", "📊 Analizar Archivo de Datos"])
+tab1, tab2, tab3 = st.tabs(["📝 Resumir Sitio Web", "📊 Analizar Archivo de Datos", "🗂️ Resumen por Lotes"])
 
 # --- Pestaña 1: Resumir Sitio Web ---
 with tab1:
@@ -59,47 +292,66 @@ with tab1:
         key="url_input"
         )
 
+    def render_web_result(result):
+        if result.get("website_title"):
+            st.subheader(f"Sitio: {result['website_title']}")
+        st.markdown("## Resumen")
+        # Usar un contenedor para el markdown con estilo
+        with st.container(border=True):
+            st.markdown(result["summary"])
+        st.success("¡Resumen generado con éxito!")
+        st.caption(format_llm_stats(result.get("stats")))
+        chunking = result.get("chunking")
+        if chunking and chunking["strategy"] == "map_reduce":
+            st.caption(
+                f"Página extensa (~{chunking['input_tokens']:,} tokens, presupuesto {chunking['prompt_budget']:,}): "
+                f"{chunking['chunks']} fragmentos resumidos en {chunking['map_time']:.1f} s, "
+                f"{chunking['reduce_rounds']} rondas de fusión intermedia en {chunking['reduce_time']:.1f} s."
+            )
+        dedup = result.get("dedup")
+        if dedup:
+            if dedup["match"] == "updated":
+                origin = f"actualizado a partir de los cambios ({dedup['change_ratio']:.0%} del texto)"
+            elif dedup["match"] == "exact":
+                origin = "contenido idéntico"
+            else:
+                origin = f"página casi idéntica, distancia {dedup['distance']}"
+            st.caption(f"Resumen reutilizado de {dedup['source_url']} ({origin}).")
+
+        # Añadir botón de descarga
+        try:
+            file_name_md = f"resumen_{result.get('website_title','sitio_web').replace(' ','_')}.md"
+            st.download_button(
+                label="Descargar resumen como Markdown",
+                data=result["summary"],
+                file_name=file_name_md,
+                mime="text/markdown"
+            )
+        except Exception as e:
+             st.error(f"No se pudo generar botón de descarga: {e}")
+
     if st.button("Generar Resumen Web", type="primary", key="summarize_web_button"):
         if url:
             # Validar URL simple
             if not (url.startswith('http://') or url.startswith('https://')):
                  st.warning("Por favor, ingresa una URL válida (que empiece con http:// o https://)")
             else:
-                with st.spinner(f"Analizando sitio web con {model_web}..."):
-                    # Llamar a la función de resumen
-                    result = summarize_website(url, model=model_web)
-
-                    if result["success"]:
-                        st.success("¡Resumen generado con éxito!")
-                        if result.get("website_title"):
-                            st.subheader(f"Sitio: {result['website_title']}")
-                        st.markdown("## Resumen")
-                        # Usar un contenedor para el markdown con estilo
-                        with st.container(border=True):
-                             st.markdown(result["summary"])
-
-                        # Añadir botón de descarga
-                        try:
-                            file_name_md = f"resumen_{result.get('website_title','sitio_web').replace(' ','_')}.md"
-                            st.download_button(
-                                label="Descargar resumen como Markdown",
-                                data=result["summary"],
-                                file_name=file_name_md,
-                                mime="text/markdown"
-                            )
-                        except Exception as e:
-                             st.error(f"No se pudo generar botón de descarga: {e}")
-
-                    else:
-                        st.error(f"Error al generar resumen: {result['error']}")
+                # La descarga y el resumen (por partes si la página es extensa) se ejecutan en segundo plano
+                submit_job(
+                    "web_job_id", "web", (url, use_cache), model_web,
+                    lambda url=url, model=model_web, use_cache=use_cache: summarize_website_stream(url, model=model, use_cache=use_cache)
+                )
         else:
             st.warning("Por favor, ingresa una URL.")
 
+    show_job("web_job_id", render_web_result, "Error al generar resumen")
+
 # --- Pestaña 2: Analizar Archivo de Datos ---
 with tab2:
     st.header("Analizador de Archivos de Datos")
     st.markdown("""
-    Sube un archivo CSV o Excel para obtener un análisis y resumen generado por IA.
+    Sube un archivo CSV, Excel o Parquet para obtener un análisis y resumen generado por IA.
+    Si subes varios archivos o un Excel con varias hojas, se procesan en paralelo y se comparan entre sí.
     **Importante:** La calidad del análisis depende de la estructura del archivo y los nombres de las columnas.
     """)
 
@@ -111,55 +363,197 @@ with tab2:
         key="data_model_select"
         )
 
-    uploaded_file = st.file_uploader(
-        "Carga tu archivo (CSV o Excel)",
-        type=['csv', 'xlsx', 'xls'], # Añadir .xls por si acaso
+    uploaded_files = st.file_uploader(
+        "Carga tus archivos (CSV, Excel o Parquet)",
+        type=['csv', 'xlsx', 'xls', 'parquet'], # Añadir .xls por si acaso
+        accept_multiple_files=True,
         key="data_file_uploader"
         )
 
+    def render_data_result(result):
+        st.markdown("## Resumen del Análisis")
+        # Usar un contenedor para el markdown con estilo
+        with st.container(border=True):
+            st.markdown(result["summary"])
+        st.success("¡Análisis generado con éxito!")
+        st.caption(format_llm_stats(result.get("stats")))
+
+        # Añadir botón de descarga para el análisis
+        try:
+            file_name_analysis = f"analisis_{st.session_state.get('data_job_file', 'datos')}.md"
+            st.download_button(
+                label="Descargar análisis como Markdown",
+                data=result["summary"],
+                file_name=file_name_analysis,
+                mime="text/markdown"
+            )
+        except Exception as e:
+             st.error(f"No se pudo generar botón de descarga del análisis: {e}")
+
     if st.button("Analizar Datos del Archivo", type="primary", key="analyze_data_button"):
-        if uploaded_file is not None:
+        # Un archivo de una sola hoja sigue el análisis individual; varias hojas o archivos se comparan
+        compare_tables = needs_comparison(uploaded_files or [])
+        uploaded_file = uploaded_files[0] if uploaded_files and not compare_tables else None
+        if compare_tables:
+            progress_bar = st.progress(0.0, text="Leyendo hojas y archivos en paralelo...")
+
+            def on_table_done(done, total, label):
+                progress_bar.progress(done / total, text=f"Procesada {label} ({done} de {total})")
+
+            prepared = prepare_uploaded_files(uploaded_files, cache=get_data_cache(), model=model_data,
+                                              progress=on_table_done)
+            progress_bar.empty()
+            for table in prepared["tables"]:
+                if table["error"]:
+                    st.warning(f"No se pudo leer {table['label']}: {table['error']}")
+
+            if prepared["error"]:
+                st.error(f"Error al leer los archivos: {prepared['error']}")
+            else:
+                read_tables = [t for t in prepared["tables"] if not t["error"]]
+                st.success(
+                    f"{len(read_tables)} hojas/archivos ya procesados, reutilizados desde memoria." if prepared["cached"]
+                    else f"{len(read_tables)} hojas/archivos leídos con éxito."
+                )
+                st.dataframe(prepared["comparison"])
+                st.caption(format_prompt_report(prepared["prompt_report"]))
+
+                prompt = prepared["prompt"]
+                st.session_state["data_job_file"] = "comparacion"
+                submit_job(
+                    "data_job_id", "data", (prepared["key"], use_cache), model_data,
+                    lambda prompt=prompt, model=model_data, use_cache=use_cache: analyze_tables_with_llm_stream(prompt, model, use_cache=use_cache)
+                )
+        elif uploaded_file is not None:
             with st.spinner("Leyendo y procesando archivo..."):
-                df, error_read = read_uploaded_file(uploaded_file) # Usar la función del módulo
+                # Si el mismo contenido ya se procesó (en este u otro rerun), no se vuelve a leer
+                prepared = prepare_uploaded_file(uploaded_file, cache=get_data_cache(), model=model_data)
+            df, error_read = prepared["df"], prepared["error"]
 
             if error_read:
                 st.error(f"Error al leer el archivo: {error_read}")
             elif df is not None:
-                st.success("Archivo leído con éxito.")
+                st.success("Archivo ya procesado, reutilizado desde memoria." if prepared["cached"] else "Archivo leído con éxito.")
+                large_file = prepared["outofcore"]
+                if large_file:
+                    engine_name = "DuckDB" if large_file["engine"] == "duckdb" else "lectura por bloques"
+                    st.info(
+                        f"Archivo grande ({large_file['bytes'] / 2**20:,.0f} MB, {large_file['rows']:,} filas): "
+                        f"estadísticas calculadas sin cargarlo en memoria ({engine_name}). "
+                        f"Se muestran y envían al modelo filas de una muestra {large_file['sampling']}."
+                    )
+                dataset = prepared["dataset"]
+                if dataset is not None and dataset["match"] == "appended":
+                    new_rows = dataset["rows"] - dataset["previous_rows"]
+                    message = (f"Versión anterior reconocida ({dataset['previous_rows']:,} filas) con {new_rows:,} filas nuevas: "
+                               "solo se calcularon las estadísticas de las filas nuevas.")
+                    if prepared["delta_prompt"]:
+                        message += " El modelo actualizará el resumen anterior en lugar de escribirlo desde cero."
+                    st.info(message)
+                elif dataset is not None and dataset["match"] == "unchanged":
+                    st.info("Este archivo ya se había analizado: se reutilizan sus estadísticas guardadas.")
                 st.dataframe(df.head()) # Mostrar preview
+                st.caption(format_prompt_report(prepared["prompt_report"]))
 
-                with st.spinner(f"Analizando datos con {model_data}..."):
-                    # Llamar a la función de análisis del DataFrame
-                    result = analyze_dataframe_with_llm(df, model_name=model_data)
-
-                    if result["success"]:
-                        st.success("¡Análisis generado con éxito!")
-                        st.markdown("## Resumen del Análisis")
-                        # Usar un contenedor para el markdown con estilo
-                        with st.container(border=True):
-                             st.markdown(result["summary"])
-
-                        # Añadir botón de descarga para el análisis
-                        try:
-                            file_name_analysis = f"analisis_{uploaded_file.name}.md"
-                            st.download_button(
-                                label="Descargar análisis como Markdown",
-                                data=result["summary"],
-                                file_name=file_name_analysis,
-                                mime="text/markdown"
-                            )
-                        except Exception as e:
-                             st.error(f"No se pudo generar botón de descarga del análisis: {e}")
-
-                    else:
-                        st.error(f"Error durante el análisis con IA: {result['error']}")
+                # El análisis con el modelo se ejecuta en segundo plano
+                prompt = prepared["prompt"]
+                st.session_state["data_job_file"] = uploaded_file.name
+                submit_job(
+                    "data_job_id", "data", (prepared["key"], use_cache), model_data,
+                    lambda df=df, model=model_data, use_cache=use_cache, prompt=prompt, dataset=dataset: analyze_dataframe_with_llm_stream(df, model_name=model, use_cache=use_cache, prompt=prompt, dataset=dataset)
+                )
             else:
-                 st.error("No se pudo obtener un DataFrame del archivo.") # Error genérico si read_uploaded_file falla inesperadamente
+                 st.error("No se pudo obtener un DataFrame del archivo.") # Error genérico si la lectura falla inesperadamente
         else:
             st.warning("Por favor, carga un archivo primero.")
 
+    show_job("data_job_id", render_data_result, "Error durante el análisis con IA")
+
+
+# --- Pestaña 3: Resumen por Lotes ---
+with tab3:
+    st.header("Resumen de Múltiples Sitios Web")
+    st.markdown("""
+    Ingresa una lista de URLs (una por línea) o la URL de un `sitemap.xml`. Las páginas se descargan
+    en paralelo y se resumen a medida que llegan, con un límite de consultas simultáneas al servidor Ollama.
+    """)
+
+    model_batch = st.selectbox(
+        "Seleccionar modelo para Resumen por Lotes",
+        available_models,
+        index=0, # Modelo por defecto
+        key="batch_model_select"
+        )
+
+    urls_text = st.text_area(
+        "URLs (una por línea)",
+        placeholder="https://ejemplo.com/pagina-1\nhttps://ejemplo.com/pagina-2",
+        key="batch_urls_input"
+        )
+    sitemap_url = st.text_input(
+        "...o URL de un sitemap",
+        placeholder="https://ejemplo.com/sitemap.xml",
+        key="batch_sitemap_input"
+        )
+
+    col_fetch, col_llm = st.columns(2)
+    with col_fetch:
+        fetch_workers = st.slider("Descargas simultáneas", 1, 32, config.BATCH_FETCH_WORKERS, key="batch_fetch_workers")
+    with col_llm:
+        llm_workers = st.slider("Consultas simultáneas a Ollama", 1, 8, config.BATCH_LLM_WORKERS, key="batch_llm_workers")
+
+    if st.button("Resumir Lote", type="primary", key="summarize_batch_button"):
+        urls = parse_url_list(urls_text)
+        if sitemap_url:
+            try:
+                with st.spinner("Leyendo sitemap..."):
+                    urls += [u for u in load_sitemap_urls(sitemap_url, limit=config.BATCH_MAX_URLS) if u not in urls]
+            except Exception as e:
+                st.error(f"No se pudo leer el sitemap: {e}")
+        urls = urls[:config.BATCH_MAX_URLS]
+
+        if not urls:
+            st.warning("Por favor, ingresa al menos una URL válida (que empiece con http:// o https://).")
+        else:
+            progress = st.progress(0.0, text=f"Procesando {len(urls)} URLs...")
+            metrics_placeholder = st.empty()
+            batch_results = []
+            report = None
+            for result, report in summarize_urls(urls, model=model_batch, fetch_workers=fetch_workers,
+                                                 llm_workers=llm_workers, use_cache=use_cache):
+                batch_results.append(result)
+                progress.progress(report["completed"] / report["total"],
+                                  text=f"{report['completed']} de {report['total']} URLs procesadas")
+                with metrics_placeholder.container():
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Páginas/min", f"{report['pages_per_minute']:.1f}")
+                    col2.metric("Descarga promedio", f"{report['fetch_time_avg']:.1f} s")
+                    col3.metric("Inferencia promedio", f"{report['inference_time_avg']:.1f} s")
+
+                label = result.get("website_title") or result["url"]
+                with st.expander(f"{'✅' if result['success'] else '❌'} {label}"):
+                    st.caption(result["url"])
+                    if result["success"]:
+                        st.markdown(result["summary"])
+                    else:
+                        st.error(result["error"])
+
+            st.success(f"Lote completado: {report['succeeded']} resúmenes, {report['failed']} errores "
+                       f"en {report['elapsed']:.1f} s.")
+            combined = "\n\n".join(
+                f"# {r.get('website_title') or r['url']}\n\n<{r['url']}>\n\n{r['summary']}"
+                for r in batch_results if r["success"]
+            )
+            if combined:
+                st.download_button(
+                    label="Descargar resúmenes como Markdown",
+                    data=combined,
+                    file_name="resumenes_lote.md",
+                    mime="text/markdown"
+                )
+
 
-# --- Footer (Común a ambas pestañas) ---
+# --- Footer (Común a todas las pestañas) ---
 st.markdown("---")
 # Usar st.markdown o st.html para el footer si necesitas más control
 st.markdown(
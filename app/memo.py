@@ -0,0 +1,128 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+_HASH_BLOCK = 1024 * 1024
+
+
+def content_hash(source):
+    """
+    SHA-256 of an uploaded file (or bytes) computed without copying its content
+
+    Args:
+        source: bytes, a BytesIO-like object (e.g. Streamlit's UploadedFile) or a path
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif hasattr(source, "getbuffer"):
+        digest.update(source.getbuffer())
+    elif isinstance(source, str):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+                digest.update(block)
+    else:
+        position = source.tell()
+        source.seek(0)
+        for block in iter(lambda: source.read(_HASH_BLOCK), b""):
+            digest.update(block)
+        source.seek(position)
+    return digest.hexdigest()
+
+
+def estimate_size(value):
+    """
+    Approximate memory footprint of a cached value in bytes
+    """
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(deep=True)
+            return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+        except TypeError:
+            pass
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value) + sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values()) + sys.getsizeof(value)
+    if hasattr(value, "estimated_size"):
+        return int(value.estimated_size())
+    return sys.getsizeof(value)
+
+
+class MemoryLRU:
+    """
+    Thread-safe in-memory LRU cache bounded by total size in bytes
+
+    Meant to be shared by every Streamlit session (via st.cache_resource), so
+    memory stays bounded no matter how many users upload files.
+    """
+
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes (int): Maximum total estimated size of the cached values
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def set(self, key, value, size=None):
+        """
+        Store a value, evicting the least recently used ones to make room
+
+        Values larger than max_bytes are not cached.
+        """
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss
+        """
+        marker = object()
+        value = self.get(key, marker)
+        if value is marker:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,257 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import config
+
+# Límites de los buckets de latencia (segundos), como los de prometheus_client
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Valores recientes que se guardan por histograma para calcular percentiles
+RECENT_SAMPLES = 1000
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram plus a window of recent values for percentiles
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentile(self, q):
+        """
+        Percentile (0-100) of the recent observations, or None if there are none
+        """
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def _escape_label(value):
+    # Formato de exposición de Prometheus: \\, \" y \n dentro de los valores de etiqueta
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """
+    Thread-safe store of counters and histograms identified by name and labels
+
+    When disabled every method returns immediately, so instrumented code paths
+    only pay for an attribute lookup.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled or value is None:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def timer(self, name, **labels):
+        """
+        Context manager observing the elapsed seconds of its block
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name, labels):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """
+        Current values as plain data (used by the debug panel)
+
+        Returns:
+            dict: {"counters": [{name, labels, value}], "histograms": [{name, labels, count, sum, mean, p50, p95, p99}]}
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count if histogram.count else None,
+                    "p50": histogram.percentile(50),
+                    "p95": histogram.percentile(95),
+                    "p99": histogram.percentile(99),
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self):
+        """
+        Render every metric in the Prometheus text exposition format
+        """
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{fmt_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{fmt_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{fmt_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{name}_sum{fmt_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{fmt_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(enabled=config.METRICS_ENABLED)
+
+
+def stage_timer(stage, **labels):
+    """
+    Time a pipeline stage (fetch, parse, prompt, read, stats...)
+    """
+    return registry.timer("ia_agent_stage_seconds", stage=stage, **labels)
+
+
+def observe_stage(stage, seconds, **labels):
+    registry.observe("ia_agent_stage_seconds", seconds, stage=stage, **labels)
+
+
+def record_error(stage, error):
+    """
+    Count an exception by stage and type
+    """
+    registry.inc("ia_agent_errors_total", stage=stage, type=type(error).__name__)
+
+
+def record_completion(model, stats):
+    """
+    Record the timings of an Ollama completion (see llm.build_stats)
+
+    Prefill and generation come from Ollama's own prompt_eval_duration and
+    eval_duration, so they exclude network and queueing time.
+    """
+    if not registry.enabled or not stats:
+        return
+    cached = "true" if stats.get("cached") else "false"
+    registry.inc("ia_agent_llm_requests_total", model=model, cached=cached)
+    observe_stage("llm_total", stats.get("total_time"), model=model, cached=cached)
+    observe_stage("llm_first_token", stats.get("time_to_first_token"), model=model, cached=cached)
+    if stats.get("cached"):
+        return
+    observe_stage("llm_load", stats.get("load_time"), model=model)
+    observe_stage("llm_prefill", stats.get("prefill_time"), model=model)
+    observe_stage("llm_generation", stats.get("generation_time"), model=model)
+    if stats.get("prompt_tokens"):
+        registry.inc("ia_agent_llm_tokens_total", stats["prompt_tokens"], model=model, kind="prompt")
+    if stats.get("completion_tokens"):
+        registry.inc("ia_agent_llm_tokens_total", stats["completion_tokens"], model=model, kind="completion")
+
+
+def _make_handler():
+    # http.server se importa solo si se inicia el exportador
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_exporter(port=None, host=None):
+    """
+    Serve /metrics in Prometheus format from a background thread
+
+    Does nothing if metrics are disabled or no port is configured
+    (IA_AGENT_METRICS_PORT). Calling it again returns the running server.
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if it was not started
+    """
+    global _server
+    port = config.METRICS_PORT if port is None else port
+    if not registry.enabled or not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            from http.server import ThreadingHTTPServer
+
+            _server = ThreadingHTTPServer((host or config.METRICS_HOST, port), _make_handler())
+            threading.Thread(target=_server.serve_forever, name="metrics-exporter", daemon=True).start()
+        return _server
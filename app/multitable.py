@@ -0,0 +1,387 @@
+import contextlib
+import copy
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+import config
+from chunking import context_tokens, count_tokens, prompt_budget
+from data_analyzer import _dtype_label, clean_analysis_summary, get_data_analysis_system_prompt
+from ingest import file_name, read_table, sheet_names
+from llm import stream_chat
+from memo import MemoryLRU, content_hash
+from metrics import record_error, stage_timer
+from outofcore import analyze_large_file, should_use_out_of_core, spooled
+from prompt_compact import Section, fit_sections
+from sampling import representative_sample
+from stats import MAX_INSIGHT_MEASURES, compute_dataset_stats, is_additive_measure
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".xls", ".parquet")
+# Insights propios de cada hoja (los del conjunto van en su propia sección)
+MAX_TABLE_INSIGHTS = 6
+# Filas de la tabla categoría x hoja antes de recortarla al presupuesto
+MAX_PIVOT_ROWS = 50
+
+COMPARISON_INSTRUCTION = "Actúa como un analista de negocios experto. Basándote ESTRICTAMENTE en la información y los datos proporcionados arriba, genera un resumen ejecutivo conciso en español para la gerencia que COMPARE las hojas/archivos entre sí. Destaca cómo cambian los totales de una hoja a otra, cuáles son las hojas con mejor y peor desempeño, qué productos/departamentos suben o bajan entre hojas, las diferencias de estructura relevantes y cualquier otro insight que puedas inferir DIRECTAMENTE de los datos mostrados. No inventes información que no esté presente. Usa un lenguaje claro y profesional, preferiblemente en formato de puntos clave (bullet points)."
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """
+    Return the shared process pool, or None to analyze in the calling process
+
+    Uses the "spawn" start method: forking a process that runs Streamlit (or
+    the API) threads is not safe. Workers import pandas once and are reused by
+    every analysis. IA_AGENT_ANALYSIS_PROCESSES=1 disables the pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None and config.ANALYSIS_PROCESSES > 1:
+            try:
+                _pool = ProcessPoolExecutor(max_workers=config.ANALYSIS_PROCESSES,
+                                            mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError, ValueError) as e:
+                record_error("multitable", e)
+                return None
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def needs_comparison(uploaded_files):
+    """
+    Whether the upload has more than one table (several files or a workbook with several sheets)
+    """
+    if len(uploaded_files) > 1:
+        return True
+    if not uploaded_files:
+        return False
+    try:
+        return len(sheet_names(uploaded_files[0])) > 1
+    except Exception:
+        return False  # el flujo de un solo archivo informa el error de lectura
+
+
+def _failed(label, name, sheet, error):
+    return {"label": label, "file": name, "sheet": sheet, "rows": 0, "columns": [], "dtypes": {},
+            "stats": None, "sample": None, "sampling": None, "error": error}
+
+
+def analyze_table(path, label, name=None, sheet=None):
+    """
+    Read one file or sheet and compute its statistics and prompt sample
+
+    Runs in a worker process, so it takes a path and returns only picklable
+    values. Large CSV / Parquet files are analyzed out of core.
+
+    Returns:
+        dict: {"label", "file", "sheet", "rows", "columns", "dtypes", "stats", "sample", "sampling", "error"}
+    """
+    name = name or os.path.basename(path)
+    try:
+        if sheet is None and should_use_out_of_core(path):
+            large = analyze_large_file(path)
+            stats, sample, sampling = large["stats"], large["sample"], large["sampling"]
+            if stats is None:
+                return _failed(label, name, sheet, "no contiene filas")
+            dtypes = sample.dtypes.to_dict()
+        else:
+            df = read_table(path, sheet=sheet)
+            if df.empty:
+                return _failed(label, name, sheet, "no contiene filas")
+            stats = compute_dataset_stats(df)
+            sample, sampling = representative_sample(df, stats.roles)
+            dtypes = df.dtypes.to_dict()
+    except Exception as e:
+        return _failed(label, name, sheet, f"{type(e).__name__}: {e}")
+    columns = stats.columns or list(dtypes)
+    return {"label": label, "file": name, "sheet": sheet, "rows": stats.rows, "columns": columns,
+            "dtypes": {column: _dtype_label(dtypes[column]) for column in columns if column in dtypes},
+            "stats": stats, "sample": sample, "sampling": sampling, "error": None}
+
+
+def _unique_label(label, used):
+    candidate, n = label, 2
+    while candidate in used:
+        candidate, n = f"{label} ({n})", n + 1
+    used.add(candidate)
+    return candidate
+
+
+def analyze_files(uploaded_files, progress=None):
+    """
+    Analyze every sheet of every uploaded file in parallel
+
+    Uploads are spooled to temporary files so the worker processes can read
+    them; each sheet (or CSV / Parquet file) is one task of the shared process
+    pool. A crashed worker pool is discarded and the remaining tables are
+    analyzed in this process.
+
+    Args:
+        uploaded_files (list): Paths or uploaded files (CSV, Excel or Parquet)
+        progress (callable, optional): Called as progress(done, total, label)
+            each time a table finishes
+
+    Returns:
+        list: analyze_table() results in upload order (sheets in workbook order)
+    """
+    results = []
+    with contextlib.ExitStack() as stack:
+        tasks, used = [], set()
+        for uploaded in uploaded_files:
+            name = os.path.basename(file_name(uploaded))
+            if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                results.append(_failed(_unique_label(name, used), name, None, "formato no soportado"))
+                continue
+            try:
+                path = stack.enter_context(spooled(uploaded))
+                sheets = sheet_names(path)
+            except Exception as e:
+                record_error("read", e)
+                results.append(_failed(_unique_label(name, used), name, None, f"{type(e).__name__}: {e}"))
+                continue
+            for sheet in sheets:
+                # Un solo libro: las hojas se nombran solas; varios archivos: "archivo / hoja"
+                if sheet is None:
+                    label = name
+                elif len(uploaded_files) == 1:
+                    label = str(sheet)
+                else:
+                    label = f"{name} / {sheet}"
+                tasks.append((path, _unique_label(label, used), name, sheet))
+
+        total = len(tasks) + len(results)
+        done = len(results)
+        analyzed = [None] * len(tasks)
+        pool = get_process_pool() if len(tasks) > 1 else None
+        pending = list(range(len(tasks)))
+        if pool is not None:
+            try:
+                futures = {pool.submit(analyze_table, *task): i for i, task in enumerate(tasks)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    analyzed[i] = future.result()
+                    pending.remove(i)
+                    done += 1
+                    if progress is not None:
+                        progress(done, total, analyzed[i]["label"])
+            except BrokenProcessPool as e:
+                record_error("multitable", e)
+                _discard_pool(pool)
+        for i in pending:
+            analyzed[i] = analyze_table(*tasks[i])
+            done += 1
+            if progress is not None:
+                progress(done, total, analyzed[i]["label"])
+    return results + analyzed
+
+
+def _fmt_change(previous, current):
+    if pd.isna(previous) or pd.isna(current) or not previous:
+        return ""
+    return f"{(current - previous) / abs(previous):+.1%}"
+
+
+def _common_measures(tables):
+    first = tables[0]["stats"].roles["measures"]
+    return [m for m in first if all(m in t["stats"].roles["measures"] for t in tables)]
+
+
+def _common_categories(tables):
+    first = tables[0]["stats"].roles["categories"]
+    return [c for c in first if all(c in t["stats"].groups for t in tables)]
+
+
+def comparison_table(tables):
+    """
+    One row per table: rows, total of the common additive measures (with the
+    change against the previous table) and mean of the other common measures
+    """
+    measures = _common_measures(tables) if tables else []
+    additive = [m for m in measures if is_additive_measure(m)][:MAX_INSIGHT_MEASURES]
+    averaged = [m for m in measures if not is_additive_measure(m)][:MAX_INSIGHT_MEASURES]
+    rows = {}
+    for table in tables:
+        numeric = table["stats"].numeric
+        row = {"filas": table["rows"]}
+        for measure in additive:
+            row[f"{measure} total"] = numeric[measure].total
+        for measure in averaged:
+            row[f"{measure} promedio"] = numeric[measure].mean if numeric[measure].count else float("nan")
+        rows[table["label"]] = row
+    comparison = pd.DataFrame.from_dict(rows, orient="index")
+    comparison.index.name = "hoja"
+    if additive and len(comparison) > 1:
+        totals = comparison[f"{additive[0]} total"]
+        comparison[f"var. {additive[0]}"] = [""] + [_fmt_change(p, c) for p, c in zip(totals.iloc[:-1], totals.iloc[1:])]
+    return comparison
+
+
+def build_comparison_prompt(tables, model=None):
+    """
+    Build the cross-sheet comparison prompt within the model's token budget
+
+    Sections, by priority: overview and instruction (always kept), comparison
+    table and schema differences, insights of all tables combined (when they
+    share the same columns), the main category per table, and the insights of
+    each table.
+
+    Returns:
+        tuple: (prompt, report) as returned by fit_sections()
+    """
+    ok = [t for t in tables if t["error"] is None]
+    failed = [t for t in tables if t["error"] is not None]
+    sections = []
+
+    overview = [f"Se cargaron {len(ok)} tablas (hojas o archivos) para comparar:"]
+    overview += [f"- {t['label']}: {t['rows']} filas, {len(t['columns'])} columnas" for t in ok]
+    overview += [f"- {t['label']}: no se pudo leer ({t['error']})" for t in failed]
+    sections.append(Section("overview", 0, "### Análisis Solicitado: Comparación entre Hojas/Archivos",
+                            "\n".join(overview), required=True))
+
+    comparison = comparison_table(ok)
+    if not comparison.empty:
+        sections.append(Section("comparison", 1, "### Comparación por hoja/archivo (en orden de carga):",
+                                comparison, baseline=comparison.to_markdown()))
+
+    # --- Estructura: columnas comunes y columnas que solo están en algunas hojas ---
+    if ok:
+        first = ok[0]
+        common = [c for c in first["columns"] if all(c in t["columns"] for t in ok)]
+        schema = ["Columnas comunes (tipo): " + ", ".join(
+            f"{c} ({first['dtypes'][c]})" if c in first["dtypes"] else str(c) for c in common)]
+        seen = list(dict.fromkeys(c for t in ok for c in t["columns"]))
+        for column in seen:
+            if column in common:
+                continue
+            present = [t["label"] for t in ok if column in t["columns"]]
+            schema.append(f"- {column}: solo en {', '.join(present)}")
+        sections.append(Section("schema", 1, "### Estructura:", schema))
+
+    # --- Insights del conjunto: solo si todas las hojas tienen las mismas columnas y roles ---
+    if len(ok) > 1 and all(t["columns"] == ok[0]["columns"] and t["stats"].roles == ok[0]["stats"].roles for t in ok):
+        try:
+            combined = copy.deepcopy(ok[0]["stats"])
+            for table in ok[1:]:
+                combined.merge(table["stats"])
+            lines = combined.insights()
+            if lines:
+                sections.append(Section("combined", 2, f"### Insights del conjunto ({combined.rows} filas en total):",
+                                        lines))
+        except Exception as e:
+            record_error("multitable", e)
+
+    # --- Medida principal por categoría en cada hoja ---
+    if len(ok) > 1:
+        additive = [m for m in _common_measures(ok) if is_additive_measure(m)][:1]
+        categories = _common_categories(ok)
+        if additive and categories:
+            measure, category = additive[0], categories[0]
+            pivot = pd.concat({t["label"]: t["stats"].groups[category][measure] for t in ok}, axis=1)
+            pivot = pivot.loc[pivot.sum(axis=1).sort_values(ascending=False).index].head(MAX_PIVOT_ROWS)
+            pivot.index.name = category
+            sections.append(Section(f"pivot_{category}", 3, f"### {measure} por {category} en cada hoja "
+                                    "(de mayor a menor total; vacío = no aparece en la hoja):",
+                                    pivot, baseline=pivot.to_markdown()))
+
+    for i, table in enumerate(ok):
+        lines = table["stats"].insights()[:MAX_TABLE_INSIGHTS]
+        if lines:
+            sections.append(Section(f"insights_{i}", 4, f"### Insights de {table['label']}:", lines))
+
+    sections.append(Section("instruction", 0, "### INSTRUCCIÓN PARA EL MODELO:", COMPARISON_INSTRUCTION,
+                            required=True))
+
+    budget = prompt_budget(model) - count_tokens(get_data_analysis_system_prompt(), model)
+    prompt_text, report = fit_sections(sections, budget, model)
+    return prompt_text.rstrip(), report
+
+
+def prepare_uploaded_files(uploaded_files, cache: MemoryLRU = None, model: str = None, progress=None):
+    """
+    Analyze several files / sheets and build their comparison prompt
+
+    Like data_analyzer.prepare_uploaded_file(), the result is cached by the
+    content of all the files, so Streamlit reruns do not read anything again.
+
+    Args:
+        uploaded_files (list): Paths or uploaded files (CSV, Excel or Parquet)
+        cache (MemoryLRU, optional): Shared in-memory cache
+        model (str, optional): Target model; the prompt is fitted to its budget
+        progress (callable, optional): See analyze_files()
+
+    Returns:
+        dict: {"tables", "comparison", "prompt", "prompt_report", "key", "cached", "error"}
+    """
+    empty = {"tables": [], "comparison": None, "prompt": None, "prompt_report": None, "key": None,
+             "cached": False}
+    if not uploaded_files:
+        return dict(empty, error="No se cargó ningún archivo.")
+
+    try:
+        hashes = [f"{content_hash(f)}:{os.path.basename(file_name(f))}" for f in uploaded_files]
+        key = "multi:" + content_hash("|".join(hashes).encode("utf-8"))
+    except Exception as e:
+        return dict(empty, error=f"Error inesperado al procesar los archivos: {e}")
+
+    prepared = cache.get(key) if cache is not None else None
+    cached = prepared is not None
+    if prepared is None:
+        with stage_timer("stats"):
+            tables = analyze_files(uploaded_files, progress=progress)
+        ok = [t for t in tables if t["error"] is None]
+        if not ok:
+            return dict(empty, tables=tables, key=key, error="No se pudo leer ninguna hoja ni archivo.")
+        prepared = {"tables": tables, "comparison": comparison_table(ok)}
+        if cache is not None:
+            cache.set(key, prepared)
+
+    # Un prompt por modelo, en su propia entrada: la de las tablas no cambia después de guardarse
+    prompt_key = f"{key}:prompt:{model}"
+    built = cache.get(prompt_key) if cache is not None else None
+    if built is None:
+        try:
+            with stage_timer("prompt", kind="data"):
+                built = build_comparison_prompt(prepared["tables"], model)
+        except Exception as e:
+            record_error("prompt", e)
+            return dict(empty, tables=prepared["tables"], key=key, error=f"Error al generar el prompt de comparación: {e}")
+        if cache is not None:
+            cache.set(prompt_key, built)
+    prompt, report = built
+    return {"tables": prepared["tables"], "comparison": prepared["comparison"], "prompt": prompt,
+            "prompt_report": report, "key": key, "cached": cached, "error": None}
+
+
+def analyze_tables_with_llm_stream(prompt: str, model_name: str, use_cache: bool = True):
+    """
+    Stream the model's comparison of the tables (see build_comparison_prompt())
+
+    Returns:
+        dict: Like data_analyzer.analyze_dataframe_with_llm_stream()
+    """
+    if not prompt:
+        return {"success": False, "summary": None, "stream": None, "error": "No hay datos para comparar."}
+    try:
+        messages = [
+            {"role": "system", "content": get_data_analysis_system_prompt()},
+            {"role": "user", "content": prompt},
+        ]
+        result = {"success": True, "summary": None, "error": None, "stats": None}
+        result["stream"] = stream_chat(model_name, messages, result, postprocess=clean_analysis_summary, use_cache=use_cache,
+                                       options={"num_ctx": context_tokens(model_name)})
+        return result
+    except Exception as e:
+        return {"success": False, "summary": None, "stream": None, "error": f"Ocurrió un error inesperado durante el análisis de datos: {str(e)}"}
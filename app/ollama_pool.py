@@ -0,0 +1,276 @@
+import random
+import threading
+import time
+
+import config
+from metrics import registry
+
+# Códigos HTTP de Ollama que justifican probar en otro servidor
+_RETRY_STATUS = (404, 429, 500, 502, 503, 504)
+
+
+def _is_retryable(error, hosts):
+    import httpx
+    import ollama
+
+    if isinstance(error, ollama.ResponseError):
+        # Un modelo inexistente solo tiene sentido buscarlo en otro servidor
+        if error.status_code == 404:
+            return hosts > 1
+        return error.status_code in _RETRY_STATUS
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+class OllamaHost:
+    """
+    One Ollama server: its client, concurrency slots and health state
+    """
+
+    def __init__(self, url, max_concurrency, timeout):
+        # ollama (httpx, pydantic) se importa al crear el pool, no al importar este módulo
+        import ollama
+
+        self.url = url
+        self.client = ollama.Client(host=url, timeout=timeout)
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.outstanding = 0
+        self.healthy = True
+        self.retry_at = 0.0
+        self.models = None  # Modelos instalados según /api/tags (None = desconocido)
+        self.requests = 0
+        self.failures = 0
+
+    def load(self):
+        return self.outstanding / self.max_concurrency
+
+    def serves(self, model):
+        if self.models is None:
+            return True
+        return model in self.models or model.split(":", 1)[0] in self.models
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "failures": self.failures,
+            "models": sorted(self.models) if self.models is not None else None,
+        }
+
+
+class OllamaPool:
+    """
+    Shared Ollama clients for one or more servers
+
+    - Each request goes to the healthy host with the fewest outstanding
+      requests relative to its capacity (least-outstanding routing).
+    - At most ``max_concurrency`` requests run at once per host; extra callers wait.
+    - A host that fails with a connection error or a 5xx is skipped for
+      ``health_interval`` seconds and the request is retried on another host
+      with exponential backoff. Streams are only retried before the first chunk.
+    - Every request carries ``keep_alive`` so models stay loaded between calls.
+    """
+
+    def __init__(self, hosts=None, max_concurrency=None, keep_alive=None, retries=None, backoff=None,
+                 health_interval=None, timeout=None):
+        import httpx
+
+        hosts = hosts or config.OLLAMA_HOSTS
+        self.hosts = [
+            OllamaHost(url, max_concurrency or config.OLLAMA_HOST_CONCURRENCY,
+                       timeout or httpx.Timeout(config.OLLAMA_TIMEOUT, connect=config.OLLAMA_CONNECT_TIMEOUT))
+            for url in hosts
+        ]
+        self.keep_alive = config.OLLAMA_KEEP_ALIVE if keep_alive is None else keep_alive
+        self.retries = config.OLLAMA_RETRIES if retries is None else retries
+        self.backoff = config.OLLAMA_RETRY_BACKOFF if backoff is None else backoff
+        self.health_interval = config.OLLAMA_HEALTH_INTERVAL if health_interval is None else health_interval
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    # --- Selección de servidor ---
+
+    def _choose(self, model, exclude):
+        now = time.time()
+        with self._lock:
+            candidates = [h for h in self.hosts if h not in exclude and h.serves(model)]
+            available = [h for h in candidates if h.healthy or h.retry_at <= now]
+            # Si todos están marcados como caídos se intenta igual con el menos cargado
+            pool = available or candidates or [h for h in self.hosts if h not in exclude]
+            if not pool:
+                return None
+            lowest = min(h.load() for h in pool)
+            host = random.choice([h for h in pool if h.load() == lowest])
+            host.outstanding += 1
+            host.requests += 1
+            return host
+
+    def _release(self, host):
+        with self._lock:
+            host.outstanding -= 1
+        host.slots.release()
+
+    def _mark(self, host, error=None, model=None):
+        import ollama
+
+        with self._lock:
+            if error is None:
+                host.healthy = True
+                return
+            host.failures += 1
+            if isinstance(error, ollama.ResponseError) and error.status_code == 404 and host.models is not None and model:
+                host.models.discard(model)
+            elif not isinstance(error, ollama.ResponseError) or error.status_code >= 500:
+                host.healthy = False
+                host.retry_at = time.time() + self.health_interval
+        registry.inc("ia_agent_ollama_failures_total", host=host.url, type=type(error).__name__)
+
+    def _attempts(self, model):
+        """
+        Yield (attempt, host) pairs, waiting for a slot on each chosen host
+        """
+        tried = []
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+            host = self._choose(model, tried if len(tried) < len(self.hosts) else [])
+            if host is None:
+                return
+            host.slots.acquire()
+            tried.append(host)
+            yield attempt, host
+
+    # --- API ---
+
+    def chat(self, model, messages, options=None, stream=False, **kwargs):
+        """
+        Same as ollama.chat, routed to one of the configured hosts
+
+        Returns:
+            ChatResponse, or an iterator of chunks if stream is True
+        """
+        if stream:
+            return self._stream_chat(model, messages, options, **kwargs)
+
+        last_error = None
+        for attempt, host in self._attempts(model):
+            try:
+                response = host.client.chat(model=model, messages=messages, options=options,
+                                            keep_alive=self.keep_alive, **kwargs)
+                self._mark(host)
+                return response
+            except Exception as e:
+                last_error = e
+                if not _is_retryable(e, len(self.hosts)):
+                    raise
+                self._mark(host, e, model)
+            finally:
+                self._release(host)
+        raise last_error or ConnectionError("No hay servidores Ollama configurados.")
+
+    def _stream_chat(self, model, messages, options, **kwargs):
+        last_error = None
+        for attempt, host in self._attempts(model):
+            started = False
+            try:
+                for chunk in host.client.chat(model=model, messages=messages, options=options, stream=True,
+                                              keep_alive=self.keep_alive, **kwargs):
+                    started = True
+                    yield chunk
+                self._mark(host)
+                return
+            except Exception as e:
+                last_error = e
+                if started or not _is_retryable(e, len(self.hosts)):
+                    raise
+                self._mark(host, e, model)
+            finally:
+                # También se ejecuta si el consumidor abandona el stream (GeneratorExit)
+                self._release(host)
+        raise last_error or ConnectionError("No hay servidores Ollama configurados.")
+
+    def health_check(self):
+        """
+        Query /api/tags on every host, updating its health and installed models
+
+        Returns:
+            list: as_dict() of every host
+        """
+        for host in self.hosts:
+            try:
+                listed = host.client.list()
+                models = set()
+                for entry in listed.get("models") or []:
+                    name = entry.get("model") or entry.get("name") or ""
+                    models.update({name, name.split(":", 1)[0]})
+                with self._lock:
+                    host.models = models
+                    host.healthy = True
+            except Exception as e:
+                with self._lock:
+                    host.healthy = False
+                    host.retry_at = time.time() + self.health_interval
+                registry.inc("ia_agent_ollama_failures_total", host=host.url, type=type(e).__name__)
+        return self.stats()
+
+    def start_health_checks(self):
+        """
+        Run health_check() every health_interval seconds in a daemon thread
+        """
+        with self._lock:
+            if self._health_thread is not None or self.health_interval <= 0:
+                return
+
+            def loop():
+                while True:
+                    self.health_check()
+                    time.sleep(self.health_interval)
+
+            self._health_thread = threading.Thread(target=loop, name="ollama-health", daemon=True)
+            self._health_thread.start()
+
+    def warmup(self, models=None):
+        """
+        Load the models on every healthy host that has them, so the first user
+        request does not pay the cold load
+
+        An empty chat request makes Ollama load the model and keep it for keep_alive.
+
+        Returns:
+            dict: {(host, model): seconds or error message}
+        """
+        models = config.OLLAMA_WARMUP_MODELS if models is None else models
+        results = {}
+        for host in self.hosts:
+            for model in models:
+                if not host.healthy or not host.serves(model):
+                    continue
+                started_at = time.perf_counter()
+                try:
+                    host.client.chat(model=model, messages=[], keep_alive=self.keep_alive)
+                    results[(host.url, model)] = time.perf_counter() - started_at
+                except Exception as e:
+                    results[(host.url, model)] = str(e)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return [host.as_dict() for host in self.hosts]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide OllamaPool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OllamaPool()
+        return _pool
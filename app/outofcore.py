@@ -0,0 +1,244 @@
+import contextlib
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+import config
+from ingest import file_name, iter_table_chunks, sniff_csv
+from metrics import record_error
+from sampling import DEFAULT_SEED, ReservoirSample, representative_sample
+from stats import DatasetStats, detect_column_roles
+
+# Formatos que se pueden recorrer sin cargarlos completos (Excel se lee siempre entero)
+STREAMABLE_EXTENSIONS = (".csv", ".parquet")
+
+DUCKDB = "duckdb"
+CHUNKS = "chunks"
+
+
+def source_size(source):
+    """
+    Size in bytes of an uploaded file or path, without reading it
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    size = getattr(source, "size", None)  # UploadedFile de Streamlit
+    if size is not None:
+        return size
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer().nbytes
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+
+def should_use_out_of_core(source, size=None):
+    """
+    Whether a file should be analyzed without loading it into a DataFrame
+
+    True for CSV and Parquet files larger than IA_AGENT_OUTOFCORE_THRESHOLD_BYTES.
+    """
+    if not file_name(source).lower().endswith(STREAMABLE_EXTENSIONS):
+        return False
+    size = source_size(source) if size is None else size
+    return size > config.OUTOFCORE_THRESHOLD_BYTES
+
+
+def _has_duckdb():
+    try:
+        import duckdb  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def choose_engine():
+    """
+    Out-of-core engine to use: "duckdb" if installed (or forced), otherwise "chunks"
+    """
+    if config.OUTOFCORE_ENGINE == CHUNKS:
+        return CHUNKS
+    if config.OUTOFCORE_ENGINE == DUCKDB or _has_duckdb():
+        return DUCKDB
+    return CHUNKS
+
+
+@contextlib.contextmanager
+def spooled(source):
+    """
+    Yield a path on disk with the content of an uploaded file
+
+    Paths are used as-is; in-memory uploads are copied block by block to a
+    temporary file (IA_AGENT_SPOOL_DIR) that is removed on exit.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    extension = os.path.splitext(file_name(source))[1].lower()
+    spool = tempfile.NamedTemporaryFile(suffix=extension, dir=config.SPOOL_DIR, delete=False)
+    try:
+        with spool:
+            source.seek(0)
+            shutil.copyfileobj(source, spool, length=1024 * 1024)
+            source.seek(0)
+        yield spool.name
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(spool.name)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(text):
+    return "'" + str(text).replace("'", "''") + "'"
+
+
+def _date_expression(column, roles):
+    # Texto con formato conocido (dd/mm/aaaa, ...): se interpreta igual que en stats.parse_dates
+    date_format = roles.get("date_formats", {}).get(column)
+    if date_format:
+        return f"TRY_STRPTIME(CAST({_quote(column)} AS VARCHAR), {_literal(date_format)})"
+    return f"TRY_CAST({_quote(column)} AS TIMESTAMP)"
+
+
+def _duckdb_reader(path):
+    if path.lower().endswith(".parquet"):
+        return f"read_parquet({_literal(path)})"
+    delimiter, encoding = sniff_csv(path)
+    options = f"delim={_literal(delimiter)}, header=true"
+    if encoding.lower().replace("-", "").replace("_", "") not in ("utf8", "utf8sig", "ascii"):
+        options += f", encoding={_literal('latin-1')}"
+    return f"read_csv({_literal(path)}, {options})"
+
+
+def _duckdb_statistics(path, sample_rows, seed):
+    """
+    Statistics and reservoir sample of a file computed by DuckDB
+
+    Two scans of the file: a reservoir sample (used to detect column roles and
+    pick the prompt rows) and a single GROUPING SETS aggregation with the
+    moments of every measure, the totals per category and per month.
+    """
+    import duckdb
+
+    conn = duckdb.connect()
+    try:
+        conn.execute(f"SET memory_limit = {_literal(config.DUCKDB_MEMORY_LIMIT)}")
+        conn.execute("SET preserve_insertion_order = false")
+        conn.execute(f"SET temp_directory = {_literal(config.SPOOL_DIR or tempfile.gettempdir())}")
+        conn.execute(f"CREATE VIEW data AS SELECT * FROM {_duckdb_reader(path)}")
+
+        reservoir = conn.execute(
+            f"SELECT * FROM data USING SAMPLE reservoir({int(sample_rows)} ROWS) REPEATABLE ({int(seed)})"
+        ).df()
+        roles = detect_column_roles(reservoir)
+        stats = DatasetStats(roles)
+        stats.columns = list(reservoir.columns)
+
+        keys = [(category, _quote(category)) for category in roles["categories"]]
+        keys += [(date_column, f"date_trunc('month', {_date_expression(date_column, roles)})")
+                 for date_column in roles["dates"]]
+        measures = roles["measures"]
+        select = [f"{expression} AS __k{i}, GROUPING({expression}) AS __g{i}" for i, (_, expression) in enumerate(keys)]
+        for j, measure in enumerate(measures):
+            value = f"TRY_CAST({_quote(measure)} AS DOUBLE)"
+            select.append(f"sum({value}) AS __sum{j}, count({value}) AS __count{j}, avg({value}) AS __mean{j}, "
+                          f"var_samp({value}) AS __var{j}, min({value}) AS __min{j}, max({value}) AS __max{j}")
+        select.append("count(*) AS __rows__")
+        grouping_sets = ", ".join([f"({expression})" for _, expression in keys] + ["()"])
+        result = conn.execute(f"SELECT {', '.join(select)} FROM data GROUP BY GROUPING SETS ({grouping_sets})").df()
+    finally:
+        conn.close()
+
+    sums = {f"__sum{j}": measure for j, measure in enumerate(measures)}
+    overall = result
+    for i in range(len(keys)):
+        overall = overall[overall[f"__g{i}"] == 1]
+    total = overall.iloc[0]
+    stats.rows = int(total["__rows__"])
+    for j, measure in enumerate(measures):
+        accumulator = stats.numeric[measure]
+        accumulator.count = int(total[f"__count{j}"])
+        if accumulator.count:
+            accumulator.total = float(total[f"__sum{j}"])
+            accumulator.mean = float(total[f"__mean{j}"])
+            variance = total[f"__var{j}"]
+            accumulator.m2 = float(variance) * (accumulator.count - 1) if pd.notna(variance) else 0.0
+            accumulator.minimum = float(total[f"__min{j}"])
+            accumulator.maximum = float(total[f"__max{j}"])
+
+    for i, (column, _) in enumerate(keys):
+        rows = result[(result[f"__g{i}"] == 0) & result[f"__k{i}"].notna()]
+        totals = rows[list(sums) + ["__rows__"]].rename(columns=sums)
+        totals["__rows__"] = totals["__rows__"].astype("int64")
+        if column in roles["dates"]:
+            totals.index = pd.PeriodIndex(pd.to_datetime(rows[f"__k{i}"]), freq="M", name=column)
+            stats.trends[column] = totals.groupby(level=0).sum()
+        else:
+            totals.index = pd.Index(rows[f"__k{i}"], name=column)
+            stats.groups[column] = totals
+    return stats, reservoir
+
+
+def _chunked_statistics(source, sample_rows, seed):
+    """
+    Statistics and reservoir sample accumulated chunk by chunk with pandas
+
+    Column roles are detected on the first chunk.
+    """
+    reservoir = ReservoirSample(sample_rows, seed)
+    stats = None
+    for chunk in iter_table_chunks(source, chunksize=config.OUTOFCORE_CHUNK_ROWS):
+        if stats is None:
+            stats = DatasetStats(detect_column_roles(chunk))
+        stats.update(chunk)
+        reservoir.update(chunk)
+    return stats, reservoir.result()
+
+
+def analyze_large_file(source, engine=None, sample_rows=None, seed=None):
+    """
+    Compute the statistics and the prompt sample of a file without loading it
+
+    Only the aggregates (DatasetStats) and a reservoir sample are kept in
+    memory. DuckDB scans the file from disk (uploads are spooled to a temporary
+    file first); without DuckDB, or if it fails, pandas reads it in chunks.
+
+    Args:
+        source: Path or uploaded file (CSV or Parquet)
+        engine (str, optional): "duckdb" or "chunks"; see choose_engine()
+        sample_rows (int, optional): Reservoir size (IA_AGENT_RESERVOIR_ROWS)
+        seed (int, optional): Random seed of the samples
+
+    Returns:
+        dict: {"stats", "sample", "sampling", "engine", "rows", "bytes"}
+    """
+    engine = engine or choose_engine()
+    sample_rows = sample_rows or config.RESERVOIR_ROWS
+    seed = DEFAULT_SEED if seed is None else seed
+    size = source_size(source)
+
+    stats = reservoir = None
+    if engine == DUCKDB:
+        try:
+            with spooled(source) as path:
+                stats, reservoir = _duckdb_statistics(path, sample_rows, seed)
+        except Exception as e:
+            record_error("outofcore", e)
+            engine = CHUNKS
+    if engine == CHUNKS:
+        stats, reservoir = _chunked_statistics(source, sample_rows, seed)
+
+    if stats is None or not stats.rows:
+        return {"stats": None, "sample": reservoir, "sampling": None, "engine": engine, "rows": 0, "bytes": size}
+    sample, description = representative_sample(reservoir, stats.roles, seed=seed)
+    if len(reservoir) < stats.rows:
+        description += f" sobre una muestra de reservorio de {len(reservoir):,} filas"
+    return {"stats": stats, "sample": sample, "sampling": description, "engine": engine,
+            "rows": stats.rows, "bytes": size}
@@ -0,0 +1,148 @@
+import math
+
+import pandas as pd
+
+from chunking import count_tokens
+
+# Filas mínimas que se conservan de una tabla recortada
+MIN_TABLE_ROWS = 3
+
+
+def format_value(value):
+    """
+    Short text for a cell: floats lose trailing zeros and excess decimals
+    """
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        digits = 2 if abs(value) >= 1 else 4
+        return f"{value:.{digits}f}".rstrip("0").rstrip(".")
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d") if value == value.normalize() else value.isoformat(sep=" ")
+    if value is None or value is pd.NaT:
+        return ""
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def compact_table(df: pd.DataFrame, index=True):
+    """
+    Encode a table as pipe-separated lines without padding or separator rows
+
+    Markdown tables from to_markdown() pad every cell to the column width and
+    add a ``|---|`` row; for a model the header plus ``a|b|c`` rows carry the
+    same information in far fewer tokens.
+
+    Args:
+        df (pd.DataFrame): Table to encode
+        index (bool, optional): Include the index as the first column
+
+    Returns:
+        str: Header line followed by one line per row
+    """
+    columns = [str(df.index.name or "")] + [str(c) for c in df.columns] if index else [str(c) for c in df.columns]
+    lines = ["|".join(columns)]
+    for row in df.itertuples(index=index, name=None):
+        lines.append("|".join(format_value(value) for value in row))
+    return "\n".join(lines)
+
+
+class Section:
+    """
+    Part of a prompt that can be kept, shortened or dropped to fit a token budget
+
+    Args:
+        name (str): Identifier used in the report
+        priority (int): Lower values are kept first
+        title (str): Heading line (kept as-is)
+        body (str | pd.DataFrame | list): Text, table or list of lines
+        baseline (str, optional): Uncompacted rendering, only for the savings report
+        required (bool, optional): Never dropped or shortened
+        index (bool, optional): Include the index when body is a table
+    """
+
+    def __init__(self, name, priority, title, body, baseline=None, required=False, index=True):
+        self.name = name
+        self.priority = priority
+        self.title = title
+        self.body = body
+        self.baseline = baseline
+        self.required = required
+        self.index = index
+
+    def render(self, limit=None):
+        """
+        Render the section keeping at most ``limit`` rows / lines
+        """
+        if isinstance(self.body, pd.DataFrame):
+            table = self.body if limit is None else self.body.head(limit)
+            body = compact_table(table, index=self.index)
+            if limit is not None and limit < len(self.body):
+                body += f"\n(+{len(self.body) - limit} filas omitidas)"
+        elif isinstance(self.body, list):
+            lines = self.body if limit is None else self.body[:limit]
+            body = "\n".join(lines)
+            if limit is not None and limit < len(self.body):
+                body += f"\n(+{len(self.body) - limit} líneas omitidas)"
+        else:
+            body = self.body
+        return f"{self.title}\n{body}\n\n" if self.title else f"{body}\n\n"
+
+    def length(self):
+        return len(self.body) if isinstance(self.body, (pd.DataFrame, list)) else None
+
+
+def fit_sections(sections, budget, model=None):
+    """
+    Assemble the sections in their original order within a token budget
+
+    Sections are admitted by priority. One that does not fit whole is shortened
+    (fewer rows / lines, halving down to MIN_TABLE_ROWS) and dropped if it
+    still does not fit. Required sections are always kept.
+
+    Args:
+        sections (list): Section objects in the order they should appear
+        budget (int): Maximum tokens of the resulting text
+        model (str, optional): Model used to count tokens
+
+    Returns:
+        tuple: (text, report) where report lists kept, shortened and dropped sections
+               and compares the tokens against the uncompacted baseline
+    """
+    rendered = {}
+    used = 0
+    shortened, dropped = [], []
+    for section in sorted((s for s in sections if s.required), key=lambda s: s.priority):
+        rendered[section.name] = section.render()
+        used += count_tokens(rendered[section.name], model)
+
+    for section in sorted((s for s in sections if not s.required), key=lambda s: s.priority):
+        text = section.render()
+        tokens = count_tokens(text, model)
+        limit = section.length()
+        while used + tokens > budget and limit is not None and limit > MIN_TABLE_ROWS:
+            limit = max(limit // 2, MIN_TABLE_ROWS)
+            text = section.render(limit)
+            tokens = count_tokens(text, model)
+        if used + tokens > budget:
+            dropped.append(section.name)
+            continue
+        if limit is not None and limit < section.length():
+            shortened.append(section.name)
+        rendered[section.name] = text
+        used += tokens
+
+    text = "".join(rendered[s.name] for s in sections if s.name in rendered)
+    baseline_tokens = sum(count_tokens(s.baseline if s.baseline is not None else s.render(), model) for s in sections)
+    prompt_tokens = count_tokens(text, model)
+    report = {
+        "budget": budget,
+        "prompt_tokens": prompt_tokens,
+        "baseline_tokens": baseline_tokens,
+        "saved_tokens": max(baseline_tokens - prompt_tokens, 0),
+        "saved_ratio": (1 - prompt_tokens / baseline_tokens) if baseline_tokens else 0.0,
+        "shortened": shortened,
+        "dropped": dropped,
+    }
+    return text, report
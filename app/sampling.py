@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# Filas de la muestra que se envía al modelo
+PROMPT_SAMPLE_ROWS = 5
+# Semilla fija: el mismo archivo produce el mismo prompt (y aprovecha el caché de respuestas)
+DEFAULT_SEED = 42
+
+
+class ReservoirSample:
+    """
+    Uniform sample of ``size`` rows from a stream of chunks, in one pass
+
+    Vectorized Algorithm R: row t (0-based) replaces a random slot with
+    probability size / (t + 1). Only ``size`` rows are held in memory, so it
+    works on files of any length; the result is in file order.
+    """
+
+    def __init__(self, size, seed=DEFAULT_SEED):
+        self.size = size
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._rows = None
+        self._positions = np.empty(0, dtype=np.int64)
+
+    def update(self, chunk: pd.DataFrame):
+        """
+        Add a chunk of rows
+        """
+        rows = len(chunk)
+        if not rows or not self.size:
+            return
+        chunk = chunk.reset_index(drop=True)
+        positions = np.arange(self.seen, self.seen + rows, dtype=np.int64)
+
+        # Las primeras filas llenan el reservorio (el índice de _rows es el número de lugar)
+        fill = max(min(self.size - len(self._positions), rows), 0)
+        if fill:
+            head = chunk.iloc[:fill].set_axis(range(len(self._positions), len(self._positions) + fill))
+            self._rows = head if self._rows is None else pd.concat([self._rows, head])
+            self._positions = np.concatenate([self._positions, positions[:fill]])
+
+        # El resto reemplaza un lugar al azar; si dos filas caen en el mismo, queda la última
+        if fill < rows:
+            candidates = positions[fill:]
+            slots = (self._rng.random(len(candidates)) * (candidates + 1)).astype(np.int64)
+            accepted = np.flatnonzero(slots < self.size)
+            if len(accepted):
+                last = pd.Series(accepted).groupby(slots[accepted]).last()
+                replaced = last.index.to_numpy()
+                incoming = chunk.iloc[fill + last.to_numpy()].set_axis(replaced)
+                self._rows = pd.concat([self._rows.drop(index=replaced), incoming])
+                self._positions[replaced] = candidates[last.to_numpy()]
+        self.seen += rows
+
+    def result(self):
+        """
+        Return the sampled rows in the order they appear in the file
+        """
+        if self._rows is None:
+            return pd.DataFrame()
+        order = np.argsort(self._positions, kind="stable")
+        return self._rows.loc[order].reset_index(drop=True)
+
+
+def stratified_sample(df: pd.DataFrame, column, size, seed=DEFAULT_SEED):
+    """
+    Sample rows so every value of ``column`` is represented
+
+    Each stratum gets at least one row (the most frequent first if there are
+    more strata than rows) and the rest are allocated in proportion to its size.
+
+    Returns:
+        pd.DataFrame: The sampled rows in their original order
+    """
+    counts = df[column].value_counts(dropna=True)
+    counts = counts[counts > 0]
+    if counts.empty:
+        return df.sample(min(size, len(df)), random_state=seed).sort_index()
+    if len(counts) >= size:
+        allocation = pd.Series(1, index=counts.index[:size])
+    else:
+        # Una fila por estrato y el resto por mayor resto de la cuota proporcional
+        share = counts / counts.sum() * (size - len(counts))
+        allocation = share.astype(int) + 1
+        remaining = size - int(allocation.sum())
+        if remaining > 0:
+            order = (share - share.astype(int)).sort_values(ascending=False).index[:remaining]
+            allocation[order] += 1
+        allocation = allocation.clip(upper=counts)
+
+    rng = np.random.default_rng(seed)
+    positions = []
+    values = df[column].to_numpy()
+    for value, rows in allocation.items():
+        members = np.flatnonzero(values == value)
+        positions.extend(rng.choice(members, size=int(rows), replace=False))
+    return df.iloc[np.sort(positions)]
+
+
+def representative_sample(df: pd.DataFrame, roles=None, size=PROMPT_SAMPLE_ROWS, seed=DEFAULT_SEED):
+    """
+    Pick the rows shown to the model instead of df.head()
+
+    The first rows of a sorted export all share the same date or category; a
+    sample stratified by the main category (or a random one if there is none)
+    shows the variety of the data.
+
+    Args:
+        df (pd.DataFrame): Data (or a reservoir sample of it)
+        roles (dict, optional): Column roles from detect_column_roles()
+        size (int, optional): Rows to return
+        seed (int, optional): Random seed, fixed so prompts are reproducible
+
+    Returns:
+        tuple: (sample, description) where description names the method in Spanish
+    """
+    if len(df) <= size:
+        return df, "todas las filas"
+    for category in (roles or {}).get("categories", []):
+        if category in df.columns and df[category].nunique(dropna=True) > 1:
+            return stratified_sample(df, category, size, seed), f"estratificada por {category}"
+    return df.sample(size, random_state=seed).sort_index(), "aleatoria"
@@ -0,0 +1,422 @@
+import math
+
+import pandas as pd
+
+
+class NumericAccumulator:
+    """
+    Mergeable running statistics of one numeric column
+
+    Keeps count, sum, min, max and the sum of squared deviations (M2) so the
+    mean and standard deviation can be computed chunk by chunk and partial
+    results can be merged (Chan et al. parallel variance).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def update(self, values: pd.Series):
+        """
+        Add a chunk of values (NaN are ignored)
+        """
+        values = values.dropna()
+        if values.empty:
+            return
+        other = NumericAccumulator()
+        other.count = int(values.size)
+        other.total = float(values.sum())
+        other.mean = other.total / other.count
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.minimum = float(values.min())
+        other.maximum = float(values.max())
+        self.merge(other)
+
+    def merge(self, other):
+        """
+        Merge another accumulator into this one
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.total, self.mean, self.m2 = other.count, other.total, other.mean, other.m2
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def std(self):
+        """
+        Sample standard deviation (same definition as pandas' describe())
+        """
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count else math.nan,
+            "std": self.std,
+            "min": self.minimum if self.count else math.nan,
+            "max": self.maximum if self.count else math.nan,
+            "sum": self.total,
+        }
+
+
+def summarize_numeric_chunks(chunks):
+    """
+    Compute describe()-like statistics of the numeric columns over a stream of chunks
+
+    Only one chunk is held in memory at a time.
+
+    Args:
+        chunks (iterable): DataFrames with the same columns (e.g. pd.read_csv(..., chunksize=n))
+
+    Returns:
+        tuple: (summary, rows, columns) where summary is a DataFrame with count,
+               mean, std, min, max and sum per numeric column
+    """
+    accumulators = {}
+    rows = 0
+    columns = None
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+        rows += len(chunk)
+        for column in chunk.select_dtypes(include="number").columns:
+            accumulators.setdefault(column, NumericAccumulator()).update(chunk[column])
+
+    summary = pd.DataFrame({column: acc.as_dict() for column, acc in accumulators.items()})
+    return summary, rows, columns or []
+
+
+# --- Motor de estadísticas por roles de columna ---
+
+# Pistas en los nombres de columna (en minúsculas, sin acentos)
+_ID_HINTS = ("id", "codigo", "code", "sku", "rut", "folio", "uuid")
+_MONEY_HINTS = ("venta", "sales", "monto", "importe", "total", "ingreso", "revenue", "costo", "cost",
+                "precio", "price", "amount", "margen", "profit", "utilidad")
+# Medidas principales (totales de negocio) y medidas que no tiene sentido sumar
+_PRIMARY_HINTS = ("venta", "sales", "monto", "importe", "total", "ingreso", "revenue", "amount")
+_NON_ADDITIVE_HINTS = ("precio", "price", "tasa", "rate", "porcentaje", "percent", "pct", "promedio",
+                       "avg", "edad", "age", "lat", "lon")
+
+# Una columna de texto se trata como categoría si tiene como máximo este número de valores distintos
+MAX_CATEGORY_CARDINALITY = 50
+# Límites de pares categoría × medida que se reportan como insights
+MAX_INSIGHT_MEASURES = 3
+MAX_INSIGHT_CATEGORIES = 5
+
+
+def _normalize_name(name):
+    table = str.maketrans("áéíóúñ", "aeioun")
+    return str(name).lower().translate(table)
+
+
+def _name_has(name, hints):
+    words = [w for w in _normalize_name(name).replace("-", "_").replace(" ", "_").split("_") if w]
+    return any(word.startswith(hint) or word == hint for word in words for hint in hints)
+
+
+def is_money_column(name):
+    """
+    Check whether a measure name looks monetary (to format it with $)
+    """
+    return _name_has(name, _MONEY_HINTS)
+
+
+# Formatos de fecha en texto, en orden de prioridad: ISO y luego día/mes antes que mes/día,
+# porque dd/mm/aaaa es el formato local y un 03/04/2024 ambiguo es el 3 de abril
+DATE_FORMATS = (
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d",
+    "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%y", "%d-%m-%y",
+    "%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y",
+)
+
+
+def _date_sample(series):
+    return series.dropna().astype(str).head(200)
+
+
+def infer_date_format(series):
+    """
+    Return the DATE_FORMATS entry that parses the dates of a text column, or None
+
+    Inferring the format once, on the sample used to detect the column role,
+    makes every chunk parse the same way: without it pandas guesses per call
+    and may read dd/mm/yyyy as mm/dd/yyyy.
+    """
+    sample = _date_sample(series)
+    if sample.empty:
+        return None
+    for date_format in DATE_FORMATS:
+        if pd.to_datetime(sample, format=date_format, errors="coerce").notna().mean() > 0.9:
+            return date_format
+    return None
+
+
+def parse_dates(values, date_format=None):
+    """
+    Parse a date column with the format recorded in its roles (day first if unknown)
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if date_format:
+        return pd.to_datetime(values, format=date_format, errors="coerce")
+    return pd.to_datetime(values, errors="coerce", dayfirst=True)
+
+
+def _looks_like_dates(series):
+    sample = _date_sample(series)
+    if sample.empty or not sample.str.contains(r"[-/]").mean() > 0.9:
+        return False
+    return parse_dates(sample, infer_date_format(sample)).notna().mean() > 0.9
+
+
+def detect_column_roles(df: pd.DataFrame):
+    """
+    Classify the columns of a DataFrame by the role they play in the analysis
+
+    Args:
+        df (pd.DataFrame): Data (or a representative first chunk)
+
+    Returns:
+        dict: Lists of column names under "measures" (numeric values to
+              aggregate), "categories" (low-cardinality dimensions), "dates"
+              and "ids" (identifiers, ignored in aggregations). Measures are
+              ordered so the most relevant (monetary names) come first.
+              "date_formats" maps each text date column to its strftime
+              format (None if it has to be parsed day first).
+    """
+    roles = {"measures": [], "categories": [], "dates": [], "ids": [], "date_formats": {}}
+    rows = len(df)
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series):
+            roles["categories"].append(column)
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            roles["dates"].append(column)
+        elif pd.api.types.is_numeric_dtype(series):
+            unique_ratio = series.nunique() / rows if rows else 0
+            if _name_has(column, _ID_HINTS) and (unique_ratio > 0.9 or pd.api.types.is_integer_dtype(series)):
+                roles["ids"].append(column)
+            else:
+                roles["measures"].append(column)
+        elif _looks_like_dates(series):
+            roles["dates"].append(column)
+            roles["date_formats"][column] = infer_date_format(series)
+        else:
+            distinct = series.nunique()
+            if _name_has(column, _ID_HINTS) or (rows > 20 and distinct / rows > 0.9):
+                roles["ids"].append(column)
+            elif distinct <= MAX_CATEGORY_CARDINALITY:
+                roles["categories"].append(column)
+
+    # Totales de negocio primero ('Ventas' antes que 'Unidades'), medidas no sumables al final
+    roles["measures"].sort(key=_measure_rank)
+    return roles
+
+
+def _measure_rank(column):
+    if is_additive_measure(column) and _name_has(column, _PRIMARY_HINTS):
+        return 0
+    return 1 if is_additive_measure(column) else 2
+
+
+def is_additive_measure(name):
+    """
+    Check whether summing a measure makes sense (prices or rates do not add up)
+    """
+    return not _name_has(name, _NON_ADDITIVE_HINTS)
+
+
+class DatasetStats:
+    """
+    Mergeable statistics of a dataset, computed chunk by chunk
+
+    Each update() is one vectorized pass over the chunk: numeric moments for
+    every measure, one groupby per category (all measures at once) and one
+    monthly groupby per date column. Accumulators from different chunks or
+    processes can be combined with merge(), and instances are picklable.
+    """
+
+    def __init__(self, roles):
+        """
+        Args:
+            roles (dict): Column roles as returned by detect_column_roles()
+        """
+        self.roles = roles
+        self.rows = 0
+        self.columns = None
+        self.numeric = {column: NumericAccumulator() for column in roles["measures"]}
+        # categoría -> DataFrame indexado por valor con la suma de cada medida y "__rows__"
+        self.groups = {}
+        # fecha -> DataFrame indexado por mes con la suma de cada medida y "__rows__"
+        self.trends = {}
+
+    def update(self, chunk: pd.DataFrame):
+        """
+        Add a chunk of rows
+        """
+        if chunk.empty:
+            return
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        self.rows += len(chunk)
+        measures = [c for c in self.roles["measures"] if c in chunk.columns]
+
+        for column in measures:
+            self.numeric[column].update(chunk[column])
+
+        # Las sumas por grupo se acumulan en 64 bits: optimize_dtypes() reduce los enteros a int8/int16
+        widened = {c: "Int64" if pd.api.types.is_extension_array_dtype(chunk[c].dtype) else "int64"
+                   for c in measures if pd.api.types.is_integer_dtype(chunk[c].dtype)}
+        values = chunk[measures].astype(widened) if measures else pd.DataFrame(index=chunk.index)
+        values = values.assign(__rows__=1)
+        for category in self.roles["categories"]:
+            if category not in chunk.columns:
+                continue
+            totals = values.groupby(chunk[category], observed=True, dropna=True).sum()
+            self._add(self.groups, category, totals)
+
+        date_formats = self.roles.get("date_formats", {})
+        for date_column in self.roles["dates"]:
+            if date_column not in chunk.columns:
+                continue
+            dates = parse_dates(chunk[date_column], date_formats.get(date_column))
+            totals = values.groupby(dates.dt.to_period("M")).sum()
+            self._add(self.trends, date_column, totals)
+
+    @staticmethod
+    def _add(store, key, totals):
+        if key in store:
+            store[key] = store[key].add(totals, fill_value=0)
+        else:
+            store[key] = totals
+
+    def merge(self, other):
+        """
+        Merge the statistics of another chunk / partition into this one
+        """
+        if self.columns is None:
+            self.columns = other.columns
+        self.rows += other.rows
+        for column, accumulator in other.numeric.items():
+            self.numeric.setdefault(column, NumericAccumulator()).merge(accumulator)
+        for key, totals in other.groups.items():
+            self._add(self.groups, key, totals)
+        for key, totals in other.trends.items():
+            self._add(self.trends, key, totals)
+        return self
+
+    def estimated_size(self):
+        """
+        Approximate memory footprint in bytes (used by memory-bounded caches)
+        """
+        frames = list(self.groups.values()) + list(self.trends.values())
+        return sum(int(frame.memory_usage(deep=True).sum()) for frame in frames) + 200 * len(self.numeric) + 1024
+
+    def numeric_summary(self):
+        """
+        Return count, mean, std, min, max and sum per measure as a DataFrame
+        """
+        return pd.DataFrame({column: acc.as_dict() for column, acc in self.numeric.items()})
+
+    def group_totals(self, category):
+        """
+        Return the per-group sums of every measure (plus "__rows__") sorted by the main measure
+        """
+        totals = self.groups.get(category)
+        if totals is None:
+            return None
+        measures = self.roles["measures"]
+        return totals.sort_values(measures[0] if measures else "__rows__", ascending=False)
+
+    def monthly_trend(self, date_column):
+        """
+        Return the monthly sums of every measure (plus "__rows__") in chronological order
+        """
+        totals = self.trends.get(date_column)
+        return None if totals is None else totals.sort_index()
+
+    def insights(self):
+        """
+        Human readable findings computed directly from the data (in Spanish)
+
+        Returns:
+            list: Bullet point strings
+        """
+        lines = []
+        measures = [m for m in self.roles["measures"] if is_additive_measure(m)][:MAX_INSIGHT_MEASURES]
+
+        def fmt(column, value):
+            if is_money_column(column):
+                return f"${value:,.2f}"
+            return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+
+        for measure in measures:
+            lines.append(f"- {measure} total registrado: {fmt(measure, self.numeric[measure].total)}")
+        for measure in self.roles["measures"]:
+            if not is_additive_measure(measure) and self.numeric[measure].count:
+                lines.append(f"- {measure} promedio: {fmt(measure, self.numeric[measure].mean)}")
+
+        for category in self.roles["categories"][:MAX_INSIGHT_CATEGORIES]:
+            totals = self.groups.get(category)
+            if totals is None or totals.empty:
+                continue
+            for measure in measures:
+                column_totals = totals[measure]
+                grand_total = column_totals.sum()
+                top, bottom = column_totals.idxmax(), column_totals.idxmin()
+                share = f", {column_totals[top] / grand_total:.1%} del total" if grand_total else ""
+                lines.append(f"- {category} con mayor {measure}: {top} ({fmt(measure, column_totals[top])}{share})")
+                if len(column_totals) > 1:
+                    lines.append(f"- {category} con menor {measure}: {bottom} ({fmt(measure, column_totals[bottom])})")
+
+        for date_column in self.roles["dates"]:
+            trend = self.monthly_trend(date_column)
+            if trend is None or len(trend) < 2 or not measures:
+                continue
+            measure = measures[0]
+            series = trend[measure]
+            first, last = series.iloc[0], series.iloc[-1]
+            lines.append(
+                f"- Tendencia mensual de {measure} ({date_column}): de {fmt(measure, first)} en {series.index[0]} "
+                f"a {fmt(measure, last)} en {series.index[-1]}"
+                + (f" ({(last - first) / first:+.1%})" if first else "")
+            )
+            lines.append(f"- Mes con mayor {measure}: {series.idxmax()} ({fmt(measure, series.max())}); "
+                         f"mes con menor {measure}: {series.idxmin()} ({fmt(measure, series.min())})")
+        return lines
+
+
+def compute_dataset_stats(data, roles=None):
+    """
+    Compute DatasetStats from a DataFrame or an iterable of chunks
+
+    Args:
+        data (pd.DataFrame or iterable): Whole DataFrame or consecutive chunks
+        roles (dict, optional): Column roles; detected on the (first) chunk if omitted
+
+    Returns:
+        DatasetStats: The accumulated statistics (None if there are no rows)
+    """
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    stats = None
+    for chunk in chunks:
+        if stats is None:
+            stats = DatasetStats(roles or detect_column_roles(chunk))
+        stats.update(chunk)
+    return stats
@@ -1,5 +1,12 @@
-import ollama
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
 from website import Website, create_user_prompt
+from llm import build_stats, chat, stream_chat, stream_text
+from chunking import chunk_text, context_tokens, count_tokens, prompt_budget
+from metrics import observe_stage, record_error
+from dedup import EXACT, NEAR, UPDATED, get_index, text_changes
 
 def get_system_prompt():
     """
@@ -24,17 +31,334 @@ def create_messages(website):
         {"role": "user", "content": create_user_prompt(website)}
     ]
 
-def summarize_website(url, model="llama3.2"):
+def create_chunk_messages(website, chunk, index, total):
+    """
+    Create messages for the map stage: summarize one fragment of a long page
+    
+    Args:
+        website (Website): Website object with content
+        chunk (str): Fragment of website.text
+        index (int): Position of the fragment (1-based)
+        total (int): Number of fragments
+        
+    Returns:
+        list: List of message dictionaries for the Ollama API
+    """
+    user_prompt = f"Estás viendo el fragmento {index} de {total} de un sitio web titulado {website.title}."
+    user_prompt += "\nResume en pocos puntos clave el contenido de este fragmento, en español, \
+                    incluyendo noticias o anuncios si los hay. No agregues introducciones.\n\n"
+    user_prompt += chunk
+    return [
+        {"role": "system", "content": get_system_prompt()},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def create_reduce_messages(website, partial_summaries):
+    """
+    Create messages for the reduce stage: merge partial summaries into one
+    
+    Args:
+        website (Website): Website object with content
+        partial_summaries (list): Summaries of consecutive fragments of the page
+        
+    Returns:
+        list: List of message dictionaries for the Ollama API
+    """
+    user_prompt = f"Estás viendo un sitio web titulado {website.title}"
+    user_prompt += "\nEl sitio es extenso, por lo que se resumió por partes. A continuación están los resúmenes \
+                    parciales en orden; combínalos en un único resumen breve de este sitio en formato markdown, \
+                    sin repetir información. Si incluye noticias o anuncios, resúmelos también.\n\n"
+    user_prompt += "\n\n".join(
+        f"--- Parte {i} ---\n{summary}" for i, summary in enumerate(partial_summaries, start=1)
+    )
+    return [
+        {"role": "system", "content": get_system_prompt()},
+        {"role": "user", "content": user_prompt}
+    ]
+
+# Límite de rondas de fusión intermedia (cada ronda reduce el número de resúmenes a la mitad o menos)
+_MAX_REDUCE_ROUNDS = 6
+
+def create_update_messages(website, previous_summary, removed, added):
+    """
+    Create messages asking the LLM to update the summary of a previous version of the page
+    """
+    changes = "\n".join([f"- {line}" for line in removed if line.strip()] + [f"+ {line}" for line in added if line.strip()])
+    user_prompt = f"Estás viendo una nueva versión del sitio web titulado {website.title}.\n"
+    user_prompt += "Este es el resumen de la versión anterior:\n\n"
+    user_prompt += previous_summary
+    user_prompt += "\n\nEstos son los cambios del contenido (líneas eliminadas con '-', agregadas con '+'):\n\n"
+    user_prompt += changes
+    user_prompt += "\n\nActualiza el resumen para que refleje la versión actual del sitio, en formato markdown. \
+                    Responde solo con el resumen actualizado, sin mencionar que es una actualización."
+    return [
+        {"role": "system", "content": get_system_prompt()},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def find_previous_summary(website, model="llama3.2", use_cache=True):
+    """
+    Look for a summary of the same or a near-identical page (see dedup.py)
+    
+    The previous version of the same URL, or an identical or near-identical
+    page with the same title under another URL, is compared line by line:
+    pages whose text barely changed are served the stored summary. Pages with
+    moderate changes get messages to update the previous summary from the diff,
+    which is much shorter than the page.
+    
+    Args:
+        website (Website): Website object with content
+        model (str, optional): Name of the Ollama model to use
+        use_cache (bool, optional): When False no previous summary is reused
+        
+    Returns:
+        dict: {"summary": str} to serve as-is or {"messages": list} to update it,
+              plus "dedup" describing the match; None if the page must be summarized
+    """
+    # Sin cuerpo el texto es un aviso genérico: no identifica la página
+    index = get_index() if use_cache and website.has_body else None
+    if index is None or not index.enabled:
+        return None
+    try:
+        match = index.find(website.url, model, website.text, title=website.title)
+    except Exception as e:
+        record_error("dedup", e)
+        return None
+    if match is None:
+        index.record("misses")
+        return None
+
+    info = {"match": match["match"], "distance": match["distance"], "source_url": match["canonical_url"], "change_ratio": 0.0}
+    if match["match"] == EXACT:
+        index.record(EXACT)
+        return {"summary": match["summary"], "dedup": info}
+
+    removed, added, change_ratio = text_changes(match["text"], website.text)
+    info["change_ratio"] = change_ratio
+    if change_ratio <= config.DEDUP_SERVE_CHANGE_RATIO:
+        index.record(NEAR)
+        return {"summary": match["summary"], "dedup": info}
+    if change_ratio <= config.DEDUP_UPDATE_MAX_CHANGE_RATIO:
+        messages = create_update_messages(website, match["summary"], removed, added)
+        if _messages_tokens(messages, model) <= prompt_budget(model):
+            info["match"] = UPDATED
+            index.record(UPDATED)
+            return {"messages": messages, "dedup": info}
+    index.record("misses")
+    return None
+
+def store_summary(website, model, summary):
+    """
+    Index a finished summary so near-duplicates of the page can reuse it
+    """
+    index = get_index() if website.has_body else None
+    if index is None:
+        return
+    try:
+        index.store(website.url, model, website.text, summary, title=website.title)
+    except Exception as e:
+        record_error("dedup", e)
+
+def _served_stats(started_at):
+    stats = build_stats(started_at, None, time.perf_counter())
+    stats["time_to_first_token"] = stats["total_time"]
+    stats["cached"] = True
+    return stats
+
+def _store_when_done(stream, result, website, model):
+    """
+    Pass the stream through and index the summary once it completed successfully
+    """
+    yield from stream
+    if result.get("success") and result.get("summary"):
+        store_summary(website, model, result["summary"])
+
+def _messages_tokens(messages, model):
+    return sum(count_tokens(m["content"], model) for m in messages)
+
+def _group_by_budget(texts, budget, model):
+    """
+    Group consecutive texts so each group fits in the token budget
+    """
+    groups, current, current_tokens = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text, model)
+        if current and current_tokens + tokens > budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+def prepare_summary_messages(website, model="llama3.2", use_cache=True):
+    """
+    Build the messages for the final summary, fitting the model's token budget
+    
+    Pages that fit are sent as-is. Longer pages are split into chunks that are
+    summarized in parallel (map) and the final messages merge the partial
+    summaries (reduce); if even those do not fit, they are merged in
+    intermediate rounds first.
+    
+    Args:
+        website (Website): Website object with content
+        model (str, optional): Name of the Ollama model to use
+        use_cache (bool, optional): Reuse cached completions for the map stage
+        
+    Returns:
+        tuple: (messages, metrics) where metrics describes chunks, tokens and time per stage
+    """
+    prompt_started_at = time.perf_counter()
+    budget = prompt_budget(model)
+    options = {"num_ctx": context_tokens(model)}
+    messages = create_messages(website)
+    prompt_tokens = _messages_tokens(messages, model)
+    metrics = {
+        "strategy": "single",
+        "prompt_budget": budget,
+        "input_tokens": prompt_tokens,
+        "chunks": 1,
+        "map_time": 0.0,
+        "map_completion_tokens": 0,
+        "reduce_rounds": 0,
+        "reduce_time": 0.0,
+    }
+    if prompt_tokens <= budget:
+        observe_stage("prompt", time.perf_counter() - prompt_started_at, kind="web")
+        return messages, metrics
+
+    # --- Map: resumir cada fragmento en paralelo ---
+    overhead = _messages_tokens(create_chunk_messages(website, "", 1, 1), model) + 16
+    chunks = chunk_text(website.text, max(budget - overhead, 128), model)
+    metrics.update({"strategy": "map_reduce", "chunks": len(chunks)})
+    observe_stage("prompt", time.perf_counter() - prompt_started_at, kind="web")
+
+    def run(messages_for_call):
+        return chat(model, messages_for_call, use_cache=use_cache, options=options)
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=config.MAP_REDUCE_WORKERS) as pool:
+        outputs = list(pool.map(run, [
+            create_chunk_messages(website, chunk, i, len(chunks)) for i, chunk in enumerate(chunks, start=1)
+        ]))
+        metrics["map_time"] = time.perf_counter() - started_at
+        metrics["map_completion_tokens"] = sum((stats.get("completion_tokens") or 0) for _, stats in outputs)
+        partials = [summary for summary, _ in outputs]
+
+        # --- Reduce intermedio: fusionar grupos de resúmenes hasta que quepan ---
+        started_at = time.perf_counter()
+        reduce_overhead = _messages_tokens(create_reduce_messages(website, []), model) + 16
+        while (len(partials) > 1 and metrics["reduce_rounds"] < _MAX_REDUCE_ROUNDS
+               and _messages_tokens(create_reduce_messages(website, partials), model) > budget):
+            groups = _group_by_budget(partials, max(budget - reduce_overhead, 128), model)
+            if len(groups) == len(partials):
+                # Cada resumen ocupa casi todo el presupuesto: fusionar de a pares para avanzar igual
+                groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+            partials = [summary for summary, _ in pool.map(run, [
+                create_reduce_messages(website, group) for group in groups
+            ])]
+            metrics["reduce_rounds"] += 1
+        metrics["reduce_time"] = time.perf_counter() - started_at
+
+    observe_stage("map", metrics["map_time"], model=model)
+    observe_stage("reduce", metrics["reduce_time"], model=model)
+    return create_reduce_messages(website, partials), metrics
+
+def summarize_loaded_website(website, model="llama3.2", use_cache=True):
+    """
+    Summarize an already downloaded Website using Ollama
+    
+    Args:
+        website (Website): Website object with content
+        model (str, optional): Name of the Ollama model to use
+        use_cache (bool, optional): Reuse a cached completion for identical content
+        
+    Returns:
+        dict: Dictionary with summary and status information
+    """
+    try:
+        if not website.is_valid():
+            return {
+                "success": False,
+                "summary": None,
+                "error": website.error or "Failed to load website"
+            }
+        
+        started_at = time.perf_counter()
+        previous = find_previous_summary(website, model=model, use_cache=use_cache)
+        if previous is not None and "summary" in previous:
+            return {
+                "success": True,
+                "summary": previous["summary"],
+                "website_title": website.title,
+                "error": None,
+                "stats": _served_stats(started_at),
+                "chunking": None,
+                "dedup": previous["dedup"]
+            }
+        
+        if previous is not None:
+            messages, chunking = previous["messages"], None
+        else:
+            messages, chunking = prepare_summary_messages(website, model=model, use_cache=use_cache)
+        summary, stats = chat(model, messages, use_cache=use_cache, options={"num_ctx": context_tokens(model)})
+        if use_cache:
+            store_summary(website, model, summary)
+        
+        return {
+            "success": True,
+            "summary": summary,
+            "website_title": website.title,
+            "error": None,
+            "stats": stats,
+            "chunking": chunking,
+            "dedup": previous["dedup"] if previous is not None else None
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "summary": None,
+            "error": str(e)
+        }
+
+def summarize_website(url, model="llama3.2", use_cache=True):
     """
     Summarize a website using Ollama
     
     Args:
         url (str): URL of the website to summarize
         model (str, optional): Name of the Ollama model to use
+        use_cache (bool, optional): Reuse a cached completion for identical content
         
     Returns:
         dict: Dictionary with summary and status information
     """
+    try:
+        website = Website(url)
+    except Exception as e:
+        return {
+            "success": False,
+            "summary": None,
+            "error": str(e)
+        }
+    return summarize_loaded_website(website, model=model, use_cache=use_cache)
+
+def summarize_website_stream(url, model="llama3.2", use_cache=True):
+    """
+    Summarize a website using Ollama, streaming the summary as it is generated
+    
+    Args:
+        url (str): URL of the website to summarize
+        model (str, optional): Name of the Ollama model to use
+        use_cache (bool, optional): Reuse a cached completion for identical content
+        
+    Returns:
+        dict: Same keys as summarize_website plus "stream", a generator of text
+              chunks. "summary", "stats" and (on failure) "error" are filled in
+              once the stream has been consumed.
+    """
     try:
         website = Website(url)
         
@@ -42,22 +366,47 @@ def summarize_website(url, model="llama3.2"):
             return {
                 "success": False,
                 "summary": None,
+                "stream": None,
                 "error": website.error or "Failed to load website"
             }
         
-        messages = create_messages(website)
-        response = ollama.chat(model=model, messages=messages)
+        started_at = time.perf_counter()
+        previous = find_previous_summary(website, model=model, use_cache=use_cache)
+        if previous is not None and "summary" in previous:
+            # Página ya resumida (o casi idéntica): se entrega el resumen guardado
+            return {
+                "success": True,
+                "summary": previous["summary"],
+                "website_title": website.title,
+                "error": None,
+                "stats": _served_stats(started_at),
+                "chunking": None,
+                "dedup": previous["dedup"],
+                "stream": stream_text(previous["summary"])
+            }
         
-        return {
+        if previous is not None:
+            messages, chunking = previous["messages"], None
+        else:
+            messages, chunking = prepare_summary_messages(website, model=model, use_cache=use_cache)
+        result = {
             "success": True,
-            "summary": response["message"]["content"],
+            "summary": None,
             "website_title": website.title,
-            "error": None
+            "error": None,
+            "stats": None,
+            "chunking": chunking,
+            "dedup": previous["dedup"] if previous is not None else None
         }
+        stream = stream_chat(model, messages, result, use_cache=use_cache,
+                             options={"num_ctx": context_tokens(model)})
+        result["stream"] = _store_when_done(stream, result, website, model) if use_cache else stream
+        return result
         
     except Exception as e:
         return {
             "success": False,
             "summary": None,
+            "stream": None,
             "error": str(e)
-        }
\ No newline at end of file
+        }
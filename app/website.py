@@ -1,33 +1,44 @@
-import requests
-from bs4 import BeautifulSoup
+from fetcher import get_fetcher
+from html_extract import extract, charset_from_content_type
+from metrics import record_error, stage_timer
 
 class Website:
-    def __init__(self, url, headers=None):
+    def __init__(self, url, headers=None, fetcher=None, backend=None):
         """
-        Create a Website object from the given URL using BeautifulSoup
+        Create a Website object from the given URL
         
         Args:
             url (str): The URL of the website to analyze
-            headers (dict, optional): HTTP headers for the request
+            headers (dict, optional): Extra HTTP headers for the request
+            fetcher (Fetcher, optional): HTTP client to use; defaults to the shared one
+            backend (str, optional): HTML extraction backend (see html_extract); defaults to config.HTML_BACKEND
         """
         self.url = url
+        self.from_cache = False
+        self.has_body = False
+        self.content = None
+        self.encoding = None
+        self._soup = None
         
-        if headers is None:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36"
-            }
+        if fetcher is None:
+            fetcher = get_fetcher()
         
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            self.soup = BeautifulSoup(response.content, 'html.parser')
-            self.title = self.soup.title.string if self.soup.title else "No title found"
+            with stage_timer("fetch"):
+                response = fetcher.fetch(url, headers=headers)
+            self.from_cache = response.from_cache
+            self.content = response.content
+            self.encoding = charset_from_content_type(response.headers.get("Content-Type"))
             
-            if self.soup.body:
-                # Remove irrelevant elements
-                for irrelevant in self.soup.body(["script", "style", "img", "input", "nav", "footer"]):
-                    irrelevant.decompose()
-                self.text = self.soup.body.get_text(separator="\n", strip=True)
+            # Solo se extraen título y texto; el árbol completo (soup) se construye bajo demanda
+            with stage_timer("parse"):
+                extracted = extract(self.content, encoding=self.encoding, backend=backend)
+            self.backend = extracted["backend"]
+            self.title = extracted["title"] or "No title found"
+            
+            self.has_body = extracted["text"] is not None
+            if self.has_body:
+                self.text = extracted["text"]
             else:
                 self.text = "No se pudo obtener el cuerpo del sitio web."
                 
@@ -35,12 +46,23 @@ class Website:
             self.error = None
             
         except Exception as e:
-            self.soup = None
+            record_error("fetch" if self.content is None else "parse", e)
+            self.backend = None
             self.title = "Error"
             self.text = f"Error al acceder al sitio web: {str(e)}"
             self.status = "error"
             self.error = str(e)
     
+    @property
+    def soup(self):
+        """
+        BeautifulSoup tree of the page, built lazily on first access
+        """
+        if self._soup is None and self.content is not None:
+            from bs4 import BeautifulSoup
+            self._soup = BeautifulSoup(self.content, 'html.parser')
+        return self._soup
+    
     def show_soup(self):
         """
         Return the soup object
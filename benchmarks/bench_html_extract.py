@@ -0,0 +1,135 @@
+"""
+Benchmark de los backends de extracción de texto HTML (app/html_extract.py).
+
+Compara tiempo por documento y memoria pico de cada backend disponible sobre
+los HTML guardados en benchmarks/fixtures/html/ (más una versión ampliada de
+cada uno para simular páginas grandes).
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_html_extract.py
+    python benchmarks/bench_html_extract.py --repeat 20 --scale 10 --json resultados.json
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+import html_extract  # noqa: E402
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "html")
+
+
+def load_fixtures(scale):
+    """
+    Load the saved HTML pages plus a scaled-up copy of each one
+    """
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            content = f.read()
+        name = os.path.splitext(os.path.basename(path))[0]
+        fixtures[name] = content
+        if scale > 1:
+            # Repite el cuerpo para obtener una página grande con la misma estructura
+            head, sep, rest = content.partition(b"<body>")
+            body, sep_end, tail = rest.rpartition(b"</body>")
+            fixtures[f"{name}_x{scale}"] = head + sep + body * scale + sep_end + tail
+    return fixtures
+
+
+def time_backend(backend, content, repeat):
+    """
+    Median and minimum wall time of one extraction
+    """
+    html_extract.BACKENDS[backend](content)  # warm-up (imports, caches)
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        html_extract.BACKENDS[backend](content)
+        timings.append(time.perf_counter() - started_at)
+    return statistics.median(timings), min(timings)
+
+
+def python_peak(backend, content):
+    """
+    Peak Python heap allocated during one extraction (tracemalloc)
+    """
+    tracemalloc.start()
+    html_extract.BACKENDS[backend](content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def _rss_worker(backend, content, conn):
+    html_extract.BACKENDS[backend](b"<html><body></body></html>")  # cargar módulos antes de medir
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    html_extract.BACKENDS[backend](content)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send((after - before) * 1024)  # ru_maxrss está en KiB en Linux
+    conn.close()
+
+
+def rss_peak(backend, content):
+    """
+    Peak resident memory growth of one extraction, measured in a fresh process
+    so native allocations (libxml2, lexbor) are included
+    """
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_rss_worker, args=(backend, content, child))
+    process.start()
+    value = parent.recv()
+    process.join()
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Repeticiones por backend y documento")
+    parser.add_argument("--scale", type=int, default=20, help="Factor de ampliación de las páginas grandes")
+    parser.add_argument("--backends", nargs="*", help="Backends a comparar (por defecto, todos los disponibles)")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    backends = args.backends or html_extract.available_backends()
+    fixtures = load_fixtures(args.scale)
+    if not fixtures:
+        print(f"No hay fixtures en {FIXTURES_DIR}", file=sys.stderr)
+        return 1
+
+    results = []
+    print(f"{'documento':<18} {'KB':>7} {'backend':<11} {'mediana ms':>11} {'mín ms':>8} {'heap py MB':>11} {'RSS MB':>8}")
+    for name, content in fixtures.items():
+        for backend in backends:
+            median, best = time_backend(backend, content, args.repeat)
+            heap = python_peak(backend, content)
+            rss = rss_peak(backend, content)
+            results.append({
+                "document": name,
+                "size_bytes": len(content),
+                "backend": backend,
+                "median_seconds": median,
+                "min_seconds": best,
+                "python_peak_bytes": heap,
+                "rss_peak_bytes": rss,
+            })
+            print(f"{name:<18} {len(content) / 1024:>7.0f} {backend:<11} {median * 1000:>11.2f} "
+                  f"{best * 1000:>8.2f} {heap / 2**20:>11.2f} {rss / 2**20:>8.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "scale": args.scale, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Benchmark de lectura de archivos de datos (app/ingest.py).
+
+Genera un CSV a partir de data/ventas_ejemplo.csv ampliado a millones de filas
+y compara, cada uno en un proceso nuevo:
+  - baseline:  pd.read_csv(sep=None, engine='python')  (camino original)
+  - fast:      separador detectado + motor pyarrow / C
+  - compact:   fast + tipos compactos (categorías, enteros reducidos)
+  - chunked:   estadísticas completas (stats.DatasetStats) calculadas por bloques
+  - stats:     compact + estadísticas de todas las filas (camino de un archivo nuevo)
+  - incremental: compact + estadísticas solo de las filas agregadas a una versión ya
+               guardada con el 99% de las filas (app/incremental.py)
+  - outofcore_chunks: chunked + muestra de reservorio para el prompt (app/outofcore.py)
+  - outofcore_duckdb: lo mismo calculado por DuckDB desde disco (si duckdb está instalado)
+  - parquet:   el mismo dataset leído desde Parquet (si pyarrow está instalado)
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_ingest.py --rows 2000000
+    python benchmarks/bench_ingest.py --rows 5000000 --skip-baseline --json resultados.json
+"""
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import incremental  # noqa: E402
+import ingest  # noqa: E402
+import outofcore  # noqa: E402
+import stats  # noqa: E402
+
+SAMPLE_CSV = os.path.join(ROOT, "data", "ventas_ejemplo.csv")
+# Parte del archivo que ya estaba analizada en el caso "incremental"
+PREVIOUS_SHARE = 0.99
+
+
+def build_dataset(rows, directory):
+    """
+    Scale the sample sales file up to ``rows`` rows, varying dates, IDs and units
+    """
+    base = pd.read_csv(SAMPLE_CSV)
+    repeats = -(-rows // len(base))
+    df = pd.concat([base] * repeats, ignore_index=True).iloc[:rows]
+    rng = np.random.default_rng(42)
+    df["Fecha"] = (pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit="D")).strftime("%Y-%m-%d")
+    df["ID_Venta"] = [f"CL{i:08d}" for i in range(rows)]
+    df["Unidades"] = rng.integers(1, 50, rows)
+    df["Ventas"] = df["Unidades"] * df["Precio_Unitario"]
+
+    csv_path = os.path.join(directory, "ventas_grande.csv")
+    df.to_csv(csv_path, index=False)
+    parquet_path = None
+    try:
+        parquet_path = os.path.join(directory, "ventas_grande.parquet")
+        df.to_parquet(parquet_path, index=False)
+    except ImportError:
+        parquet_path = None
+    return csv_path, parquet_path
+
+
+def _baseline(path):
+    return pd.read_csv(path, sep=None, engine="python", on_bad_lines="warn")
+
+
+def _fast(path):
+    return ingest.read_csv_fast(path)
+
+
+def _compact(path):
+    return ingest.read_table(path)
+
+
+def _chunked(path):
+    return ingest.compute_chunked_statistics(path)
+
+
+def _stats(path):
+    return stats.compute_dataset_stats(ingest.read_table(path))
+
+
+def _store_path(path):
+    return os.path.join(os.path.dirname(path), "datasets.sqlite3")
+
+
+def seed_previous_version(path):
+    """
+    Store the statistics of the first PREVIOUS_SHARE of the rows, as if yesterday's export was analyzed
+    """
+    df = ingest.read_table(path)
+    store = incremental.DatasetStore(_store_path(path))
+    incremental.compute_stats_incrementally(df.iloc[:int(len(df) * PREVIOUS_SHARE)], store)
+
+
+def _incremental(path):
+    store = incremental.DatasetStore(_store_path(path))
+    stats_, dataset = incremental.compute_stats_incrementally(ingest.read_table(path), store)
+    if dataset["match"] != incremental.APPENDED:
+        raise RuntimeError("No se reconoció la versión anterior del archivo")
+    return stats_
+
+
+def _parquet(path):
+    return ingest.read_table(path)
+
+
+def _outofcore_chunks(path):
+    return outofcore.analyze_large_file(path, engine=outofcore.CHUNKS)
+
+
+def _outofcore_duckdb(path):
+    result = outofcore.analyze_large_file(path, engine=outofcore.DUCKDB)
+    if result["engine"] != outofcore.DUCKDB:
+        raise RuntimeError("DuckDB falló; se usó la lectura por bloques")
+    return result
+
+
+CASES = {
+    "baseline": _baseline,
+    "fast": _fast,
+    "compact": _compact,
+    "chunked": _chunked,
+    "stats": _stats,
+    "incremental": _incremental,
+    "parquet": _parquet,
+    "outofcore_chunks": _outofcore_chunks,
+    "outofcore_duckdb": _outofcore_duckdb,
+}
+
+
+def _worker(case, path, conn):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started_at = time.perf_counter()
+    df = CASES[case](path)
+    elapsed = time.perf_counter() - started_at
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    frame_bytes = int(df.memory_usage(deep=True).sum()) if isinstance(df, pd.DataFrame) else 0
+    conn.send({"seconds": elapsed, "rss_peak_bytes": (after - before) * 1024, "frame_bytes": frame_bytes})
+    conn.close()
+
+
+def run_case(case, path):
+    """
+    Run one reader in a fresh process so peak memory is not polluted by previous runs
+    """
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_worker, args=(case, path, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Filas del CSV generado")
+    parser.add_argument("--skip-baseline", action="store_true", help="Omitir el motor 'python' (muy lento)")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Generando {args.rows:,} filas...", file=sys.stderr)
+        csv_path, parquet_path = build_dataset(args.rows, directory)
+        size = os.path.getsize(csv_path)
+
+        results = []
+        print(f"{'caso':<16} {'segundos':>9} {'RSS pico MB':>12} {'DataFrame MB':>13}")
+        for case in CASES:
+            if case == "baseline" and args.skip_baseline:
+                continue
+            if case == "parquet" and parquet_path is None:
+                continue
+            if case == "outofcore_duckdb" and importlib.util.find_spec("duckdb") is None:
+                continue
+            path = parquet_path if case == "parquet" else csv_path
+            if case == "incremental":
+                seed_previous_version(path)
+            result = run_case(case, path)
+            result["case"] = case
+            results.append(result)
+            print(f"{case:<16} {result['seconds']:>9.2f} {result['rss_peak_bytes'] / 2**20:>12.0f} "
+                  f"{result['frame_bytes'] / 2**20:>13.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"rows": args.rows, "csv_bytes": size, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
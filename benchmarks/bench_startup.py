@@ -0,0 +1,166 @@
+"""
+Benchmark de arranque en frío de los puntos de entrada de la app.
+
+Cada caso se ejecuta en un intérprete nuevo y mide el tiempo hasta que está
+listo para trabajar, junto con la memoria pico (RSS) del proceso:
+  - cli_help:          python app/cli.py --help
+  - cli_summarize:     módulos que carga "cli.py summarize" antes de descargar la página
+  - cli_analyze:       módulos que carga "cli.py analyze" antes de leer el archivo
+  - api:               python app/api.py hasta que GET /health responde
+  - streamlit_imports: módulos que importa app/main.py (requiere streamlit)
+  - streamlit:         streamlit run app/main.py hasta que /_stcore/health responde
+                       (el script se ejecuta recién al abrir la primera sesión,
+                       así que a esto hay que sumarle streamlit_imports)
+
+La primera ejecución de cada caso se descarta (compila los .pyc); el resto mide
+un arranque con el disco en caché, como el de un servicio que se reinicia.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --json arranque.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "app")
+
+MAIN_IMPORTS = "import streamlit, pandas, summarizer, data_analyzer, multitable, batch, jobs, ollama_pool, dedup, llm_cache"
+
+CASES = {
+    "cli_help": {"argv": ["cli.py", "--help"]},
+    "cli_summarize": {"argv": ["-c", "import cli, summarizer"]},
+    "cli_analyze": {"argv": ["-c", "import cli, multitable, data_analyzer"]},
+    "api": {"argv": ["api.py", "--port", "{port}"], "health": "/health"},
+    "streamlit_imports": {"argv": ["-c", MAIN_IMPORTS], "requires": "streamlit"},
+    "streamlit": {
+        "argv": ["-m", "streamlit", "run", "main.py", "--server.headless=true", "--server.port={port}",
+                 "--browser.gatherUsageStats=false"],
+        "health": "/_stcore/health",
+        "requires": "streamlit",
+    },
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait(process):
+    """
+    Reap the process and return (exit code, peak RSS in bytes)
+    """
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, usage.ru_maxrss * 1024
+
+
+def _error_output(log):
+    log.seek(0)
+    return log.read().decode("utf-8", "replace").strip()[-500:]
+
+
+def run_once(case, timeout):
+    """
+    Start the case in a new interpreter
+
+    Returns:
+        tuple: (seconds until ready, peak RSS in bytes)
+    """
+    spec = CASES[case]
+    port = _free_port()
+    argv = [sys.executable] + [arg.format(port=port) for arg in spec["argv"]]
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+
+    with tempfile.TemporaryFile() as log:
+        started_at = time.perf_counter()
+        process = subprocess.Popen(argv, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=log)
+        if "health" not in spec:
+            code, rss = _wait(process)
+            elapsed = time.perf_counter() - started_at
+            if code:
+                raise RuntimeError(_error_output(log))
+            return elapsed, rss
+
+        url = f"http://127.0.0.1:{port}{spec['health']}"
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(_error_output(log))
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            if time.perf_counter() - started_at > timeout:
+                process.kill()
+                _wait(process)
+                raise RuntimeError(f"{url} no respondió en {timeout} s")
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - started_at
+        process.terminate()
+        _, rss = _wait(process)
+        return elapsed, rss
+
+
+def run_case(case, repeat, timeout):
+    run_once(case, timeout)  # descartada: compila los .pyc
+    samples = [run_once(case, timeout) for _ in range(repeat)]
+    seconds = [elapsed for elapsed, _ in samples]
+    return {
+        "case": case,
+        "median": statistics.median(seconds),
+        "min": min(seconds),
+        "max": max(seconds),
+        "rss_peak_bytes": max(rss for _, rss in samples),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES), help="Casos a ejecutar, separados por coma")
+    parser.add_argument("--repeat", type=int, default=5, help="Arranques medidos por caso")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Segundos máximos hasta que un servidor responde")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    args = parser.parse_args(argv)
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"Casos desconocidos: {', '.join(sorted(unknown))}")
+
+    results = []
+    print(f"{'caso':<18} {'mediana s':>10} {'mín s':>8} {'máx s':>8} {'RSS MB':>7}")
+    for case in cases:
+        requires = CASES[case].get("requires")
+        if requires and importlib.util.find_spec(requires) is None:
+            print(f"{case:<18} omitido: {requires} no está instalado")
+            continue
+        try:
+            result = run_case(case, args.repeat, args.timeout)
+        except RuntimeError as e:
+            print(f"{case:<18} falló: {e}")
+            continue
+        results.append(result)
+        print(f"{case:<18} {result['median']:>10.3f} {result['min']:>8.3f} {result['max']:>8.3f} "
+              f"{result['rss_peak_bytes'] / 2**20:>7.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
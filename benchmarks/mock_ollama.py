@@ -0,0 +1,204 @@
+"""
+Servidor HTTP que imita la API de Ollama para benchmarks sin GPU ni modelos.
+
+Implementa /api/chat (con y sin streaming), /api/tags y /api/version con una
+latencia configurable: tiempo de carga, prefill proporcional a los tokens del
+prompt y generación a una velocidad fija de tokens/s. Como el servidor real,
+atiende como máximo --parallel solicitudes a la vez (OLLAMA_NUM_PARALLEL); el
+resto espera su turno.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/mock_ollama.py --port 11435 --tokens-per-second 40
+    OLLAMA_HOST=http://127.0.0.1:11435 streamlit run app/main.py
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "el análisis muestra que las ventas crecieron en el último trimestre mientras "
+    "los costos se mantuvieron estables y el departamento de tecnología lidera "
+    "los ingresos con productos de alta demanda"
+).split()
+
+# Caracteres por token usados para estimar prompt_eval_count
+CHARS_PER_TOKEN = 4
+
+
+class MockSettings:
+    """
+    Latency model of the mock server
+    """
+
+    def __init__(self, load_time=0.0, prefill_tokens_per_second=2000.0, tokens_per_second=50.0,
+                 completion_tokens=120, parallel=1, models=("llama3.2", "llama3.1", "mistral", "phi3")):
+        self.load_time = load_time
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.parallel = parallel
+        self.models = models
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _make_handler(settings):
+    slots = threading.BoundedSemaphore(settings.parallel)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json({"models": [
+                    {"name": f"{name}:latest", "model": f"{name}:latest", "modified_at": _now(), "size": 0,
+                     "digest": "0" * 64, "details": {"format": "gguf", "family": name}}
+                    for name in settings.models
+                ]})
+            elif self.path == "/api/version":
+                self._send_json({"version": "0.0.0-mock"})
+            elif self.path == "/":
+                body = b"Ollama is running"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            if self.path != "/api/chat":
+                self._send_json({"error": "not found"}, status=404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            model = request.get("model", "")
+            if model.split(":", 1)[0] not in settings.models:
+                self._send_json({"error": f"model '{model}' not found"}, status=404)
+                return
+
+            prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+            prompt_tokens = prompt_chars // CHARS_PER_TOKEN + 1
+            completion_tokens = int((request.get("options") or {}).get("num_predict") or settings.completion_tokens)
+            prefill_time = prompt_tokens / settings.prefill_tokens_per_second
+            token_time = 1.0 / settings.tokens_per_second
+
+            with slots:
+                started_at = time.perf_counter()
+                time.sleep(settings.load_time + prefill_time)
+                final = {
+                    "model": model,
+                    "created_at": _now(),
+                    "message": {"role": "assistant", "content": ""},
+                    "done_reason": "stop",
+                    "done": True,
+                    "load_duration": int(settings.load_time * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(prefill_time * 1e9),
+                    "eval_count": completion_tokens,
+                    "eval_duration": int(completion_tokens * token_time * 1e9),
+                }
+                words = [WORDS[i % len(WORDS)] + " " for i in range(completion_tokens)]
+
+                if request.get("stream", True):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    try:
+                        for word in words:
+                            time.sleep(token_time)
+                            self._write_chunk({"model": model, "created_at": _now(),
+                                               "message": {"role": "assistant", "content": word}, "done": False})
+                        final["total_duration"] = int((time.perf_counter() - started_at) * 1e9)
+                        self._write_chunk(final)
+                        self.wfile.write(b"0\r\n\r\n")
+                    except (BrokenPipeError, ConnectionResetError):
+                        self.close_connection = True  # el cliente abandonó el stream (p.ej. cancelación)
+                else:
+                    time.sleep(token_time * completion_tokens)
+                    final["message"]["content"] = "".join(words).strip()
+                    final["total_duration"] = int((time.perf_counter() - started_at) * 1e9)
+                    self._send_json(final)
+
+        def _write_chunk(self, payload):
+            data = json.dumps(payload).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_mock_ollama(settings=None, host="127.0.0.1", port=0):
+    """
+    Start the mock server in a background thread
+
+    Args:
+        settings (MockSettings, optional): Latency model; defaults to MockSettings()
+        port (int, optional): 0 picks a free port
+
+    Returns:
+        ThreadingHTTPServer: The running server (its URL is ``server_url(server)``)
+    """
+    server = ThreadingHTTPServer((host, port), _make_handler(settings or MockSettings()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-ollama", daemon=True).start()
+    return server
+
+
+def server_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def add_arguments(parser):
+    """
+    Command line options of the latency model (shared with run_benchmarks.py)
+    """
+    parser.add_argument("--load-time", type=float, default=0.0, help="Segundos de carga del modelo por solicitud")
+    parser.add_argument("--prefill-rate", type=float, default=2000.0, help="Tokens de prompt procesados por segundo")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Velocidad de generación")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Tokens generados por respuesta")
+    parser.add_argument("--parallel", type=int, default=1, help="Solicitudes atendidas a la vez (OLLAMA_NUM_PARALLEL)")
+
+
+def settings_from_args(args):
+    return MockSettings(load_time=args.load_time, prefill_tokens_per_second=args.prefill_rate,
+                        tokens_per_second=args.tokens_per_second, completion_tokens=args.completion_tokens,
+                        parallel=args.parallel)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = start_mock_ollama(settings_from_args(args), host=args.host, port=args.port)
+    print(f"Ollama simulado en {server_url(server)} (Ctrl+C para detener)", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Suite de benchmarks reproducible y sin conexión.
+
+Levanta un Ollama simulado (benchmarks/mock_ollama.py) y un servidor HTTP local
+con las páginas de benchmarks/fixtures/html/, y mide, cada caso en un proceso nuevo:
+  - website:                     Website(url) (descarga + extracción)
+  - summarize_website:           resumen completo de una página
+  - read_uploaded_file:          lectura de un CSV subido (data/ventas_ejemplo.csv ampliado)
+  - create_data_analysis_prompt: estadísticas + prompt del análisis de datos
+  - analyze_dataframe_with_llm:  análisis completo de un DataFrame
+
+Para cada caso y cada nivel de concurrencia (N llamadas simultáneas) reporta
+percentiles de latencia, throughput y memoria pico (RSS). Los cachés de páginas
+y de respuestas se desactivan para que cada iteración haga el trabajo completo.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/run_benchmarks.py --json resultados.json
+    python benchmarks/run_benchmarks.py --cases summarize_website --concurrency 1,4,8 --parallel 4
+    python benchmarks/run_benchmarks.py --json nuevo.json --compare resultados.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import mock_ollama
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "app")
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "html")
+SAMPLE_CSV = os.path.join(ROOT, "data", "ventas_ejemplo.csv")
+
+CASES = ("website", "summarize_website", "read_uploaded_file", "create_data_analysis_prompt",
+         "analyze_dataframe_with_llm")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server():
+    """
+    Serve benchmarks/fixtures/html/ on a free local port from a background thread
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=FIXTURES_DIR))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fixtures", daemon=True).start()
+    return server
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile (0-100) of a list of values
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def _csv_bytes(rows):
+    import pandas as pd
+
+    base = pd.read_csv(SAMPLE_CSV)
+    repeats = -(-rows // len(base))
+    df = pd.concat([base] * repeats, ignore_index=True).iloc[:rows]
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def _uploaded(content, name="ventas.csv"):
+    uploaded = io.BytesIO(content)
+    uploaded.name = name
+    return uploaded
+
+
+def build_case(case, args, page_urls):
+    """
+    Prepare the inputs of a case and return the operation to time
+
+    App modules are imported here, inside the worker process, after OLLAMA_HOST
+    and the cache settings have been set in the environment.
+    """
+    sys.path.insert(0, APP_DIR)
+
+    if case == "website":
+        from website import Website
+
+        def op(i):
+            website = Website(page_urls[i % len(page_urls)])
+            if not website.is_valid():
+                raise RuntimeError(website.error)
+        return op
+
+    if case == "summarize_website":
+        from summarizer import summarize_website
+
+        def op(i):
+            result = summarize_website(page_urls[i % len(page_urls)], model=args.model, use_cache=False)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+        return op
+
+    from data_analyzer import analyze_dataframe_with_llm, create_data_analysis_prompt, read_uploaded_file
+
+    content = _csv_bytes(args.rows)
+    if case == "read_uploaded_file":
+        def op(i):
+            df, error = read_uploaded_file(_uploaded(content))
+            if error:
+                raise RuntimeError(error)
+        return op
+
+    df, _ = read_uploaded_file(_uploaded(content))
+    if case == "create_data_analysis_prompt":
+        return lambda i: create_data_analysis_prompt(df)
+
+    if case == "analyze_dataframe_with_llm":
+        def op(i):
+            result = analyze_dataframe_with_llm(df, args.model, use_cache=False)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+        return op
+
+    raise ValueError(f"Caso desconocido: {case}")
+
+
+def run_level(op, iterations, concurrency):
+    """
+    Run ``iterations`` operations with ``concurrency`` simultaneous callers
+
+    Returns:
+        dict: Latency percentiles, throughput and error count
+    """
+    latencies = []
+    errors = []
+
+    def timed(i):
+        started_at = time.perf_counter()
+        try:
+            op(i)
+        except Exception as e:
+            errors.append(str(e))
+            return
+        latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(iterations)))
+    elapsed = time.perf_counter() - started_at
+    return {
+        "concurrency": concurrency,
+        "iterations": iterations,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else None,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "elapsed": elapsed,
+    }
+
+
+def _worker(case, args, page_urls, conn):
+    try:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        op = build_case(case, args, page_urls)
+        op(0)  # calentamiento: imports, conexiones, cachés de pandas
+        levels = [run_level(op, args.iterations, concurrency) for concurrency in args.concurrency]
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        conn.send({"levels": levels, "rss_peak_bytes": (after - before) * 1024})
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    conn.close()
+
+
+def run_case(case, args, page_urls):
+    """
+    Run one case in a fresh process so peak memory is not polluted by previous cases
+    """
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_worker, args=(case, args, page_urls, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """
+    Print the change of p50 latency and throughput against a previous JSON run
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    def change(new, old):
+        if new is None or not old:
+            return "    n/d"
+        return f"{(new - old) / old * 100:+6.1f}%"
+
+    print(f"\nComparación con {baseline_path}")
+    print(f"{'caso':<30} {'N':>3} {'p50':>8} {'throughput':>11}")
+    for result in results:
+        old = baseline.get((result["case"], result["concurrency"]))
+        if old is None:
+            continue
+        print(f"{result['case']:<30} {result['concurrency']:>3} {change(result['p50'], old['p50']):>8} "
+              f"{change(result['throughput'], old['throughput']):>11}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES), help="Casos a ejecutar, separados por coma")
+    parser.add_argument("--iterations", type=int, default=20, help="Llamadas por nivel de concurrencia")
+    parser.add_argument("--concurrency", default="1,4", help="Niveles de concurrencia, separados por coma")
+    parser.add_argument("--rows", type=int, default=100_000, help="Filas del CSV de los casos de datos")
+    parser.add_argument("--model", default="llama3.2")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+    mock_ollama.add_arguments(parser)
+    args = parser.parse_args(argv)
+    args.concurrency = [int(n) for n in args.concurrency.split(",") if n.strip()]
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"Casos desconocidos: {', '.join(sorted(unknown))}")
+
+    ollama_server = mock_ollama.start_mock_ollama(mock_ollama.settings_from_args(args))
+    fixture_server = start_fixture_server()
+    fixture_url = mock_ollama.server_url(fixture_server)
+    page_urls = [f"{fixture_url}/{name}" for name in sorted(os.listdir(FIXTURES_DIR)) if name.endswith(".html")]
+
+    # Los procesos de cada caso heredan esta configuración antes de importar la app
+    os.environ["OLLAMA_HOST"] = mock_ollama.server_url(ollama_server)
+    os.environ["IA_AGENT_LLM_CACHE"] = "0"
+    os.environ["IA_AGENT_PAGE_CACHE"] = "0"
+
+    results = []
+    print(f"{'caso':<30} {'N':>3} {'p50 s':>8} {'p90 s':>8} {'p99 s':>8} {'op/s':>8} {'RSS MB':>7} {'errores':>7}")
+    for case in cases:
+        outcome = run_case(case, args, page_urls)
+        if "error" in outcome:
+            print(f"{case:<30} falló: {outcome['error']}")
+            continue
+        for level in outcome["levels"]:
+            result = dict(level, case=case, rss_peak_bytes=outcome["rss_peak_bytes"])
+            results.append(result)
+            fmt = lambda value: f"{value:>8.3f}" if value is not None else f"{'n/d':>8}"  # noqa: E731
+            print(f"{case:<30} {level['concurrency']:>3} {fmt(level['p50'])} {fmt(level['p90'])} {fmt(level['p99'])} "
+                  f"{level['throughput']:>8.2f} {outcome['rss_peak_bytes'] / 2**20:>7.0f} {level['errors']:>7}")
+            if level["first_error"]:
+                print(f"    primer error: {level['first_error']}", file=sys.stderr)
+
+    ollama_server.shutdown()
+    fixture_server.shutdown()
+
+    if args.json:
+        meta = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
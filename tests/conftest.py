@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Los módulos de app/ se importan como scripts (import config, import stats, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+# Cachés y almacenes en un directorio temporal, nunca en el del usuario
+os.environ["IA_AGENT_CACHE_DIR"] = tempfile.mkdtemp(prefix="ia-agent-tests-")
+os.environ.setdefault("IA_AGENT_METRICS_PORT", "0")
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import api
+import summarizer
+from jobs import CANCELLED, DONE, RUNNING, JobManager
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+@pytest.fixture
+def manager(monkeypatch, release):
+    manager = JobManager(workers=1)
+    monkeypatch.setattr(api, "get_job_manager", lambda: manager)
+
+    def fake_summarize(url, model="llama3.2", use_cache=True):
+        def stream():
+            for part in ("Resumen ", "de prueba"):
+                release.wait(5)
+                yield part
+
+        return {"success": True, "summary": None, "error": None, "stream": stream()}
+
+    monkeypatch.setattr(summarizer, "summarize_website_stream", fake_summarize)
+    return manager
+
+
+async def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timeout"
+        await asyncio.sleep(0.01)
+
+
+async def _open_request(port, payload):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(b"POST /summarize HTTP/1.1\r\nHost: test\r\nContent-Type: application/json\r\n"
+                 + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+    await writer.drain()
+    return reader, writer
+
+
+def _with_server(scenario):
+    async def main():
+        server = await asyncio.start_server(api._handle_connection, "127.0.0.1", 0)
+        async with server:
+            await scenario(server.sockets[0].getsockname()[1])
+
+    asyncio.run(main())
+
+
+def test_summarize_answers_with_the_job_result(manager, release):
+    async def scenario(port):
+        reader, writer = await _open_request(port, {"url": "https://example.com"})
+        release.set()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 200")
+        assert json.loads(body)["job"]["status"] == DONE
+
+    _with_server(scenario)
+
+
+def test_client_disconnect_withdraws_non_streamed_job(manager, release):
+    async def scenario(port):
+        reader, writer = await _open_request(port, {"url": "https://example.com"})
+        await _wait_for(lambda: manager.stats()[RUNNING] == 1)
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.2)
+        # Sin la cancelación el trabajo terminaría como DONE al liberar el stream
+        release.set()
+        await _wait_for(lambda: manager.stats()[CANCELLED] == 1)
+
+    _with_server(scenario)
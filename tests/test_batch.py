@@ -0,0 +1,88 @@
+import gzip
+import logging
+import time
+
+import pytest
+
+import batch
+from fetcher import FetchError
+
+
+class FakeWebsite:
+    def __init__(self, url):
+        self.url = url
+        self.error = None
+
+    def is_valid(self):
+        return True
+
+
+def test_summarize_urls_stopped_early_raises_nothing(monkeypatch, caplog):
+    caplog.set_level(logging.ERROR, logger="concurrent.futures")
+
+    def fake_fetch(url):
+        time.sleep(0.01)
+        return FakeWebsite(url), 0.01
+
+    def fake_summarize(url, website, fetch_time, model, use_cache):
+        time.sleep(0.01)
+        return {"success": True, "summary": url, "error": None, "url": url,
+                "fetch_time": fetch_time, "inference_time": 0.01}
+
+    monkeypatch.setattr(batch, "_fetch", fake_fetch)
+    monkeypatch.setattr(batch, "_summarize", fake_summarize)
+
+    urls = [f"https://example.com/{i}" for i in range(50)]
+    results = batch.summarize_urls(urls, fetch_workers=8, llm_workers=1)
+    result, report = next(results)
+    assert result["success"]
+    assert report["completed"] == 1
+    results.close()
+
+    # Las descargas que aún terminan tras el cierre no deben encolar más trabajo
+    time.sleep(0.1)
+    assert not caplog.records
+
+
+def test_summarize_urls_yields_every_url(monkeypatch):
+    monkeypatch.setattr(batch, "_fetch", lambda url: (FakeWebsite(url), 0.0))
+    monkeypatch.setattr(batch, "_summarize", lambda url, website, fetch_time, model, use_cache: {
+        "success": True, "summary": url, "error": None, "url": url, "fetch_time": 0.0, "inference_time": 0.0})
+
+    urls = [f"https://example.com/{i}" for i in range(10)]
+    seen = [result["url"] for result, _ in batch.summarize_urls(urls, fetch_workers=3, llm_workers=2)]
+    assert sorted(seen) == sorted(urls)
+
+
+class FakeFetcher:
+    def __init__(self, content=None, error=None):
+        self.content = content
+        self.error = error
+
+    def fetch(self, url):
+        if self.error:
+            raise self.error
+        return type("Result", (), {"content": self.content})()
+
+
+@pytest.mark.parametrize("fetcher", [
+    FakeFetcher(error=FetchError("Connection refused")),
+    FakeFetcher(content=b"<urlset><url><loc>https://example.com/"),
+])
+def test_unreadable_sitemap_is_reported(monkeypatch, capsys, fetcher):
+    monkeypatch.setattr(batch, "get_fetcher", lambda: fetcher)
+    assert batch.main(["--sitemap", "https://example.com/sitemap.xml"]) == 1
+    assert capsys.readouterr().err.startswith("Error: ")
+
+
+def test_sitemap_index_is_followed(monkeypatch):
+    pages = {
+        "https://example.com/sitemap.xml": b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                           b"<sitemap><loc>https://example.com/a.xml</loc></sitemap></sitemapindex>",
+        "https://example.com/a.xml": gzip.compress(b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                                   b"<url><loc>https://example.com/1</loc></url>"
+                                                   b"<url><loc>https://example.com/2</loc></url></urlset>"),
+    }
+    fetcher = type("Fetcher", (), {"fetch": lambda self, url: FakeFetcher(pages[url]).fetch(url)})()
+    assert batch.load_sitemap_urls("https://example.com/sitemap.xml", fetcher=fetcher) == \
+        ["https://example.com/1", "https://example.com/2"]
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+import incremental
+from data_analyzer import prepare_uploaded_file
+from memo import MemoryLRU, estimate_size
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = incremental.DatasetStore(str(tmp_path / "datasets.sqlite3"))
+    monkeypatch.setattr(incremental, "_store", store)
+    return store
+
+
+def test_cached_entries_are_not_modified_after_set(tmp_path, store):
+    path = tmp_path / "ventas.csv"
+    pd.DataFrame({"Region": ["Norte", "Sur"] * 50, "Ventas": range(100)}).to_csv(path, index=False)
+    cache = MemoryLRU(64 * 1024 * 1024)
+
+    first = prepare_uploaded_file(str(path), cache=cache, model="llama3.2")
+    assert first["error"] is None and not first["cached"]
+    data_key = first["key"]
+    data = cache.get(data_key)
+    data_keys = set(data)
+
+    second = prepare_uploaded_file(str(path), cache=cache, model="qwen2.5")
+    again = prepare_uploaded_file(str(path), cache=cache, model="llama3.2")
+    assert second["cached"] and again["cached"]
+    assert again["prompt"] == first["prompt"]
+
+    # La entrada del archivo no cambia al generar prompts; cada prompt tiene su propia entrada
+    assert cache.get(data_key) is data and set(data) == data_keys
+    entries = dict(cache._entries)
+    assert set(entries) == {data_key, f"{data_key}:prompt:llama3.2", f"{data_key}:prompt:qwen2.5"}
+    prompt, size = entries[f"{data_key}:prompt:qwen2.5"]
+    assert prompt[0] == second["prompt"] and size == estimate_size(prompt)
+    assert cache.stats()["bytes"] == sum(size for _, size in entries.values())
+
+
+def test_analysis_requests_the_model_context_window(monkeypatch):
+    import data_analyzer
+    from chunking import context_tokens
+
+    calls = []
+
+    def fake_chat(model, messages, use_cache=True, options=None):
+        calls.append(options)
+        return "Resumen", {}
+
+    def fake_stream_chat(model, messages, result, postprocess=None, use_cache=True, options=None):
+        calls.append(options)
+        return iter(())
+
+    monkeypatch.setattr(data_analyzer, "chat", fake_chat)
+    monkeypatch.setattr(data_analyzer, "stream_chat", fake_stream_chat)
+    df = pd.DataFrame({"Region": ["Norte", "Sur"], "Ventas": [1, 2]})
+
+    assert data_analyzer.analyze_dataframe_with_llm(df, "llama3.2", prompt="p")["success"]
+    assert data_analyzer.analyze_dataframe_with_llm_stream(df, "llama3.2", prompt="p")["success"]
+    assert calls == [{"num_ctx": context_tokens("llama3.2")}] * 2
@@ -0,0 +1,108 @@
+import random
+from types import SimpleNamespace
+
+import dedup
+import summarizer
+from dedup import EXACT, NEAR, UPDATED, SummaryIndex, canonicalize_url, hamming, simhash, text_changes
+
+WORDS = ("ventas", "clientes", "producto", "precio", "región", "mercado", "envío", "oferta", "stock", "marca")
+
+
+def _page(seed, lines=40, words=10):
+    rng = random.Random(seed)
+    return "\n".join(
+        " ".join(rng.choice(WORDS) + str(rng.randrange(50)) for _ in range(words)) for _ in range(lines)
+    )
+
+
+def _edit_lines(text, count):
+    lines = text.splitlines()
+    for i in range(count):
+        lines[i * 9] = f"línea {i} actualizada con las novedades del trimestre y los nuevos precios de temporada"
+    return "\n".join(lines)
+
+
+def test_canonical_url_ignores_tracking_and_trivial_differences():
+    assert canonicalize_url("HTTPS://Example.com:443/blog/?utm_source=x&b=2&a=1#top") == \
+        canonicalize_url("https://example.com/blog?a=1&b=2&fbclid=abc")
+
+
+def test_simhash_distance_tracks_text_similarity():
+    text = _page(1)
+    edited = text.replace(text.split()[10], "cambio", 1)
+    assert hamming(simhash(text), simhash(text)) == 0
+    assert hamming(simhash(text), simhash(edited)) < hamming(simhash(text), simhash(_page(2)))
+
+
+def test_index_finds_exact_and_near_duplicates(tmp_path):
+    index = SummaryIndex(str(tmp_path / "summaries.sqlite3"), max_entries=100)
+    text = _page(1)
+    index.store("https://example.com/a?utm_campaign=x", "llama3.2", text, "Resumen A", title="A")
+
+    exact = index.find("https://mirror.example.org/a", "llama3.2", text, title="A")
+    assert exact["match"] == EXACT and not exact["same_url"]
+    assert exact["summary"] == "Resumen A" and exact["text"] == text
+
+    words = text.split(" ")
+    words[200] = "actualizado"
+    near = index.find("https://mirror.example.org/a", "llama3.2", " ".join(words), title="A")
+    assert near is not None and near["match"] == NEAR and near["distance"] <= index.max_distance
+
+    # Otro título u otro modelo no reutilizan el resumen
+    assert index.find("https://mirror.example.org/a", "llama3.2", text, title="B") is None
+    assert index.find("https://example.com/a", "otro-modelo", text, title="A") is None
+    assert index.find("https://example.com/b", "llama3.2", _page(2), title="A") is None
+
+
+def test_same_url_is_found_whatever_the_distance(tmp_path):
+    index = SummaryIndex(str(tmp_path / "summaries.sqlite3"))
+    text = _page(1)
+    index.store("https://example.com/a", "llama3.2", text, "Resumen A", title="A")
+
+    assert index.find("https://example.com/a/?utm_source=x", "llama3.2", text, title="A")["match"] == EXACT
+
+    edited = _edit_lines(text, 4)
+    match = index.find("https://example.com/a", "llama3.2", edited, title="Otro título")
+    assert match["same_url"] and match["match"] == NEAR and match["text"] == text
+    assert match["distance"] > index.max_distance
+    # Fuera de la URL, un texto tan cambiado no es un casi duplicado
+    assert index.find("https://mirror.example.org/a", "llama3.2", edited, title="A") is None
+
+
+def test_short_texts_are_not_indexed_or_shared(tmp_path):
+    index = SummaryIndex(str(tmp_path / "summaries.sqlite3"))
+    notice = "You need to enable JavaScript to run this app."
+    index.store("https://shop-a.example.com/", "llama3.2", notice, "Tienda A", title="Shop")
+    index.store("https://shop-a.example.com/", "llama3.2", "No se pudo obtener el cuerpo del sitio web.",
+                "Tienda A", title="Shop")
+
+    assert index.stats()["entries"] == 0
+    assert index.find("https://bank-b.example.com/", "llama3.2", notice, title="Shop") is None
+
+
+def test_changed_page_is_updated_from_the_diff_with_default_settings(tmp_path, monkeypatch):
+    index = SummaryIndex(str(tmp_path / "summaries.sqlite3"))
+    monkeypatch.setattr(summarizer, "get_index", lambda: index)
+    text = _page(1)
+    page = SimpleNamespace(url="https://example.com/a", title="A", text=text, has_body=True)
+    summarizer.store_summary(page, "llama3.2", "Resumen A")
+
+    page.text = _edit_lines(text, 4)
+    removed, added, ratio = text_changes(text, page.text)
+    assert dedup.config.DEDUP_SERVE_CHANGE_RATIO < ratio <= dedup.config.DEDUP_UPDATE_MAX_CHANGE_RATIO
+
+    previous = summarizer.find_previous_summary(page, model="llama3.2")
+    assert previous["dedup"]["match"] == UPDATED
+    assert previous["dedup"]["source_url"] == canonicalize_url(page.url)
+    assert "Resumen A" in previous["messages"][-1]["content"]
+    assert index.stats()[UPDATED] == 1
+
+
+def test_pages_without_body_are_not_indexed(tmp_path, monkeypatch):
+    index = SummaryIndex(str(tmp_path / "summaries.sqlite3"))
+    monkeypatch.setattr(summarizer, "get_index", lambda: index)
+    page = SimpleNamespace(url="https://example.com/a", title="A", text=_page(1), has_body=False)
+
+    summarizer.store_summary(page, "llama3.2", "Resumen A")
+    assert index.stats()["entries"] == 0
+    assert summarizer.find_previous_summary(page, model="llama3.2") is None
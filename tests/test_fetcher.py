@@ -0,0 +1,175 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetcher import Fetcher, FetchError, PageCache
+
+
+class Site:
+    """
+    Local http.server stand-in: each path maps to a function that answers the request
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests.append((self.path, dict(self.headers)))
+                site.routes[self.path](self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def respond(handler, status=200, body=b"", headers=None):
+    handler.send_response(status)
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    if "Content-Length" not in (headers or {}):
+        handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+@pytest.fixture
+def site():
+    site = Site()
+    yield site
+    site.close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    return Fetcher(connect_timeout=2, read_timeout=2, total_timeout=5, retries=0,
+                   cache=PageCache(str(tmp_path / "pages.sqlite3")))
+
+
+def _conditional(site, path):
+    return {k: v for k, v in site.requests[-1][1].items() if k.startswith("If-")} \
+        if site.requests[-1][0] == path else None
+
+
+def test_response_without_validators_removes_the_stored_page(site, fetcher):
+    validators = {"ETag": '"v1"'}
+    site.routes["/page"] = lambda h: respond(h, body=b"<p>uno</p>", headers=validators)
+    fetcher.fetch(site.url("/page"))
+
+    validators = {}
+    site.routes["/page"] = lambda h: respond(h, body=b"<p>dos</p>", headers=validators)
+    fetcher.fetch(site.url("/page"))
+    assert _conditional(site, "/page") == {"If-None-Match": '"v1"'}
+    assert fetcher.cache.get(site.url("/page")) is None
+
+    # Sin entrada guardada ya no se envían validadores obsoletos
+    fetcher.fetch(site.url("/page"))
+    assert _conditional(site, "/page") == {}
+
+
+def test_no_store_response_removes_the_stored_page(site, fetcher):
+    site.routes["/page"] = lambda h: respond(h, body=b"uno", headers={"ETag": '"v1"'})
+    fetcher.fetch(site.url("/page"))
+    site.routes["/page"] = lambda h: respond(h, body=b"dos", headers={"ETag": '"v2"', "Cache-Control": "no-store"})
+    assert fetcher.fetch(site.url("/page")).content == b"dos"
+    assert fetcher.cache.get(site.url("/page")) is None
+
+
+def test_not_modified_response_updates_the_validators(site, fetcher):
+    site.routes["/page"] = lambda h: respond(h, body=b"uno", headers={"ETag": '"v1"'})
+    fetcher.fetch(site.url("/page"))
+    site.routes["/page"] = lambda h: respond(h, 304, headers={"ETag": '"v2"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    result = fetcher.fetch(site.url("/page"))
+    assert result.revalidated and result.content == b"uno"
+
+    fetcher.fetch(site.url("/page"))
+    assert _conditional(site, "/page") == {"If-None-Match": '"v2"',
+                                           "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+def _last_modified_page(h):
+    if h.headers.get("If-Modified-Since") == "Mon, 01 Jan 2024 00:00:00 GMT":
+        respond(h, 304)
+    else:
+        respond(h, body=b"<p>hola</p>", headers={"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+
+def _etag_page(h):
+    if h.headers.get("If-None-Match") == '"v1"':
+        respond(h, 304, headers={"ETag": '"v1"'})
+    else:
+        respond(h, body=b"<p>hola</p>", headers={"ETag": '"v1"'})
+
+
+@pytest.mark.parametrize("page", [_etag_page, _last_modified_page])
+def test_cached_page_is_revalidated_with_304(site, fetcher, page):
+    site.routes["/page"] = page
+    first = fetcher.fetch(site.url("/page"))
+    second = fetcher.fetch(site.url("/page"))
+    assert not first.from_cache and first.content == b"<p>hola</p>"
+    assert second.from_cache and second.revalidated
+    assert second.status_code == 200 and second.content == first.content
+    assert len(site.requests) == 2
+
+
+def _streamed(h, size, delay=0.0):
+    # Sin Content-Length: el cuerpo termina al cerrar la conexión
+    h.send_response(200)
+    h.end_headers()
+    try:
+        for _ in range(size // 1000):
+            h.wfile.write(b"x" * 1000)
+            h.wfile.flush()
+            time.sleep(delay)
+    except OSError:
+        pass  # el cliente abandonó la descarga
+
+
+def test_max_bytes_from_content_length(site):
+    site.routes["/big"] = lambda h: respond(h, body=b"x" * 10_000)
+    with pytest.raises(FetchError, match="tamaño máximo"):
+        Fetcher(retries=0, max_bytes=5_000).fetch(site.url("/big"))
+    assert Fetcher(retries=0, max_bytes=10_000).fetch(site.url("/big")).content == b"x" * 10_000
+
+
+def test_max_bytes_from_a_streamed_body(site):
+    site.routes["/big"] = lambda h: _streamed(h, 200_000)
+    with pytest.raises(FetchError, match="tamaño máximo"):
+        Fetcher(retries=0, max_bytes=50_000).fetch(site.url("/big"))
+
+
+def test_total_timeout_stops_a_slow_download(site):
+    site.routes["/slow"] = lambda h: _streamed(h, 50_000, delay=0.1)
+    started_at = time.perf_counter()
+    with pytest.raises(FetchError, match="tiempo máximo de 0.5 s"):
+        Fetcher(retries=0, read_timeout=2, total_timeout=0.5).fetch(site.url("/slow"))
+    assert time.perf_counter() - started_at < 2
+
+
+@pytest.mark.parametrize("status", [404, 500])
+def test_http_errors_raise_fetch_error(site, fetcher, status):
+    site.routes["/error"] = lambda h: respond(h, status, body=b"error")
+    with pytest.raises(FetchError, match=str(status)):
+        fetcher.fetch(site.url("/error"))
+
+
+def test_connection_errors_raise_fetch_error(site):
+    url = site.url("/")
+    site.close()
+    with pytest.raises(FetchError):
+        Fetcher(retries=0, connect_timeout=1).fetch(url)
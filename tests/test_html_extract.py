@@ -0,0 +1,59 @@
+import glob
+import os
+
+import pytest
+
+from html_extract import BACKENDS, available_backends, decode_html, extract
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures", "html", "*.html")))
+
+EDGE_CASES = {
+    "sin_body": b"<html><head><title>T</title><style>p{}</style></head><p>Hola <b>mundo</b></p>"
+                b"<script>x()</script></html>",
+    "fragmento": b"<p>Solo un fragmento</p><div>dos</div>",
+    "solo_head": b"<html><head><title>T</title></head></html>",
+    "vacio": b"",
+    "en_blanco": b"  \n",
+    "texto_plano": "texto plano con ñ".encode("utf-8"),
+    "irrelevantes": b"<html><body><!-- c --><p>a</p><nav>menu</nav><footer>pie</footer><script>x</script></body></html>",
+    "title_sin_head": b"<title>T</title><h1>Hola</h1>",
+    "entidades": b"<body><p>caf&eacute; &amp; t&#233;</p></body>",
+    "meta_charset": '<html><head><meta charset="iso-8859-1"><title>Año</title></head><body>Señal</body></html>'.encode("latin-1"),
+}
+
+CASES = {os.path.basename(path): open(path, "rb").read() for path in FIXTURES}
+CASES.update(EDGE_CASES)
+
+
+def _extract_all(content):
+    results = {}
+    for name in available_backends():
+        result = extract(content, backend=name)
+        assert result["backend"] == name, f"{name} falló y se usó {result['backend']}"
+        results[name] = (result["title"], result["text"])
+    return results
+
+
+def test_fixtures_are_present():
+    assert len(FIXTURES) >= 2
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_backends_agree(case):
+    results = _extract_all(CASES[case])
+    assert len(results) > 1
+    reference = results["stream"]
+    assert {name: result for name, result in results.items() if result != reference} == {}
+
+
+def test_documents_without_body_keep_their_text():
+    for name in available_backends():
+        assert BACKENDS[name](EDGE_CASES["sin_body"])["text"] == "Hola\nmundo"
+        assert BACKENDS[name](EDGE_CASES["fragmento"])["text"] == "Solo un fragmento\ndos"
+        assert BACKENDS[name](EDGE_CASES["solo_head"]) == {"title": "T", "text": None}
+
+
+def test_declared_encoding_wins_over_meta_charset():
+    content = '<meta charset="utf-8"><p>Señal</p>'.encode("latin-1")
+    assert "Señal" in decode_html(content, "latin-1")
+    assert extract(content, encoding="latin-1", backend="stream")["text"] == "Señal"
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from incremental import APPENDED, UNCHANGED, DatasetStore, compute_stats_incrementally, prefix_hash, row_hashes, schema_hash
+from stats import compute_dataset_stats, detect_column_roles
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DatasetStore(str(tmp_path / "datasets.sqlite3"))
+
+
+def _sales(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Fecha": pd.date_range("2024-01-01", periods=rows, freq="D").strftime("%d/%m/%Y"),
+        "Region": rng.choice(["Norte", "Centro", "Sur"], rows),
+        "Ventas": rng.integers(0, 100, rows).astype("int8"),
+        "Precio": rng.random(rows) * 10,
+    })
+
+
+def _assert_same_stats(actual, expected):
+    assert actual.rows == expected.rows
+    for column, accumulator in expected.numeric.items():
+        assert actual.numeric[column].as_dict() == pytest.approx(accumulator.as_dict())
+    for category in expected.groups:
+        pd.testing.assert_frame_equal(actual.group_totals(category), expected.group_totals(category),
+                                      check_dtype=False)
+    for date_column in expected.trends:
+        pd.testing.assert_frame_equal(actual.monthly_trend(date_column), expected.monthly_trend(date_column),
+                                      check_dtype=False)
+
+
+def test_merge_of_split_halves_equals_full_recompute():
+    df = _sales(400)
+    roles = detect_column_roles(df)
+    merged = compute_dataset_stats(df.iloc[:150], roles=roles).merge(compute_dataset_stats(df.iloc[150:], roles=roles))
+    _assert_same_stats(merged, compute_dataset_stats(df, roles=roles))
+
+
+def test_prefix_hash_ignores_numeric_dtype():
+    df = _sales(50)
+    wider = df.astype({"Ventas": "int16"})
+    as_strings = df.astype({"Region": "category"})
+    assert prefix_hash(row_hashes(df), 50) == prefix_hash(row_hashes(wider), 50)
+    assert prefix_hash(row_hashes(df), 50) == prefix_hash(row_hashes(as_strings), 50)
+    assert schema_hash(df) == schema_hash(wider)
+
+
+def test_appended_rows_are_merged_into_the_stored_stats(store):
+    full = _sales(300)
+    first = full.iloc[:200].reset_index(drop=True)
+    _, dataset = compute_stats_incrementally(first, store=store)
+    assert dataset["match"] is None
+
+    # Al agregar filas el tipo de Ventas puede cambiar: la versión anterior debe reconocerse igual
+    stats, dataset = compute_stats_incrementally(full.astype({"Ventas": "int16"}), store=store)
+    assert dataset["match"] == APPENDED
+    assert dataset["previous_rows"] == 200 and dataset["delta"].rows == 100
+    _assert_same_stats(stats, compute_dataset_stats(full))
+
+    _, dataset = compute_stats_incrementally(full, store=store)
+    assert dataset["match"] == UNCHANGED
+    assert store.stats()["appended"] == 1 and store.stats()["unchanged"] == 1
+
+
+def test_edited_rows_are_not_treated_as_an_append(store):
+    df = _sales(100)
+    compute_stats_incrementally(df, store=store)
+    appended = pd.concat([df, _sales(20, seed=1)], ignore_index=True)
+    edited = appended.copy()
+    edited.loc[5, "Ventas"] = 101
+    _, dataset = compute_stats_incrementally(edited, store=store)
+    assert dataset["match"] is None
+    _, dataset = compute_stats_incrementally(appended, store=store)
+    assert dataset["match"] == APPENDED and dataset["previous_rows"] == 100
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from jobs import CANCELLED, DONE, QUEUED, RUNNING, JobManager
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.01)
+
+
+def _blocking_target(release, parts=("a", "b")):
+    def stream():
+        for part in parts:
+            release.wait(5)
+            yield part
+
+    return lambda: {"success": True, "summary": None, "error": None, "stream": stream()}
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_identical_requests_share_a_job(release):
+    manager = JobManager(workers=2, model_concurrency=1)
+    first = manager.submit("web", ("https://example.com",), "llama3.2", _blocking_target(release))
+    second = manager.submit("web", ("https://example.com",), "llama3.2", _blocking_target(release))
+    assert first == second
+    release.set()
+    _wait_for(lambda: manager.get(first).status == DONE)
+    assert manager.get(first).text == "ab"
+
+
+def test_resubmitting_a_cancelled_running_job_starts_a_new_one(release):
+    manager = JobManager(workers=2, model_concurrency=2)
+    first = manager.submit("web", ("https://example.com",), "llama3.2", _blocking_target(release))
+    _wait_for(lambda: manager.get(first).status == RUNNING)
+
+    assert manager.cancel(first)
+    second = manager.submit("web", ("https://example.com",), "llama3.2", _blocking_target(release))
+    assert second != first
+
+    release.set()
+    _wait_for(lambda: manager.get(first).finished and manager.get(second).finished)
+    assert manager.get(first).status == CANCELLED
+    assert manager.get(second).status == DONE
+
+
+def test_a_saturated_model_does_not_hold_the_workers(release):
+    manager = JobManager(workers=2, model_concurrency=1)
+    busy = manager.submit("web", ("1",), "slow", _blocking_target(release))
+    waiting = manager.submit("web", ("2",), "slow", _blocking_target(release))
+    _wait_for(lambda: manager.get(busy).status == RUNNING)
+
+    # El segundo trabajo de "slow" espera su cupo sin ocupar al otro worker
+    other = manager.submit("web", ("3",), "fast", _blocking_target(threading.Event(), parts=()))
+    _wait_for(lambda: manager.get(other).status == DONE)
+    assert manager.get(waiting).status == QUEUED
+    assert manager.position(waiting) == 0
+
+    release.set()
+    _wait_for(lambda: manager.get(waiting).status == DONE)
+
+
+def test_resubmitting_then_withdrawing_keeps_an_identical_job_running(release):
+    # Lo que hace main.submit_job al repetir la misma solicitud: encolar y luego retirarse del anterior
+    manager = JobManager(workers=1, model_concurrency=1)
+    first = manager.submit("web", ("https://example.com",), "llama3.2", _blocking_target(release))
+    _wait_for(lambda: manager.get(first).status == RUNNING)
+
+    second = manager.submit("web", ("https://example.com",), "llama3.2", _blocking_target(release))
+    assert second == first
+    assert not manager.cancel(first)
+    assert not manager.get(first).cancel_event.is_set()
+
+    # La sesión sigue siendo la única suscriptora: "Cancelar" sí lo cancela
+    assert manager.cancel(first)
+    release.set()
+    _wait_for(lambda: manager.get(first).finished)
+    assert manager.get(first).status == CANCELLED
@@ -0,0 +1,60 @@
+import pytest
+
+import llm
+from llm_cache import LLMCache
+
+MESSAGES = [{"role": "user", "content": "Resume esto"}]
+
+
+class FakePool:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    def chat(self, model, messages, options=None, stream=False):
+        self.calls += 1
+        if stream:
+            return iter(self.chunks)
+        return {"message": {"content": "".join(c["message"]["content"] for c in self.chunks)},
+                "done": any(c.get("done") for c in self.chunks)}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(llm, "get_cache", lambda: cache)
+    return cache
+
+
+def _chunk(text, done=False):
+    return {"message": {"content": text}, "done": done}
+
+
+def _stream(result):
+    return "".join(llm.stream_chat("llama3.2", MESSAGES, result, postprocess=str.strip))
+
+
+def test_complete_stream_is_cached_and_served_postprocessed(cache, monkeypatch):
+    pool = FakePool([_chunk(" Hola"), _chunk(" mundo "), _chunk("", done=True)])
+    monkeypatch.setattr(llm, "get_pool", lambda: pool)
+
+    first, second = {}, {}
+    assert _stream(first) == " Hola mundo "
+    assert _stream(second) == "Hola mundo"
+    assert pool.calls == 1
+    assert first["summary"] == second["summary"] == "Hola mundo" and second["stats"]["cached"]
+
+
+@pytest.mark.parametrize("chunks", [
+    [_chunk(" Respuesta"), _chunk(" cortada")],  # el stream terminó sin el fragmento "done"
+    [_chunk("", done=True)],  # respuesta vacía
+])
+def test_incomplete_or_empty_completions_are_not_cached(cache, monkeypatch, chunks):
+    pool = FakePool(chunks)
+    monkeypatch.setattr(llm, "get_pool", lambda: pool)
+
+    _stream({})
+    _stream({})
+    llm.chat("llama3.2", MESSAGES)
+    llm.chat("llama3.2", MESSAGES)
+    assert pool.calls == 4
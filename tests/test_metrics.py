@@ -0,0 +1,11 @@
+from metrics import Registry
+
+
+def test_prometheus_label_values_are_escaped():
+    registry = Registry()
+    registry.inc("ia_agent_errors_total", stage="fetch", type='Bad "quote"\\path\nline')
+    registry.observe("ia_agent_stage_seconds", 0.2, stage="fetch")
+
+    text = registry.to_prometheus()
+    assert 'ia_agent_errors_total{stage="fetch",type="Bad \\"quote\\"\\\\path\\nline"} 1' in text
+    assert 'ia_agent_stage_seconds_bucket{stage="fetch",le="+Inf"} 1' in text
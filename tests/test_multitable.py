@@ -0,0 +1,27 @@
+import pandas as pd
+
+import multitable
+from chunking import context_tokens
+from memo import MemoryLRU
+
+
+def test_compare_files_requests_the_model_context_window(tmp_path, monkeypatch):
+    paths = []
+    for year, factor in (("2023", 1), ("2024", 2)):
+        path = tmp_path / f"ventas_{year}.csv"
+        pd.DataFrame({"Region": ["Norte", "Sur"] * 20, "Ventas": [factor * i for i in range(40)]}).to_csv(path, index=False)
+        paths.append(str(path))
+
+    prepared = multitable.prepare_uploaded_files(paths, cache=MemoryLRU(64 * 1024 * 1024), model="llama3.2")
+    assert prepared["error"] is None and len(prepared["tables"]) == 2
+    assert "ventas_2024" in prepared["prompt"]
+
+    calls = []
+
+    def fake_stream_chat(model, messages, result, postprocess=None, use_cache=True, options=None):
+        calls.append(options)
+        return iter(())
+
+    monkeypatch.setattr(multitable, "stream_chat", fake_stream_chat)
+    assert multitable.analyze_tables_with_llm_stream(prepared["prompt"], "llama3.2")["success"]
+    assert calls == [{"num_ctx": context_tokens("llama3.2")}]
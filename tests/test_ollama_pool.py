@@ -0,0 +1,141 @@
+import os
+import socket
+import sys
+import threading
+
+import ollama
+import pytest
+
+import ollama_pool
+from ollama_pool import OllamaPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from mock_ollama import MockSettings, server_url, start_mock_ollama  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Hola"}]
+
+
+@pytest.fixture
+def start_mock():
+    servers = []
+
+    def start(**settings):
+        server = start_mock_ollama(MockSettings(**dict({"tokens_per_second": 5000, "completion_tokens": 5,
+                                                        "parallel": 4}, **settings)))
+        servers.append(server)
+        return server_url(server)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def dead_url():
+    # Un puerto recién liberado: la conexión se rechaza de inmediato
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def first_candidate(monkeypatch):
+    # Entre hosts con la misma carga se elige al azar; las pruebas fijan el primero
+    monkeypatch.setattr(ollama_pool.random, "choice", lambda candidates: candidates[0])
+
+
+def _pool(urls, **kwargs):
+    return OllamaPool(urls, **dict({"max_concurrency": 2, "retries": 2, "backoff": 0, "health_interval": 60},
+                                   **kwargs))
+
+
+def test_least_outstanding_host_is_chosen():
+    pool = _pool(["http://a:1", "http://b:1", "http://c:1"])
+    a, b, c = pool.hosts
+    a.outstanding, b.outstanding, c.outstanding = 2, 0, 1
+    assert pool._choose("llama3.2", []) is b
+    assert b.outstanding == 1 and b.requests == 1
+    # La carga es relativa a la capacidad de cada host
+    c.max_concurrency = 4
+    assert pool._choose("llama3.2", [b]) is c
+
+
+def test_concurrent_requests_are_spread_across_hosts(start_mock):
+    urls = [start_mock(tokens_per_second=100, completion_tokens=20) for _ in range(2)]
+    pool = _pool(urls)
+    threads = [threading.Thread(target=pool.chat, args=("llama3.2", MESSAGES)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [host.requests for host in pool.hosts] == [2, 2]
+    assert [host.outstanding for host in pool.hosts] == [0, 0]
+
+
+def test_dead_host_is_marked_unhealthy_and_skipped(start_mock, dead_url, first_candidate):
+    pool = _pool([dead_url, start_mock()])
+    dead, alive = pool.hosts
+
+    assert pool.chat("llama3.2", MESSAGES)["message"]["content"]
+    assert not dead.healthy and dead.failures == 1 and dead.requests == 1
+    for _ in range(3):
+        assert "".join(c["message"]["content"] for c in pool.chat("llama3.2", MESSAGES, stream=True))
+    assert dead.requests == 1 and alive.requests == 4
+
+
+def test_missing_model_is_retried_on_another_host(start_mock, first_candidate):
+    pool = _pool([start_mock(models=("mistral",)), start_mock()])
+    without, with_model = pool.hosts
+    assert pool.chat("llama3.2", MESSAGES)["message"]["content"]
+    assert without.requests == 1 and with_model.requests == 1
+    # Un 404 no marca el servidor como caído
+    assert without.healthy
+
+
+def test_missing_model_is_not_retried_with_a_single_host(start_mock):
+    pool = _pool([start_mock(models=("mistral",))])
+    with pytest.raises(ollama.ResponseError) as error:
+        pool.chat("llama3.2", MESSAGES)
+    assert error.value.status_code == 404
+    assert pool.hosts[0].requests == 1
+
+
+def test_slots_are_released_when_a_stream_is_closed_early(start_mock):
+    pool = _pool([start_mock(tokens_per_second=200, completion_tokens=100)], max_concurrency=1)
+    host = pool.hosts[0]
+    stream = pool.chat("llama3.2", MESSAGES, stream=True)
+    assert next(stream)["message"]["content"]
+    assert host.outstanding == 1
+    stream.close()
+    assert host.outstanding == 0
+    assert host.slots.acquire(timeout=1)
+    host.slots.release()
+
+
+class BrokenClient:
+    """
+    Client whose stream fails after the first chunk
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, **kwargs):
+        self.calls += 1
+        yield {"message": {"content": "Hola"}, "done": False}
+        raise ConnectionError("conexión perdida")
+
+
+def test_stream_is_not_retried_after_the_first_chunk(start_mock, first_candidate):
+    pool = _pool(["http://a:1", start_mock()])
+    broken, other = pool.hosts
+    broken.client = BrokenClient()
+    received = []
+    with pytest.raises(ConnectionError):
+        for chunk in pool.chat("llama3.2", MESSAGES, stream=True):
+            received.append(chunk)
+    assert len(received) == 1 and broken.client.calls == 1
+    assert other.requests == 0
+    assert broken.outstanding == 0
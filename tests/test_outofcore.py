@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from outofcore import analyze_large_file, should_use_out_of_core
+from sampling import ReservoirSample
+from stats import compute_dataset_stats
+
+
+def _chunks(df, size):
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def test_reservoir_sample_is_uniform_and_in_file_order():
+    df = pd.DataFrame({"n": np.arange(100_000)})
+    reservoir = ReservoirSample(1_000, seed=7)
+    for chunk in _chunks(df, 7_919):
+        reservoir.update(chunk)
+    sample = reservoir.result()
+
+    assert len(sample) == 1_000 and reservoir.seen == len(df)
+    assert sample["n"].is_monotonic_increasing and sample["n"].is_unique
+    # Cada décimo del archivo aporta ~100 filas
+    per_decile = np.bincount(sample["n"].to_numpy() // 10_000, minlength=10)
+    assert per_decile.min() > 60 and per_decile.max() < 140
+
+
+def test_reservoir_smaller_than_size_keeps_every_row():
+    reservoir = ReservoirSample(50, seed=1)
+    for chunk in _chunks(pd.DataFrame({"n": range(30)}), 8):
+        reservoir.update(chunk)
+    assert reservoir.result()["n"].tolist() == list(range(30))
+
+
+def test_default_threshold_is_reachable_through_the_upload_limits():
+    assert config.OUTOFCORE_THRESHOLD_BYTES < config.API_MAX_BODY_BYTES
+
+
+@pytest.mark.parametrize("engine", ["chunks", "duckdb"])
+def test_out_of_core_statistics_match_in_memory(tmp_path, monkeypatch, engine):
+    if engine == "duckdb":
+        pytest.importorskip("duckdb")
+    monkeypatch.setattr(config, "OUTOFCORE_CHUNK_ROWS", 1_000)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Fecha": pd.date_range("2024-01-01", periods=5_000, freq="h").strftime("%Y-%m-%d"),
+        "Region": rng.choice(["Norte", "Centro", "Sur"], 5_000),
+        "Ventas": rng.integers(0, 1_000, 5_000),
+    })
+    path = tmp_path / "ventas.csv"
+    df.to_csv(path, index=False)
+    assert should_use_out_of_core(str(path), size=config.OUTOFCORE_THRESHOLD_BYTES + 1)
+
+    result = analyze_large_file(str(path), engine=engine, sample_rows=500)
+    expected = compute_dataset_stats(df)
+    assert result["engine"] == engine and result["rows"] == len(df)
+    assert result["stats"].group_totals("Region")["Ventas"].sort_index().tolist() == \
+        expected.group_totals("Region")["Ventas"].sort_index().tolist()
+    assert result["stats"].monthly_trend("Fecha")["Ventas"].tolist() == \
+        expected.monthly_trend("Fecha")["Ventas"].tolist()
+    assert result["stats"].numeric["Ventas"].total == pytest.approx(expected.numeric["Ventas"].total)
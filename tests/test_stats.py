@@ -0,0 +1,33 @@
+import pandas as pd
+
+from stats import compute_dataset_stats, detect_column_roles, infer_date_format
+
+
+def _sales(dates):
+    return pd.DataFrame({"Fecha": dates, "Ventas": [10] * len(dates), "Region": ["Norte"] * len(dates)})
+
+
+def test_day_first_dates_are_not_swapped():
+    # Todas las fechas son ambiguas (día <= 12): deben leerse como dd/mm/aaaa
+    df = _sales(["03/04/2024", "05/04/2024", "11/04/2024", "02/05/2024"])
+    roles = detect_column_roles(df)
+    assert roles["dates"] == ["Fecha"]
+    assert roles["date_formats"]["Fecha"] == "%d/%m/%Y"
+
+    trend = compute_dataset_stats(df).monthly_trend("Fecha")
+    assert [str(month) for month in trend.index] == ["2024-04", "2024-05"]
+    assert trend["Ventas"].tolist() == [30, 10]
+
+
+def test_date_format_is_kept_across_chunks():
+    first = _sales(["01/02/2024", "15/02/2024"])
+    # En este chunk pandas, sin formato, interpretaría el 06/03 como 3 de junio
+    second = _sales(["06/03/2024", "07/03/2024"])
+    stats = compute_dataset_stats(iter([first, second]))
+    assert [str(month) for month in stats.monthly_trend("Fecha").index] == ["2024-02", "2024-03"]
+
+
+def test_iso_and_month_first_dates():
+    assert infer_date_format(pd.Series(["2024-01-31", "2024-02-29"])) == "%Y-%m-%d"
+    assert infer_date_format(pd.Series(["12/31/2024", "01/15/2024"])) == "%m/%d/%Y"
+    assert infer_date_format(pd.Series(["hola", "mundo"])) is None